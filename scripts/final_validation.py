@@ -47,7 +47,7 @@ def check_dependencies():
     print("📦 Checking dependencies...")
     
     # Try importing all dependencies  
-    deps = ["fastmcp", "httpx", "yaml", "dotenv", "tenacity", "pydantic"]
+    deps = ["fastmcp", "httpx", "yaml", "dotenv", "pydantic"]
     for dep in deps:
         try:
             __import__(dep)
@@ -0,0 +1,407 @@
+"""
+Cache of decoded Letta entities for the read tools
+
+Agents, memory blocks and the tool catalog are kept for a per-kind TTL in a
+size-bounded LRU, and dropped by the write tools that change them. An
+optional SQLite store keeps the slow-changing kinds across restarts of the
+stdio server process.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from .codec import JSONCodec
+
+logger = logging.getLogger(__name__)
+
+# Cached entity kinds: an agent record (also the source of its attached
+# tools), an agent's memory blocks, the tool catalog, and the optional
+# endpoints a Letta server supports
+ENTITY_KINDS = ("agent", "memory", "tools", "capabilities")
+
+DEFAULT_ENTITY_TTLS: Dict[str, float] = {
+    "agent": 30.0,
+    "memory": 10.0,
+    "tools": 300.0,
+    "capabilities": 3600.0,
+}
+
+# Kinds written to the disk cache; memory blocks change with every
+# conversation and are only kept in process
+PERSISTED_KINDS = frozenset({"agent", "tools", "capabilities"})
+
+# Kinds read from the disk cache when an EntityCache is created, because
+# they are looked up synchronously
+PRELOADED_KINDS = ("capabilities",)
+
+DEFAULT_DISK_CACHE_DIR = Path.home() / ".letta-mcp" / "cache"
+
+class DiskCache:
+    """SQLite-backed entity store shared by every server process of a user
+
+    Entries are scoped (e.g. by Letta URL and API key), expire on wall-clock
+    TTLs and are evicted least recently used once the stored values exceed
+    ``max_bytes``. The database runs in WAL mode with a busy timeout so
+    several processes can read and write it at once. Storage errors are
+    logged and treated as misses.
+
+    Writes are queued to a dedicated worker thread and ``aget`` reads run
+    there too, after any queued writes, so the event loop never waits on
+    SQLite. The size cap is enforced every ``trim_every`` writes, so the
+    store may briefly exceed it.
+    """
+
+    SCHEMA_VERSION = 1
+    FILENAME = "entities.sqlite3"
+
+    def __init__(
+        self,
+        directory: Union[str, Path, None] = None,
+        scope: str = "",
+        max_bytes: int = 50 * 1024 * 1024,
+        codec: Optional[JSONCodec] = None,
+        trim_every: int = 64
+    ):
+        self.path = Path(directory or DEFAULT_DISK_CACHE_DIR).expanduser() / self.FILENAME
+        self.scope = scope
+        self.max_bytes = max_bytes
+        self.codec = codec or JSONCodec()
+        self.trim_every = trim_every
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._puts_since_trim = 0
+        self._lock = threading.Lock()
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="letta-disk-cache")
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(self.path), timeout=5.0, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+
+    def _migrate(self) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+                )
+                row = self._conn.execute(
+                    "SELECT value FROM meta WHERE key = 'schema_version'"
+                ).fetchone()
+                if row is None or int(row[0]) != self.SCHEMA_VERSION:
+                    # Entries are only a cache; rebuild rather than migrate
+                    self._conn.execute("DROP TABLE IF EXISTS entries")
+                    self._conn.execute(
+                        "CREATE TABLE entries ("
+                        "scope TEXT NOT NULL, kind TEXT NOT NULL, key TEXT NOT NULL, "
+                        "value BLOB NOT NULL, size INTEGER NOT NULL, "
+                        "expires_at REAL NOT NULL, accessed_at REAL NOT NULL, "
+                        "PRIMARY KEY (scope, kind, key))"
+                    )
+                    self._conn.execute(
+                        "CREATE INDEX entries_accessed ON entries (accessed_at)"
+                    )
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                        (str(self.SCHEMA_VERSION),)
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _submit(self, operation: Callable[..., Any], *args: Any) -> "Optional[Future[Any]]":
+        try:
+            return self._worker.submit(operation, *args)
+        except RuntimeError:
+            # Closed; the store is only a cache
+            return None
+
+    async def aget(self, kind: str, key: str) -> Optional[Tuple[Any, float]]:
+        """``get`` run on the worker thread, after any queued writes"""
+        future = self._submit(self.get, kind, key)
+        return await asyncio.wrap_future(future) if future is not None else None
+
+    def get(self, kind: str, key: str) -> Optional[Tuple[Any, float]]:
+        """Return the stored value and its remaining TTL, or None (blocking)"""
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM entries WHERE scope = ? AND kind = ? AND key = ?",
+                    (self.scope, kind, key)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    self._conn.execute(
+                        "UPDATE entries SET accessed_at = ? WHERE scope = ? AND kind = ? AND key = ?",
+                        (now, self.scope, kind, key)
+                    )
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None
+            value = self.codec.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            self._failed("read", e)
+            return None
+
+        self.hits += 1
+        return value, row[1] - now
+
+    def entries(self, kind: str) -> List[Tuple[str, Any, float]]:
+        """Every unexpired ``(key, value, remaining TTL)`` of ``kind`` (blocking)"""
+        now = time.time()
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT key, value, expires_at FROM entries "
+                    "WHERE scope = ? AND kind = ? AND expires_at > ?",
+                    (self.scope, kind, now)
+                ).fetchall()
+            return [(key, self.codec.loads(value), expires_at - now) for key, value, expires_at in rows]
+        except (sqlite3.Error, ValueError) as e:
+            self._failed("read", e)
+            return []
+
+    def put(self, kind: str, key: str, value: Any, ttl: float) -> None:
+        """Queue a write of ``value`` for ``ttl`` seconds"""
+        try:
+            data = self.codec.dumps(value).encode()
+        except (TypeError, ValueError) as e:
+            self._failed("write", e)
+            return
+        if len(data) <= self.max_bytes:
+            self._submit(self._put, kind, key, data, ttl)
+
+    def _put(self, kind: str, key: str, data: bytes, ttl: float) -> None:
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries "
+                    "(scope, kind, key, value, size, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (self.scope, kind, key, data, len(data), now + ttl, now)
+                )
+                self._puts_since_trim += 1
+                if self._puts_since_trim >= self.trim_every:
+                    self._puts_since_trim = 0
+                    self._trim(now)
+        except sqlite3.Error as e:
+            self._failed("write", e)
+
+    def _trim(self, now: float) -> None:
+        self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        stale = []
+        for rowid, size in self._conn.execute(
+            "SELECT rowid, size FROM entries ORDER BY accessed_at"
+        ):
+            stale.append((rowid,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM entries WHERE rowid = ?", stale)
+
+    def delete(self, kind: str, key: Optional[str] = None) -> None:
+        """Queue deleting one entry, or every entry of ``kind`` in this scope"""
+        self._submit(self._delete, kind, key)
+
+    def _delete(self, kind: str, key: Optional[str]) -> None:
+        try:
+            with self._lock:
+                if key is None:
+                    self._conn.execute(
+                        "DELETE FROM entries WHERE scope = ? AND kind = ?", (self.scope, kind)
+                    )
+                else:
+                    self._conn.execute(
+                        "DELETE FROM entries WHERE scope = ? AND kind = ? AND key = ?",
+                        (self.scope, kind, key)
+                    )
+        except sqlite3.Error as e:
+            self._failed("delete", e)
+
+    def _failed(self, operation: str, error: Exception) -> None:
+        self.errors += 1
+        logger.warning(f"Disk cache {operation} failed ({self.path}): {error}")
+
+    def flush(self) -> None:
+        """Wait until every queued write has been applied"""
+        future = self._submit(lambda: None)
+        if future is not None:
+            future.result()
+
+    def close(self) -> None:
+        self._worker.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        try:
+            with self._lock:
+                entries, size = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries WHERE scope = ?",
+                    (self.scope,)
+                ).fetchone()
+        except sqlite3.Error:
+            entries, size = None, None
+        return {
+            "path": str(self.path),
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors
+        }
+
+class EntityCache:
+    """Read-through TTL/LRU cache keyed by entity kind and ID
+
+    Cached values are shared between callers and must be treated as
+    read-only. A TTL of 0 disables caching for that kind. With a ``store``,
+    the kinds in ``PERSISTED_KINDS`` are also written to disk, and read
+    back by ``get_or_load`` and ``aget``; ``get`` only looks in memory.
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Dict[str, float]] = None,
+        max_entries: int = 1024,
+        enabled: bool = True,
+        store: Optional[DiskCache] = None
+    ):
+        self.ttls = {**DEFAULT_ENTITY_TTLS, **(ttls or {})}
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        # Bumped by every invalidation so a load that raced a write is not stored
+        self._generation = 0
+
+        if store is not None and enabled:
+            for kind in PRELOADED_KINDS:
+                for key, value, remaining in store.entries(kind):
+                    self._remember(kind, key, value, min(remaining, self.ttls.get(kind, 0.0)))
+
+    def get(self, kind: str, key: str = "") -> Optional[Any]:
+        """Return the value cached in memory, or None if absent or expired"""
+        entry = self._entries.get((kind, key))
+        if entry is not None:
+            expires_at, value = entry
+            if time.monotonic() < expires_at:
+                self._entries.move_to_end((kind, key))
+                return value
+            del self._entries[(kind, key)]
+        return None
+
+    async def aget(self, kind: str, key: str = "") -> Optional[Any]:
+        """Return the cached value from memory or the disk store, or None"""
+        value = self.get(kind, key)
+        if value is not None or self.store is None or kind not in PERSISTED_KINDS:
+            return value
+
+        generation = self._generation
+        stored = await self.store.aget(kind, key)
+        if stored is None:
+            return None
+        value, remaining = stored
+        if generation == self._generation:
+            self._remember(kind, key, value, min(remaining, self.ttls.get(kind, 0.0)))
+        return value
+
+    def put(self, kind: str, key: str, value: Any) -> None:
+        ttl = self.ttls.get(kind, 0.0)
+        if not self.enabled or ttl <= 0:
+            return
+
+        self._remember(kind, key, value, ttl)
+        if self.store is not None and kind in PERSISTED_KINDS:
+            self.store.put(kind, key, value, ttl)
+
+    def _remember(self, kind: str, key: str, value: Any, ttl: float) -> None:
+        self._entries[(kind, key)] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end((kind, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_load(
+        self,
+        kind: str,
+        key: str,
+        loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Return the cached value, calling ``loader`` and storing its result on a miss"""
+        value = await self.aget(kind, key) if self.enabled else None
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        generation = self._generation
+        value = await loader()
+        if generation == self._generation:
+            self.put(kind, key, value)
+        return value
+
+    def invalidate(self, kind: str, key: Optional[str] = None) -> int:
+        """Drop one entry, or every entry of ``kind`` when ``key`` is None"""
+        self._generation += 1
+        stale = [
+            entry_key for entry_key in self._entries
+            if entry_key[0] == kind and (key is None or entry_key[1] == key)
+        ]
+        for entry_key in stale:
+            del self._entries[entry_key]
+        self.invalidations += len(stale)
+
+        if self.store is not None and kind in PERSISTED_KINDS:
+            # Also drop it for other server processes sharing the store
+            self.store.delete(kind, key)
+        return len(stale)
+
+    def invalidate_agent(self, agent_id: str) -> int:
+        """Drop everything cached for one agent"""
+        return self.invalidate("agent", agent_id) + self.invalidate("memory", agent_id)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        metrics = {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+        if self.store is not None:
+            metrics["disk"] = self.store.metrics()
+        return metrics
@@ -0,0 +1,89 @@
+"""
+Registry of optional Letta endpoints and whether the server supports them
+
+Older and self-hosted Letta servers lack some endpoints (message search,
+usage stats). Once a call shows an endpoint is missing, tools go straight to
+their fallback instead of paying a failed round trip on every call.
+"""
+
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from .cache import DEFAULT_ENTITY_TTLS, EntityCache
+
+# Optional endpoints and query parameters, by capability name
+OPTIONAL_ENDPOINTS: Dict[str, str] = {
+    "message_search": "/v1/agents/{agent_id}/messages/search",
+    "usage_stats": "/v1/stats/usage",
+    "agent_name_search": "/v1/agents?query_text={name}",
+}
+
+# Statuses meaning the server does not implement an endpoint
+UNSUPPORTED_STATUS_CODES = frozenset({404, 405, 501})
+
+def rejects_parameter(response: httpx.Response, parameter: str) -> bool:
+    """Return True if a read ``response`` says the server does not accept ``parameter``
+
+    A 422 is a validation failure of the query itself; a 400 only counts
+    when its body names the parameter, since it may have other causes.
+    """
+    if response.status_code == 422:
+        return True
+    return response.status_code == 400 and parameter in response.text
+
+def is_unsupported(error: Exception) -> bool:
+    """Return True if ``error`` is a response saying the endpoint does not exist"""
+    return (
+        isinstance(error, httpx.HTTPStatusError)
+        and error.response.status_code in UNSUPPORTED_STATUS_CODES
+    )
+
+class CapabilityRegistry:
+    """Remembers which optional endpoints are available
+
+    Results are kept in the entity cache under the "capabilities" kind, so
+    they expire on its TTL and are shared through the disk cache when that
+    is enabled. When the cache would not keep them (disabled, or a TTL of
+    0) they are remembered in process for the default capabilities TTL, so
+    a missing endpoint is still only probed once. Unknown capabilities are
+    probed by the first real call.
+    """
+
+    def __init__(self, cache: EntityCache):
+        self.cache = cache
+        self.skipped = 0
+        self._local: Dict[str, Tuple[float, bool]] = {}
+
+    def supported(self, name: str) -> Optional[bool]:
+        """True or False once known, None if not yet probed or expired"""
+        entry = self.cache.get("capabilities", name)
+        if entry is not None:
+            return entry["available"]
+
+        local = self._local.get(name)
+        if local is not None and time.monotonic() < local[0]:
+            return local[1]
+        return None
+
+    def record(self, name: str, available: bool) -> None:
+        if self.cache.enabled and self.cache.ttls.get("capabilities", 0.0) > 0:
+            self.cache.put("capabilities", name, {"available": available})
+        else:
+            expires_at = time.monotonic() + DEFAULT_ENTITY_TTLS["capabilities"]
+            self._local[name] = (expires_at, available)
+
+    def use_fallback(self, name: str) -> bool:
+        """Return True if the endpoint is known to be missing, counting the skipped request"""
+        if self.supported(name) is False:
+            self.skipped += 1
+            return True
+        return False
+
+    def metrics(self) -> Dict[str, Any]:
+        states = {True: "available", False: "unavailable", None: "unknown"}
+        return {
+            "endpoints": {name: states[self.supported(name)] for name in OPTIONAL_ENDPOINTS},
+            "skipped_requests": self.skipped
+        }
@@ -152,6 +152,94 @@ def cmd_test(args):
     
     asyncio.run(test())
 
+async def _with_server(operation):
+    """Run ``operation(server)`` against a server built from the configuration"""
+    from .server import create_server
+    
+    server = create_server(load_config())
+    try:
+        return await operation(server)
+    finally:
+        await server.client.aclose()
+        server.cache.close()
+
+def _report_fleet_result(result, verb: str):
+    """Print a fleet export/import summary to stderr, keeping stdout for NDJSON"""
+    count = result.get("exported", result.get("created"))
+    print(f"✅ {verb} {count} agents in {result['duration_ms'] / 1000:.1f}s", file=sys.stderr)
+    for failure in result["failures"]:
+        where = failure.get("agent_id") or f"line {failure['line']}"
+        print(f"⚠️  {where}: {failure['error']}", file=sys.stderr)
+    if result["failed"]:
+        print(f"❌ {result['failed']} agents failed", file=sys.stderr)
+        sys.exit(1)
+
+def cmd_export(args):
+    """Export every agent as NDJSON"""
+    import asyncio
+    
+    def export(server):
+        if args.output == "-":
+            return server.export_fleet(sys.stdout.write, args.concurrency)
+        return server.export_fleet_to(args.output, args.concurrency, args.overwrite)
+    
+    try:
+        result = asyncio.run(_with_server(export))
+    except Exception as e:
+        print(f"❌ Export failed: {e}", file=sys.stderr)
+        sys.exit(1)
+    _report_fleet_result(result, "Exported")
+
+def cmd_import(args):
+    """Create agents from an NDJSON export"""
+    import asyncio
+    
+    async def import_fleet(server):
+        if args.input == "-":
+            return await server.import_fleet(sys.stdin, args.concurrency)
+        with open(args.input, encoding="utf-8") as lines:
+            return await server.import_fleet(lines, args.concurrency)
+    
+    try:
+        result = asyncio.run(_with_server(import_fleet))
+    except Exception as e:
+        print(f"❌ Import failed: {e}", file=sys.stderr)
+        sys.exit(1)
+    _report_fleet_result(result, "Imported")
+
+def cmd_sync(args):
+    """Reconcile agents with a desired-state YAML file"""
+    import asyncio
+    from .reconcile import read_desired_state
+    
+    try:
+        desired = read_desired_state(args.file)
+        result = asyncio.run(_with_server(
+            lambda server: server.sync_fleet(desired, args.dry_run, args.concurrency)
+        ))
+    except Exception as e:
+        print(f"❌ Sync failed: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    prefix = "would " if args.dry_run else ""
+    for item in result["results"]:
+        if not item["success"]:
+            print(f"❌ {item['name']}: {item['error']}", file=sys.stderr)
+        elif item["action"] == "create":
+            print(f"➕ {item['name']}: {prefix}create")
+        elif item["action"] == "update":
+            changes = item["changes"]
+            touched = changes["fields"] + [f"memory:{label}" for label in changes["blocks_updated"] + changes["blocks_created"]]
+            print(f"✏️  {item['name']}: {prefix}update {', '.join(touched)}")
+    
+    print(
+        f"\n{'🔍 Dry run: ' if args.dry_run else '✅ '}{result['created']} created, "
+        f"{result['updated']} updated, {result['unchanged']} unchanged, {result['failed']} failed "
+        f"in {result['duration_ms'] / 1000:.1f}s"
+    )
+    if result["failed"]:
+        sys.exit(1)
+
 def cmd_tools(args):
     """List available MCP tools"""
     print(f"🛠️  Letta MCP Server Tools v{__version__}")
@@ -164,6 +252,12 @@ def cmd_tools(args):
             ("letta_get_agent", "Get agent details"),
             ("letta_update_agent", "Update agent configuration"),
             ("letta_delete_agent", "Delete an agent"),
+            ("letta_create_agents_bulk", "Create many agents at once"),
+            ("letta_update_agents_bulk", "Update many agents by ID or selector"),
+            ("letta_delete_agents_bulk", "Delete many agents by ID or selector"),
+            ("letta_export_fleet", "Export every agent to NDJSON"),
+            ("letta_import_fleet", "Create agents from an NDJSON export"),
+            ("letta_sync_agents", "Reconcile agents with a desired state"),
         ]),
         ("Conversations", [
             ("letta_send_message", "Send a message to an agent"),
@@ -236,6 +330,65 @@ def main():
     )
     test_parser.set_defaults(func=cmd_test)
     
+    # Export command
+    export_parser = subparsers.add_parser(
+        "export",
+        help="Export every agent (config, memory blocks, tools) as NDJSON"
+    )
+    export_parser.add_argument(
+        "-o", "--output",
+        default="-",
+        help="File to write (default: stdout)"
+    )
+    export_parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Replace the output file if it already exists"
+    )
+    export_parser.add_argument(
+        "--concurrency",
+        type=int,
+        help="Agents fetched at once (default: performance.bulk_concurrency)"
+    )
+    export_parser.set_defaults(func=cmd_export)
+    
+    # Import command
+    import_parser = subparsers.add_parser(
+        "import",
+        help="Create agents from an NDJSON export"
+    )
+    import_parser.add_argument(
+        "input",
+        help="NDJSON file to read ('-' for stdin)"
+    )
+    import_parser.add_argument(
+        "--concurrency",
+        type=int,
+        help="Agents created at once (default: performance.bulk_concurrency)"
+    )
+    import_parser.set_defaults(func=cmd_import)
+    
+    # Sync command
+    sync_parser = subparsers.add_parser(
+        "sync",
+        help="Reconcile agents with a desired-state YAML file, writing only what differs"
+    )
+    sync_parser.add_argument(
+        "file",
+        help="YAML file with an 'agents' list"
+    )
+    sync_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Show what would change without writing"
+    )
+    sync_parser.add_argument(
+        "--concurrency",
+        type=int,
+        help="Agents reconciled at once (default: performance.bulk_concurrency)"
+    )
+    sync_parser.set_defaults(func=cmd_sync)
+    
     # Tools command
     tools_parser = subparsers.add_parser(
         "tools",
@@ -0,0 +1,101 @@
+"""
+JSON codecs used to decode Letta responses and encode MCP output
+
+The stdlib ``json`` module is always available; orjson and msgspec are used
+when installed (``pip install letta-mcp-server[fast-json]``) since they decode
+and encode large agent and tool lists several times faster.
+"""
+
+import json
+from typing import Any, Dict, Type, Union
+
+from .exceptions import ConfigurationError
+
+JSON_BACKENDS = ("auto", "orjson", "msgspec", "stdlib")
+
+class JSONCodec:
+    """Decodes and encodes JSON with the stdlib ``json`` module
+
+    Subclasses swap in faster backends; every codec raises ``ValueError`` on
+    malformed input and returns ``str`` from ``dumps``.
+    """
+
+    name = "stdlib"
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+    def dumps(self, obj: Any, indent: bool = False) -> str:
+        if indent:
+            return json.dumps(obj, indent=2, ensure_ascii=False, default=str)
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
+
+class OrjsonCodec(JSONCodec):
+    """Codec backed by orjson"""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        self._options = orjson.OPT_NON_STR_KEYS
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return self._orjson.loads(data)
+
+    def dumps(self, obj: Any, indent: bool = False) -> str:
+        options = self._options | (self._orjson.OPT_INDENT_2 if indent else 0)
+        return self._orjson.dumps(obj, default=str, option=options).decode()
+
+class MsgspecCodec(JSONCodec):
+    """Codec backed by msgspec"""
+
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+        self._msgspec = msgspec
+        self._encoder = msgspec.json.Encoder(enc_hook=str)
+        self._decoder = msgspec.json.Decoder()
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return self._decoder.decode(data)
+
+    def dumps(self, obj: Any, indent: bool = False) -> str:
+        encoded = self._encoder.encode(obj)
+        if indent:
+            encoded = self._msgspec.json.format(encoded, indent=2)
+        return encoded.decode()
+
+_CODECS: Dict[str, Type[JSONCodec]] = {
+    "orjson": OrjsonCodec,
+    "msgspec": MsgspecCodec,
+    "stdlib": JSONCodec,
+}
+
+def get_codec(backend: str = "auto") -> JSONCodec:
+    """Return a codec for ``backend``
+
+    ``auto`` picks the fastest installed backend, falling back to the stdlib.
+    Naming a backend that is not installed raises ``ConfigurationError``.
+    """
+    if backend not in JSON_BACKENDS:
+        raise ConfigurationError(
+            f"Unknown JSON backend: {backend}. Use one of: {', '.join(JSON_BACKENDS)}"
+        )
+
+    if backend != "auto":
+        try:
+            return _CODECS[backend]()
+        except ImportError as e:
+            raise ConfigurationError(
+                f"JSON backend '{backend}' is not installed. "
+                "Install it with: pip install letta-mcp-server[fast-json]"
+            ) from e
+
+    for name in ("orjson", "msgspec"):
+        try:
+            return _CODECS[name]()
+        except ImportError:
+            continue
+    return JSONCodec()
@@ -5,10 +5,39 @@ Configuration management for Letta MCP Server
 import os
 import yaml
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from dataclasses import dataclass, field
 
 from .exceptions import ConfigurationError
+from .cache import ENTITY_KINDS
+from .codec import JSON_BACKENDS
+from .transport import PRIORITY_CLASSES
+
+# Built-in deadline budgets in seconds for tools whose calls need a shorter
+# or longer budget than default_deadline; per-tool tool_deadlines override
+# them. Also written to the deadlines section of the default config file.
+DEFAULT_TOOL_DEADLINES = {
+    "letta_health_check": 10.0,
+    "letta_send_message": 120.0,
+    "letta_create_agents_bulk": 300.0,
+    "letta_update_agents_bulk": 300.0,
+    "letta_delete_agents_bulk": 300.0,
+    "letta_export_fleet": 3600.0,
+    "letta_import_fleet": 3600.0,
+    "letta_sync_agents": 3600.0,
+}
+
+def _optional_float(value: Optional[str]) -> Optional[float]:
+    return float(value) if value else None
+
+def _parse_mapping(value: str) -> Dict[str, float]:
+    """Parse ``tool=seconds,tool=seconds`` into a mapping"""
+    deadlines = {}
+    for entry in value.split(","):
+        if entry.strip():
+            name, _, seconds = entry.partition("=")
+            deadlines[name.strip()] = float(seconds)
+    return deadlines
 
 @dataclass
 class LettaConfig:
@@ -18,14 +47,114 @@ class LettaConfig:
     api_key: Optional[str] = None
     base_url: str = "https://api.letta.com"
     
+    # Several Letta instances serving the same agents (overrides base_url)
+    backends: List[str] = field(default_factory=list)
+    routing_policy: str = "ewma"
+    sticky_routing: bool = True
+    backend_ejection_threshold: int = 3
+    backend_ejection_time: float = 30.0
+    
     # Default Models
     default_model: str = "openai/gpt-4o-mini"
     default_embedding: str = "openai/text-embedding-3-small"
     
     # Performance Settings
     timeout: int = 60
+    connect_timeout: Optional[float] = None
+    read_timeout: Optional[float] = None
+    write_timeout: Optional[float] = None
+    pool_timeout: Optional[float] = None
     max_retries: int = 3
+    retry_base_delay: float = 0.2
+    retry_max_delay: float = 10.0
+    retry_budget_ratio: float = 0.2
     connection_pool_size: int = 10
+    http2: bool = False
+    keepalive_expiry: float = 5.0
+    http2_max_streams: int = 100
+    compression: bool = True
+    
+    # Deadline budgets: the total time one tool call may spend across all of
+    # its upstream requests, retries and queueing (default: ``timeout``)
+    default_deadline: Optional[float] = None
+    tool_deadlines: Dict[str, float] = field(default_factory=dict)
+    
+    # Startup warm-up (DNS, keepalive connections, optional list preload)
+    warmup: bool = True
+    warmup_connections: int = 2
+    warmup_preload: bool = False
+    warmup_timeout: float = 10.0
+    
+    # Adaptive Concurrency (AIMD limiter in front of the connection pool),
+    # never allowed above the pool's capacity
+    adaptive_concurrency: bool = True
+    concurrency_min_limit: int = 1
+    concurrency_max_limit: int = 100
+    concurrency_max_queue: int = 1000
+    
+    # Queued requests are served by tool priority class (interactive,
+    # standard, bulk): "weighted" shares slots by priority_weights, "strict"
+    # always serves the highest waiting class first
+    priority_scheduling: str = "weighted"
+    priority_weights: Dict[str, float] = field(default_factory=dict)
+    
+    # Share one upstream call between concurrent identical GET requests
+    coalesce_requests: bool = True
+    
+    # Pages fetched at once when letta_list_agents walks every page
+    pagination_concurrency: int = 4
+    
+    # Bulk tools: items processed at once, and items accepted per create
+    # call or processed per batch by selector updates and deletes
+    bulk_concurrency: int = 8
+    bulk_max_items: int = 100
+    
+    # Answer letta_list_agents name/description filters from a local index,
+    # resynced when a lookup finds it older than agent_index_refresh seconds;
+    # agent_index_background also resyncs on that interval while idle
+    agent_index: bool = True
+    agent_index_refresh: float = 60.0
+    agent_index_background: bool = False
+    
+    # Conditional-GET cache: revalidate with ETag/Last-Modified; responses
+    # without validators are only reused when http_cache_ttl is above 0
+    http_cache: bool = True
+    http_cache_ttl: float = 0.0
+    http_cache_max_entries: int = 512
+    http_cache_max_entry_bytes: int = 5 * 1024 * 1024
+    
+    # Entity cache for read tools (agents, memory blocks, tool catalog),
+    # invalidated by the write tools; TTLs in seconds per kind
+    entity_cache: bool = True
+    entity_cache_max_entries: int = 1024
+    entity_cache_ttls: Dict[str, float] = field(default_factory=dict)
+    
+    # Keep agents, the tool catalog and endpoint capabilities in a SQLite
+    # file shared by server processes (default directory: ~/.letta-mcp/cache)
+    disk_cache: bool = False
+    disk_cache_dir: Optional[str] = None
+    disk_cache_max_mb: float = 50.0
+    
+    # Rate Limiting (token bucket fed by 429 Retry-After and rate-limit headers)
+    respect_rate_limits: bool = True
+    rate_limit_per_second: float = 0.0
+    rate_limit_burst: int = 10
+    rate_limit_max_wait: float = 60.0
+    
+    # Circuit Breaker (per endpoint family: agents, messages, memory-blocks, tools, stats)
+    circuit_breaker: bool = True
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout: float = 30.0
+    
+    # Hedged GETs (opt-in): re-issue slow reads after a percentile-derived delay
+    hedge_requests: bool = False
+    hedge_percentile: float = 95.0
+    hedge_max_ratio: float = 0.1
+    hedge_min_delay: float = 0.05
+    
+    # JSON codec (auto picks orjson or msgspec when installed) and output layout
+    json_backend: str = "auto"
+    compact_json: bool = True
     
     # Feature Flags
     enable_streaming: bool = True
@@ -43,11 +172,69 @@ class LettaConfig:
         return cls(
             api_key=os.getenv("LETTA_API_KEY"),
             base_url=os.getenv("LETTA_BASE_URL", "https://api.letta.com"),
+            backends=[url.strip() for url in os.getenv("LETTA_BACKENDS", "").split(",") if url.strip()],
+            routing_policy=os.getenv("LETTA_ROUTING_POLICY", "ewma"),
+            sticky_routing=os.getenv("LETTA_STICKY_ROUTING", "true").lower() == "true",
+            backend_ejection_threshold=int(os.getenv("LETTA_BACKEND_EJECTION_THRESHOLD", "3")),
+            backend_ejection_time=float(os.getenv("LETTA_BACKEND_EJECTION_TIME", "30")),
             default_model=os.getenv("LETTA_DEFAULT_MODEL", "openai/gpt-4o-mini"),
             default_embedding=os.getenv("LETTA_DEFAULT_EMBEDDING", "openai/text-embedding-3-small"),
             timeout=int(os.getenv("LETTA_TIMEOUT", "60")),
+            connect_timeout=_optional_float(os.getenv("LETTA_CONNECT_TIMEOUT")),
+            read_timeout=_optional_float(os.getenv("LETTA_READ_TIMEOUT")),
+            write_timeout=_optional_float(os.getenv("LETTA_WRITE_TIMEOUT")),
+            pool_timeout=_optional_float(os.getenv("LETTA_POOL_TIMEOUT")),
             max_retries=int(os.getenv("LETTA_MAX_RETRIES", "3")),
+            retry_base_delay=float(os.getenv("LETTA_RETRY_BASE_DELAY", "0.2")),
+            retry_max_delay=float(os.getenv("LETTA_RETRY_MAX_DELAY", "10")),
+            retry_budget_ratio=float(os.getenv("LETTA_RETRY_BUDGET_RATIO", "0.2")),
             connection_pool_size=int(os.getenv("LETTA_POOL_SIZE", "10")),
+            http2=os.getenv("LETTA_HTTP2", "false").lower() == "true",
+            keepalive_expiry=float(os.getenv("LETTA_KEEPALIVE_EXPIRY", "5.0")),
+            http2_max_streams=int(os.getenv("LETTA_HTTP2_MAX_STREAMS", "100")),
+            adaptive_concurrency=os.getenv("LETTA_ADAPTIVE_CONCURRENCY", "true").lower() == "true",
+            concurrency_min_limit=int(os.getenv("LETTA_CONCURRENCY_MIN_LIMIT", "1")),
+            concurrency_max_limit=int(os.getenv("LETTA_CONCURRENCY_MAX_LIMIT", "100")),
+            concurrency_max_queue=int(os.getenv("LETTA_CONCURRENCY_MAX_QUEUE", "1000")),
+            priority_scheduling=os.getenv("LETTA_PRIORITY_SCHEDULING", "weighted"),
+            priority_weights=_parse_mapping(os.getenv("LETTA_PRIORITY_WEIGHTS", "")),
+            coalesce_requests=os.getenv("LETTA_COALESCE_REQUESTS", "true").lower() == "true",
+            pagination_concurrency=int(os.getenv("LETTA_PAGINATION_CONCURRENCY", "4")),
+            bulk_concurrency=int(os.getenv("LETTA_BULK_CONCURRENCY", "8")),
+            bulk_max_items=int(os.getenv("LETTA_BULK_MAX_ITEMS", "100")),
+            agent_index=os.getenv("LETTA_AGENT_INDEX", "true").lower() == "true",
+            agent_index_refresh=float(os.getenv("LETTA_AGENT_INDEX_REFRESH", "60")),
+            agent_index_background=os.getenv("LETTA_AGENT_INDEX_BACKGROUND", "false").lower() == "true",
+            respect_rate_limits=os.getenv("LETTA_RESPECT_RATE_LIMITS", "true").lower() == "true",
+            rate_limit_per_second=float(os.getenv("LETTA_RATE_LIMIT_PER_SECOND", "0")),
+            rate_limit_burst=int(os.getenv("LETTA_RATE_LIMIT_BURST", "10")),
+            rate_limit_max_wait=float(os.getenv("LETTA_RATE_LIMIT_MAX_WAIT", "60")),
+            circuit_breaker=os.getenv("LETTA_CIRCUIT_BREAKER", "true").lower() == "true",
+            circuit_failure_threshold=int(os.getenv("LETTA_CIRCUIT_FAILURE_THRESHOLD", "5")),
+            circuit_reset_timeout=float(os.getenv("LETTA_CIRCUIT_RESET_TIMEOUT", "30")),
+            hedge_requests=os.getenv("LETTA_HEDGE_REQUESTS", "false").lower() == "true",
+            hedge_percentile=float(os.getenv("LETTA_HEDGE_PERCENTILE", "95")),
+            hedge_max_ratio=float(os.getenv("LETTA_HEDGE_MAX_RATIO", "0.1")),
+            hedge_min_delay=float(os.getenv("LETTA_HEDGE_MIN_DELAY", "0.05")),
+            compression=os.getenv("LETTA_COMPRESSION", "true").lower() == "true",
+            default_deadline=_optional_float(os.getenv("LETTA_DEFAULT_DEADLINE")),
+            tool_deadlines=_parse_mapping(os.getenv("LETTA_TOOL_DEADLINES", "")),
+            warmup=os.getenv("LETTA_WARMUP", "true").lower() == "true",
+            warmup_connections=int(os.getenv("LETTA_WARMUP_CONNECTIONS", "2")),
+            warmup_preload=os.getenv("LETTA_WARMUP_PRELOAD", "false").lower() == "true",
+            warmup_timeout=float(os.getenv("LETTA_WARMUP_TIMEOUT", "10")),
+            http_cache=os.getenv("LETTA_HTTP_CACHE", "true").lower() == "true",
+            http_cache_ttl=float(os.getenv("LETTA_HTTP_CACHE_TTL", "0")),
+            http_cache_max_entries=int(os.getenv("LETTA_HTTP_CACHE_MAX_ENTRIES", "512")),
+            http_cache_max_entry_bytes=int(os.getenv("LETTA_HTTP_CACHE_MAX_ENTRY_BYTES", str(5 * 1024 * 1024))),
+            entity_cache=os.getenv("LETTA_CACHE", "true").lower() == "true",
+            entity_cache_max_entries=int(os.getenv("LETTA_CACHE_MAX_ENTRIES", "1024")),
+            entity_cache_ttls=_parse_mapping(os.getenv("LETTA_CACHE_TTLS", "")),
+            disk_cache=os.getenv("LETTA_DISK_CACHE", "false").lower() == "true",
+            disk_cache_dir=os.getenv("LETTA_DISK_CACHE_DIR"),
+            disk_cache_max_mb=float(os.getenv("LETTA_DISK_CACHE_MAX_MB", "50")),
+            json_backend=os.getenv("LETTA_JSON_BACKEND", "auto"),
+            compact_json=os.getenv("LETTA_COMPACT_JSON", "true").lower() == "true",
             enable_streaming=os.getenv("LETTA_ENABLE_STREAMING", "true").lower() == "true",
             enable_auto_retry=os.getenv("LETTA_ENABLE_AUTO_RETRY", "true").lower() == "true",
             enable_request_logging=os.getenv("LETTA_ENABLE_REQUEST_LOGGING", "false").lower() == "true",
@@ -69,6 +256,8 @@ class LettaConfig:
             performance = data.get('performance', {})
             features = data.get('features', {})
             logging = data.get('logging', {})
+            deadlines = dict(data.get('deadlines') or {})
+            cache = data.get('cache') or {}
             
             # Expand environment variables
             api_key = letta_config.get('api_key', '')
@@ -79,11 +268,69 @@ class LettaConfig:
             return cls(
                 api_key=api_key or os.getenv("LETTA_API_KEY"),
                 base_url=letta_config.get('base_url', cls.base_url),
+                backends=list(letta_config.get('backends') or []),
+                routing_policy=letta_config.get('routing_policy', cls.routing_policy),
+                sticky_routing=letta_config.get('sticky_routing', cls.sticky_routing),
+                backend_ejection_threshold=letta_config.get('ejection_threshold', cls.backend_ejection_threshold),
+                backend_ejection_time=letta_config.get('ejection_time', cls.backend_ejection_time),
                 default_model=defaults.get('model', cls.default_model),
                 default_embedding=defaults.get('embedding', cls.default_embedding),
                 timeout=performance.get('timeout', cls.timeout),
+                connect_timeout=performance.get('connect_timeout', cls.connect_timeout),
+                read_timeout=performance.get('read_timeout', cls.read_timeout),
+                write_timeout=performance.get('write_timeout', cls.write_timeout),
+                pool_timeout=performance.get('pool_timeout', cls.pool_timeout),
                 max_retries=performance.get('max_retries', cls.max_retries),
+                retry_base_delay=performance.get('retry_base_delay', cls.retry_base_delay),
+                retry_max_delay=performance.get('retry_max_delay', cls.retry_max_delay),
+                retry_budget_ratio=performance.get('retry_budget_ratio', cls.retry_budget_ratio),
                 connection_pool_size=performance.get('connection_pool_size', cls.connection_pool_size),
+                http2=performance.get('http2', cls.http2),
+                keepalive_expiry=performance.get('keepalive_expiry', cls.keepalive_expiry),
+                http2_max_streams=performance.get('max_streams', cls.http2_max_streams),
+                adaptive_concurrency=performance.get('adaptive_concurrency', cls.adaptive_concurrency),
+                concurrency_min_limit=performance.get('concurrency_min_limit', cls.concurrency_min_limit),
+                concurrency_max_limit=performance.get('concurrency_max_limit', cls.concurrency_max_limit),
+                concurrency_max_queue=performance.get('concurrency_max_queue', cls.concurrency_max_queue),
+                priority_scheduling=performance.get('priority_scheduling', cls.priority_scheduling),
+                priority_weights=dict(performance.get('priority_weights') or {}),
+                coalesce_requests=performance.get('coalesce_requests', cls.coalesce_requests),
+                pagination_concurrency=performance.get('pagination_concurrency', cls.pagination_concurrency),
+                bulk_concurrency=performance.get('bulk_concurrency', cls.bulk_concurrency),
+                bulk_max_items=performance.get('bulk_max_items', cls.bulk_max_items),
+                agent_index=performance.get('agent_index', cls.agent_index),
+                agent_index_refresh=performance.get('agent_index_refresh', cls.agent_index_refresh),
+                agent_index_background=performance.get('agent_index_background', cls.agent_index_background),
+                respect_rate_limits=performance.get('respect_rate_limits', cls.respect_rate_limits),
+                rate_limit_per_second=performance.get('rate_limit_per_second', cls.rate_limit_per_second),
+                rate_limit_burst=performance.get('rate_limit_burst', cls.rate_limit_burst),
+                rate_limit_max_wait=performance.get('rate_limit_max_wait', cls.rate_limit_max_wait),
+                circuit_breaker=performance.get('circuit_breaker', cls.circuit_breaker),
+                circuit_failure_threshold=performance.get('circuit_failure_threshold', cls.circuit_failure_threshold),
+                circuit_reset_timeout=performance.get('circuit_reset_timeout', cls.circuit_reset_timeout),
+                hedge_requests=performance.get('hedge_requests', cls.hedge_requests),
+                hedge_percentile=performance.get('hedge_percentile', cls.hedge_percentile),
+                hedge_max_ratio=performance.get('hedge_max_ratio', cls.hedge_max_ratio),
+                hedge_min_delay=performance.get('hedge_min_delay', cls.hedge_min_delay),
+                compression=performance.get('compression', cls.compression),
+                default_deadline=deadlines.pop('default', cls.default_deadline),
+                tool_deadlines={name: float(seconds) for name, seconds in deadlines.items()},
+                warmup=performance.get('warmup', cls.warmup),
+                warmup_connections=performance.get('warmup_connections', cls.warmup_connections),
+                warmup_preload=performance.get('warmup_preload', cls.warmup_preload),
+                warmup_timeout=performance.get('warmup_timeout', cls.warmup_timeout),
+                http_cache=performance.get('http_cache', cls.http_cache),
+                http_cache_ttl=performance.get('http_cache_ttl', cls.http_cache_ttl),
+                http_cache_max_entries=performance.get('http_cache_max_entries', cls.http_cache_max_entries),
+                http_cache_max_entry_bytes=performance.get('http_cache_max_entry_bytes', cls.http_cache_max_entry_bytes),
+                entity_cache=cache.get('enabled', cls.entity_cache),
+                entity_cache_max_entries=cache.get('max_entries', cls.entity_cache_max_entries),
+                entity_cache_ttls={kind: float(seconds) for kind, seconds in (cache.get('ttl') or {}).items()},
+                disk_cache=cache.get('disk', cls.disk_cache),
+                disk_cache_dir=cache.get('disk_dir', cls.disk_cache_dir),
+                disk_cache_max_mb=cache.get('disk_max_mb', cls.disk_cache_max_mb),
+                json_backend=performance.get('json_backend', cls.json_backend),
+                compact_json=performance.get('compact_json', cls.compact_json),
                 enable_streaming=features.get('streaming', cls.enable_streaming),
                 enable_auto_retry=features.get('auto_retry', cls.enable_auto_retry),
                 enable_request_logging=features.get('request_logging', cls.enable_request_logging),
@@ -93,24 +340,153 @@ class LettaConfig:
             )
             
         except Exception as e:
-            raise ConfigurationError(f"Failed to load config from {path}: {e}")
+            raise ConfigurationError(f"Failed to load config from {path}: {e}") from e
+    
+    def pool_capacity(self) -> int:
+        """Requests the connection pool can have in flight at once"""
+        if self.http2:
+            return self.connection_pool_size * self.http2_max_streams
+        return self.connection_pool_size
+    
+    def backend_urls(self) -> List[str]:
+        """Letta instances to send requests to; the first is the primary"""
+        return list(self.backends) or [self.base_url]
+    
+    def deadline_for(self, tool_name: str) -> float:
+        """Deadline budget in seconds for one call of ``tool_name``"""
+        if tool_name in self.tool_deadlines:
+            return self.tool_deadlines[tool_name]
+        if tool_name in DEFAULT_TOOL_DEADLINES:
+            return DEFAULT_TOOL_DEADLINES[tool_name]
+        return self.default_deadline or self.timeout
     
     def validate(self):
         """Validate the configuration"""
-        if self.base_url == "https://api.letta.com" and not self.api_key:
+        if "https://api.letta.com" in self.backend_urls() and not self.api_key:
             raise ConfigurationError(
                 "LETTA_API_KEY is required for Letta Cloud. "
                 "Set it via environment variable or config file."
             )
         
+        if self.routing_policy not in ("ewma", "least_outstanding"):
+            raise ConfigurationError(
+                "Routing policy must be 'ewma' or 'least_outstanding'"
+            )
+        
+        if self.backend_ejection_threshold < 1:
+            raise ConfigurationError("Backend ejection threshold must be at least 1")
+        
         if self.timeout < 1:
             raise ConfigurationError("Timeout must be at least 1 second")
         
+        for phase in ("connect", "read", "write", "pool"):
+            value = getattr(self, f"{phase}_timeout")
+            if value is not None and value <= 0:
+                raise ConfigurationError(f"{phase.capitalize()} timeout must be positive")
+        
+        if self.default_deadline is not None and self.default_deadline <= 0:
+            raise ConfigurationError("Default deadline must be positive")
+        
+        for tool_name, seconds in self.tool_deadlines.items():
+            if seconds <= 0:
+                raise ConfigurationError(f"Deadline for {tool_name} must be positive")
+        
         if self.max_retries < 0:
             raise ConfigurationError("Max retries cannot be negative")
         
+        if self.retry_base_delay <= 0 or self.retry_max_delay < self.retry_base_delay:
+            raise ConfigurationError(
+                "Retry delays must satisfy 0 < retry_base_delay <= retry_max_delay"
+            )
+        
+        if self.retry_budget_ratio < 0:
+            raise ConfigurationError("Retry budget ratio cannot be negative")
+        
         if self.connection_pool_size < 1:
             raise ConfigurationError("Connection pool size must be at least 1")
+        
+        if self.keepalive_expiry < 0:
+            raise ConfigurationError("Keepalive expiry cannot be negative")
+        
+        if self.http2_max_streams < 1:
+            raise ConfigurationError("HTTP/2 max streams must be at least 1")
+        
+        if not 1 <= self.concurrency_min_limit <= self.concurrency_max_limit:
+            raise ConfigurationError(
+                "Concurrency limits must satisfy 1 <= min_limit <= max_limit"
+            )
+        
+        if self.concurrency_max_queue < 0:
+            raise ConfigurationError("Concurrency max queue cannot be negative")
+        
+        if self.priority_scheduling not in ("weighted", "strict"):
+            raise ConfigurationError("Priority scheduling must be 'weighted' or 'strict'")
+        
+        for name, weight in self.priority_weights.items():
+            if name not in PRIORITY_CLASSES:
+                raise ConfigurationError(
+                    f"Unknown priority class: {name}. Use one of: {', '.join(PRIORITY_CLASSES)}"
+                )
+            if weight <= 0:
+                raise ConfigurationError(f"Priority weight for {name} must be positive")
+        
+        if self.pagination_concurrency < 1:
+            raise ConfigurationError("Pagination concurrency must be at least 1")
+        
+        if self.bulk_concurrency < 1:
+            raise ConfigurationError("Bulk concurrency must be at least 1")
+        
+        if self.bulk_max_items < 1:
+            raise ConfigurationError("Bulk max items must be at least 1")
+        
+        if self.agent_index_refresh <= 0:
+            raise ConfigurationError("Agent index refresh interval must be positive")
+        
+        if self.rate_limit_per_second < 0:
+            raise ConfigurationError("Rate limit cannot be negative")
+        
+        if self.rate_limit_burst < 1:
+            raise ConfigurationError("Rate limit burst must be at least 1")
+        
+        if self.circuit_failure_threshold < 1:
+            raise ConfigurationError("Circuit failure threshold must be at least 1")
+        
+        if not 0 < self.hedge_percentile < 100:
+            raise ConfigurationError("Hedge percentile must be between 0 and 100")
+        
+        if not 0 <= self.hedge_max_ratio <= 1:
+            raise ConfigurationError("Hedge max ratio must be between 0 and 1")
+        
+        if self.warmup_connections < 0:
+            raise ConfigurationError("Warm-up connections cannot be negative")
+        
+        if self.warmup_timeout <= 0:
+            raise ConfigurationError("Warm-up timeout must be positive")
+        
+        if self.http_cache_ttl < 0:
+            raise ConfigurationError("HTTP cache TTL cannot be negative")
+        
+        if self.http_cache_max_entries < 1:
+            raise ConfigurationError("HTTP cache must hold at least one entry")
+        
+        if self.entity_cache_max_entries < 1:
+            raise ConfigurationError("Entity cache must hold at least one entry")
+        
+        for kind, seconds in self.entity_cache_ttls.items():
+            if kind not in ENTITY_KINDS:
+                raise ConfigurationError(
+                    f"Unknown cache entity: {kind}. Use one of: {', '.join(ENTITY_KINDS)}"
+                )
+            if seconds < 0:
+                raise ConfigurationError(f"Cache TTL for {kind} cannot be negative")
+        
+        if self.disk_cache_max_mb <= 0:
+            raise ConfigurationError("Disk cache size must be positive")
+        
+        if self.json_backend not in JSON_BACKENDS:
+            raise ConfigurationError(
+                f"JSON backend must be one of: {', '.join(JSON_BACKENDS)}"
+            )
 
 def get_config_path() -> Optional[Path]:
     """Get the path to the config file"""
@@ -169,6 +545,22 @@ letta:
   # For Letta Cloud: https://api.letta.com
   # For self-hosted: http://localhost:8283
   base_url: https://api.letta.com
+  
+  # Several self-hosted instances serving the same agents (replaces base_url)
+  # backends:
+  #   - http://letta-1:8283
+  #   - http://letta-2:8283
+  
+  # ewma (latency-weighted) or least_outstanding
+  routing_policy: ewma
+  
+  # Keep each agent on one backend while it is healthy
+  sticky_routing: true
+  
+  # Stop routing to a backend for ejection_time seconds after
+  # ejection_threshold consecutive failures
+  ejection_threshold: 3
+  ejection_time: 30
 
 defaults:
   # Default model for new agents
@@ -181,11 +573,143 @@ performance:
   # Request timeout in seconds
   timeout: 60
   
+  # Optional per-phase timeouts (default to timeout)
+  # connect_timeout: 5
+  # read_timeout: 60
+  # write_timeout: 10
+  # pool_timeout: 10
+  
   # Maximum number of retries for failed requests
   max_retries: 3
   
+  # Backoff bounds in seconds (decorrelated jitter between them)
+  retry_base_delay: 0.2
+  retry_max_delay: 10
+  
+  # Retries allowed per request across the whole client, so retries
+  # cannot multiply load during an outage
+  retry_budget_ratio: 0.2
+  
   # HTTP connection pool size
   connection_pool_size: 10
+  
+  # Multiplex requests over HTTP/2 (requires: pip install letta-mcp-server[http2])
+  http2: false
+  
+  # Seconds an idle keepalive connection is kept open
+  keepalive_expiry: 5.0
+  
+  # Concurrent requests per connection in HTTP/2 mode
+  max_streams: 100
+  
+  # Ask Letta for compressed responses (gzip always; brotli and zstd
+  # require: pip install letta-mcp-server[compression])
+  compression: true
+  
+  # Resolve the host and open keepalive connections in the background at
+  # startup; warmup_preload also fetches the agent and tool lists
+  warmup: true
+  warmup_connections: 2
+  warmup_preload: false
+  warmup_timeout: 10
+  
+  # Adapt the number of in-flight requests to Letta's latency and errors,
+  # up to the pool's capacity (connections, times max_streams with HTTP/2)
+  adaptive_concurrency: true
+  concurrency_min_limit: 1
+  concurrency_max_limit: 100
+  
+  # Requests allowed to wait for a slot before new ones are rejected
+  concurrency_max_queue: 1000
+  
+  # How waiting requests share freed slots by tool priority class:
+  # weighted (by priority_weights) or strict (interactive first, then
+  # standard, then bulk)
+  priority_scheduling: weighted
+  priority_weights:
+    interactive: 8
+    standard: 4
+    bulk: 1
+  
+  # Share one upstream call between concurrent identical GET requests
+  coalesce_requests: true
+  
+  # Agent list pages fetched at once by letta_list_agents(all_pages=true)
+  pagination_concurrency: 4
+  
+  # Agents created, updated or deleted at once by the bulk tools (and
+  # fetched or created at once by fleet export/import), and the most
+  # accepted per bulk create call or processed per batch by bulk updates
+  # and deletes
+  bulk_concurrency: 8
+  bulk_max_items: 100
+  
+  # Resolve letta_list_agents filters from a local index of agent names and
+  # descriptions, resynced once lookups find it older than agent_index_refresh
+  # (only changed agents re-indexed); agent_index_background also resyncs idle
+  agent_index: true
+  agent_index_refresh: 60
+  agent_index_background: false
+  
+  # Revalidate cached GET responses with ETag/Last-Modified. Set
+  # http_cache_ttl above 0 to also reuse responses without validators for
+  # that many seconds (never conversation history or usage stats)
+  http_cache: true
+  http_cache_ttl: 0
+  http_cache_max_entries: 512
+  
+  # Pace requests using Letta's 429 Retry-After and rate-limit headers
+  respect_rate_limits: true
+  
+  # Client-side request budget (0 = only follow limits advertised by Letta)
+  rate_limit_per_second: 0
+  rate_limit_burst: 10
+  
+  # Longest a request will queue for rate-limit budget before failing
+  rate_limit_max_wait: 60
+  
+  # Fail fast on endpoints that keep failing, probing again after the reset timeout
+  circuit_breaker: true
+  circuit_failure_threshold: 5
+  circuit_reset_timeout: 30
+  
+  # Re-issue GETs that are slower than the given latency percentile and
+  # take whichever response arrives first (at most max_ratio of requests)
+  hedge_requests: false
+  hedge_percentile: 95
+  hedge_max_ratio: 0.1
+  hedge_min_delay: 0.05
+  
+  # JSON library: auto, orjson, msgspec or stdlib
+  # (fast backends require: pip install letta-mcp-server[fast-json])
+  json_backend: auto
+  
+  # Emit compact JSON from resources and exports (false = indented)
+  compact_json: true
+
+deadlines:
+  # Total seconds a tool call may spend across all of its upstream requests,
+  # retries and queueing (defaults to the request timeout)
+  default: 60
+{tool_deadlines}
+cache:
+  # Keep agents, memory blocks and the tool catalog in memory for the read
+  # tools; write tools drop what they change
+  enabled: true
+  max_entries: 1024
+  
+  # Seconds each kind stays fresh (0 = do not cache)
+  ttl:
+    agent: 30
+    memory: 10
+    tools: 300
+    capabilities: 3600
+  
+  # Also keep agents, the tool catalog and endpoint capabilities on disk so
+  # new server processes (one per client session) start warm
+  disk: false
+  disk_dir: ~/.letta-mcp/cache
+  disk_max_mb: 50
 
 features:
   # Enable streaming responses
@@ -207,6 +731,9 @@ logging:
   # Optional log file path
   # file: ~/.letta-mcp/server.log
 """
+    config_content = config_content.replace("{tool_deadlines}\n", "".join(
+        f"  {name}: {seconds:g}\n" for name, seconds in DEFAULT_TOOL_DEADLINES.items()
+    ))
     
     with open(path, 'w') as f:
         f.write(config_content)
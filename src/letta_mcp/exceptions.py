@@ -149,4 +149,33 @@ class PermissionError(APIError):
             message=message,
             status_code=403,
             response_body=details
-        )
\ No newline at end of file
+        )
+
+class ConcurrencyLimitError(LettaMCPError):
+    """Raised when the client-side request queue is full"""
+    
+    def __init__(self, limit: int, queue_depth: int):
+        super().__init__(
+            message=f"Too many concurrent requests to Letta (limit {limit}, {queue_depth} queued)",
+            code="CONCURRENCY_LIMIT",
+            details={
+                "limit": limit,
+                "queue_depth": queue_depth
+            }
+        )
+
+class CircuitOpenError(LettaMCPError):
+    """Raised when requests to a failing endpoint are short-circuited"""
+    
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(
+            message=(
+                f"Letta endpoint '{endpoint}' is unavailable (circuit open); "
+                f"retry in {retry_in:.0f}s"
+            ),
+            code="CIRCUIT_OPEN",
+            details={
+                "endpoint": endpoint,
+                "retry_in_seconds": round(retry_in, 1)
+            }
+        )
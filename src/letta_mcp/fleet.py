@@ -0,0 +1,124 @@
+"""
+Fleet snapshots: agents exported and imported as NDJSON
+
+Each line holds one agent's portable configuration (name, description,
+system prompt, model, tags, memory blocks and tool names), so a fleet can be
+backed up or moved to another Letta server. Export and import both work
+through ``pipelined``, which keeps a bounded window of agents in flight and
+never holds the whole fleet in memory.
+"""
+
+import asyncio
+from collections import deque
+from typing import (
+    Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterable,
+    List, Tuple, TypeVar, Union
+)
+
+from .exceptions import ValidationError
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+SNAPSHOT_VERSION = 1
+
+# Memory block fields carried over to the new agent
+SNAPSHOT_BLOCK_FIELDS = ("label", "value", "limit", "description")
+
+def tool_names(agent: Dict[str, Any]) -> List[str]:
+    """Names of an agent's tools, whether listed as names or tool objects"""
+    return [
+        tool.get("name") if isinstance(tool, dict) else tool
+        for tool in agent.get("tools") or []
+    ]
+
+def agent_snapshot(agent: Dict[str, Any], blocks: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Portable snapshot of an agent and its memory blocks"""
+    return {
+        "version": SNAPSHOT_VERSION,
+        "id": agent.get("id"),
+        "name": agent.get("name"),
+        "description": agent.get("description"),
+        "system": agent.get("system"),
+        "model": agent.get("model"),
+        "embedding": agent.get("embedding"),
+        "tags": agent.get("tags") or [],
+        "tools": tool_names(agent),
+        "memory_blocks": [
+            {field: block[field] for field in SNAPSHOT_BLOCK_FIELDS if block.get(field) is not None}
+            for block in blocks
+        ]
+    }
+
+def create_payload(
+    snapshot: Any,
+    default_model: str,
+    default_embedding: str
+) -> Dict[str, Any]:
+    """Request body creating the agent described by a snapshot"""
+    if not isinstance(snapshot, dict) or not snapshot.get("name"):
+        raise ValidationError("Snapshot has no agent name")
+    if snapshot.get("version", SNAPSHOT_VERSION) > SNAPSHOT_VERSION:
+        raise ValidationError(f"Unsupported snapshot version: {snapshot['version']}")
+
+    payload = {
+        "name": snapshot["name"],
+        "description": snapshot.get("description") or "",
+        "memory_blocks": [
+            block for block in snapshot.get("memory_blocks") or []
+            if "label" in block and "value" in block
+        ],
+        "tools": snapshot.get("tools") or [],
+        "model": snapshot.get("model") or default_model,
+        "embedding": snapshot.get("embedding") or default_embedding
+    }
+    for field in ("system", "tags"):
+        if snapshot.get(field):
+            payload[field] = snapshot[field]
+    return payload
+
+async def _aiter(items: Union[Iterable[T], AsyncIterable[T]]) -> AsyncIterator[T]:
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+async def pipelined(
+    items: Union[Iterable[T], AsyncIterable[T]],
+    operation: Callable[[T], Awaitable[R]],
+    concurrency: int
+) -> AsyncIterator[Tuple[T, Union[R, Exception]]]:
+    """Run ``operation`` over ``items`` with at most ``concurrency`` in flight
+
+    Yields each item with its result, or the exception it raised, in input
+    order. The next item is only read once a slot frees up, so the source is
+    consumed as fast as results are used and never buffered whole.
+    """
+    window: Deque[Tuple[T, "asyncio.Future[R]"]] = deque()
+    source = _aiter(items).__aiter__()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(window) < concurrency:
+                try:
+                    item = await source.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                window.append((item, asyncio.ensure_future(operation(item))))
+
+            if not window:
+                return
+
+            item, task = window.popleft()
+            try:
+                outcome: Union[R, Exception] = await task
+            except Exception as e:
+                outcome = e
+            yield item, outcome
+    finally:
+        for _, task in window:
+            task.cancel()
+        await asyncio.gather(*(task for _, task in window), return_exceptions=True)
@@ -0,0 +1,183 @@
+"""
+In-memory search index over agent names and descriptions
+
+Lets ``letta_list_agents(filter=...)`` resolve agents without downloading and
+scanning the agent list on every call.
+"""
+
+import bisect
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case alphanumeric words of ``text``"""
+    return _TOKEN.findall(text.lower())
+
+def _suffixes(text: str) -> Set[str]:
+    return {token[start:] for token in tokenize(text) for start in range(len(token))}
+
+class AgentIndex:
+    """Word suffix index over agent summaries
+
+    Documents are agent summaries with at least ``id``, ``name`` and
+    ``description``. A query matches a document when it is a substring of
+    its name or description, as in the upstream filter. Every suffix of
+    every word is indexed, so a prefix lookup finds the words containing a
+    query word anywhere (e.g. "ill" in "billing"); candidates holding all
+    query words are then checked against the full query. Only queries with
+    no letters or digits fall back to a scan of the documents. Results are
+    ordered by name, then ID.
+
+    ``last_modified`` (or ``created_at``) is used as each document's
+    version, so a resync re-indexes only the agents that changed.
+    """
+
+    def __init__(self):
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._text: Dict[str, str] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._tokens: List[str] = []
+        self._tokens_dirty = False
+        self.synced_at: Optional[float] = None
+        self.queries = 0
+        self.scans = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    @property
+    def ready(self) -> bool:
+        return self.synced_at is not None
+
+    def age(self) -> float:
+        """Seconds since the last full sync (infinite if never synced)"""
+        return time.monotonic() - self.synced_at if self.synced_at is not None else float("inf")
+
+    @staticmethod
+    def _version(doc: Dict[str, Any]) -> Any:
+        return doc.get("last_modified") or doc.get("created_at")
+
+    def upsert(self, doc: Dict[str, Any]) -> None:
+        agent_id = doc["id"]
+        if agent_id in self._docs:
+            self.remove(agent_id)
+
+        text = f"{doc.get('name') or ''}\n{doc.get('description') or ''}".lower()
+        self._docs[agent_id] = doc
+        self._text[agent_id] = text
+        for token in _suffixes(text):
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                self._tokens_dirty = True
+            postings.add(agent_id)
+
+    def remove(self, agent_id: str) -> bool:
+        if agent_id not in self._docs:
+            return False
+
+        for token in _suffixes(self._text.pop(agent_id)):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.discard(agent_id)
+                if not postings:
+                    del self._postings[token]
+                    self._tokens_dirty = True
+        del self._docs[agent_id]
+        return True
+
+    def update(self, agent_id: str, changes: Dict[str, Any]) -> None:
+        """Apply changed fields to an indexed agent"""
+        doc = self._docs.get(agent_id)
+        if doc is not None:
+            self.upsert({**doc, **changes})
+
+    def sync(self, docs: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """Replace the indexed agents with ``docs``, re-indexing only changed ones"""
+        seen = set()
+        added = updated = 0
+        for doc in docs:
+            seen.add(doc["id"])
+            current = self._docs.get(doc["id"])
+            if current is None:
+                added += 1
+            elif self._version(current) != self._version(doc) or self._version(doc) is None:
+                updated += 1
+            else:
+                continue
+            self.upsert(doc)
+
+        removed = [agent_id for agent_id in self._docs if agent_id not in seen]
+        for agent_id in removed:
+            self.remove(agent_id)
+
+        self.synced_at = time.monotonic()
+        return {"added": added, "updated": updated, "removed": len(removed)}
+
+    def _prefixed(self, prefix: str) -> Set[str]:
+        if self._tokens_dirty:
+            self._tokens = sorted(self._postings)
+            self._tokens_dirty = False
+
+        ids: Set[str] = set()
+        start = bisect.bisect_left(self._tokens, prefix)
+        for token in self._tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            ids |= self._postings[token]
+        return ids
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        limit: Optional[int] = None,
+        name: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Agents whose name or description contains ``query`` and whose name contains ``name``"""
+        self.queries += 1
+        query_lower = (query or "").lower()
+        name_lower = (name or "").lower()
+
+        def matches(agent_id: str) -> bool:
+            doc = self._docs[agent_id]
+            return (
+                query_lower in self._text[agent_id]
+                and name_lower in (doc.get("name") or "").lower()
+            )
+
+        words = tokenize(f"{query_lower} {name_lower}")
+        candidates: Iterable[str]
+        if words:
+            found: Optional[Set[str]] = None
+            for word in words:
+                ids = self._prefixed(word)
+                found = ids if found is None else found & ids
+                if not found:
+                    break
+            candidates = found or ()
+        else:
+            if query_lower or name_lower:
+                # Punctuation-only queries have no words to look up
+                self.scans += 1
+            candidates = self._docs
+
+        results = sorted(
+            (agent_id for agent_id in candidates if matches(agent_id)),
+            key=lambda agent_id: ((self._docs[agent_id].get("name") or "").lower(), agent_id)
+        )
+        if limit is not None:
+            results = results[:limit]
+        return [self._docs[agent_id] for agent_id in results]
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "agents": len(self._docs),
+            "suffixes": len(self._postings),
+            "ready": self.ready,
+            "age_seconds": round(self.age(), 1) if self.ready else None,
+            "queries": self.queries,
+            "scans": self.scans
+        }
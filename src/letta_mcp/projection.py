@@ -0,0 +1,93 @@
+"""
+Field projection for read tool results
+
+Read tools accept ``fields``, a list of dotted paths such as ``agent.name``
+or ``history.*.content``, and return only those parts of their result.
+Projection builds new containers around the selected values, so pruned
+sub-objects are never copied or serialized, and cached values are never
+modified.
+"""
+
+from typing import Any, Dict, Iterable, Optional
+
+from .exceptions import ValidationError
+
+# Result keys kept by every projection, so callers can still tell success
+# from failure
+ENVELOPE_KEYS = ("success", "error")
+
+# Path segment matching every key of an object or every element of a list
+WILDCARD = "*"
+
+# A compiled projection: keys to keep, each mapped to the projection of its
+# value, or to None to keep the value whole
+FieldTree = Dict[str, Any]
+
+def compile_fields(fields: Iterable[str]) -> FieldTree:
+    """Merge dotted paths into a tree of the keys to keep"""
+    tree: FieldTree = {}
+    for path in fields:
+        parts = path.strip().split(".")
+        if not all(parts):
+            raise ValidationError(f"Invalid field path: {path!r}", field="fields")
+
+        node = tree
+        for part in parts[:-1]:
+            if part in node and node[part] is None:
+                # A shorter path already keeps this value whole
+                break
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = None
+
+    for key in ENVELOPE_KEYS:
+        tree.setdefault(key, None)
+    return tree
+
+def _merge(first: Optional[FieldTree], second: Optional[FieldTree]) -> Optional[FieldTree]:
+    if first is None or second is None:
+        return None
+    merged = dict(first)
+    for key, subtree in second.items():
+        merged[key] = _merge(merged[key], subtree) if key in merged else subtree
+    return merged
+
+def _element_tree(tree: FieldTree) -> Optional[FieldTree]:
+    """Projection applied to each element of a list
+    
+    A ``*`` step selects the elements themselves; any other key passes
+    through the list to the elements' own keys.
+    """
+    if WILDCARD not in tree:
+        return tree
+    rest = {key: subtree for key, subtree in tree.items() if key != WILDCARD}
+    return _merge(tree[WILDCARD], rest) if rest else tree[WILDCARD]
+
+def _apply(value: Any, tree: Optional[FieldTree]) -> Any:
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        element_tree = _element_tree(tree)
+        return [_apply(item, element_tree) for item in value]
+    if not isinstance(value, dict):
+        # Paths below a scalar select nothing further
+        return value
+
+    if WILDCARD in tree:
+        return {
+            key: _apply(item, tree.get(key, tree[WILDCARD]))
+            for key, item in value.items()
+        }
+    return {key: _apply(value[key], subtree) for key, subtree in tree.items() if key in value}
+
+def project(result: Any, tree: Optional[FieldTree]) -> Any:
+    """Keep only the parts of a tool result selected by ``tree``
+
+    Failed results are returned whole so no error detail is lost. Lists are
+    projected element by element, either through a ``*`` step
+    (``history.*.content``) or directly (``history.content``); paths that
+    do not exist are ignored.
+    """
+    if tree is None or (isinstance(result, dict) and result.get("success") is False):
+        return result
+    return _apply(result, tree)
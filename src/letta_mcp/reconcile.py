@@ -0,0 +1,98 @@
+"""
+Declarative agent reconciliation
+
+Desired agents are declared in YAML with the fields of a fleet snapshot and
+matched to live agents by name. Only what differs is written: one agent
+PATCH for changed settings and tools, one PATCH per changed memory block and
+one POST per missing block, so reconciling an unchanged fleet costs reads
+only. Fields left out of a declaration are not managed.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, List, Union
+
+import yaml
+
+from .exceptions import ValidationError
+from .fleet import tool_names
+
+# Agent settings compared and patched; tags and tools compare as sets
+MANAGED_FIELDS = ("description", "system", "model", "embedding", "tags", "tools")
+UNORDERED_FIELDS = frozenset({"tags", "tools"})
+
+# Memory block fields compared and patched, per block label
+MANAGED_BLOCK_FIELDS = ("value", "limit", "description")
+
+def load_desired_state(document: Any) -> List[Dict[str, Any]]:
+    """Validate a desired-state document: a mapping with an ``agents`` list, or the list itself"""
+    agents = document.get("agents") if isinstance(document, dict) else document
+    if not isinstance(agents, list):
+        raise ValidationError("Desired state must be a list of agents or a mapping with an 'agents' list")
+
+    names = set()
+    for spec in agents:
+        if not isinstance(spec, dict) or not spec.get("name"):
+            raise ValidationError("Every desired agent needs a name")
+        name = spec["name"]
+        unknown = sorted(set(spec) - {"name", "memory_blocks", *MANAGED_FIELDS})
+        if unknown:
+            raise ValidationError(f"Unknown fields for agent {name!r}: {', '.join(unknown)}")
+        if name in names:
+            raise ValidationError(f"Agent {name!r} is declared more than once")
+        names.add(name)
+        for block in spec.get("memory_blocks") or []:
+            if not isinstance(block, dict) or not block.get("label"):
+                raise ValidationError(f"Every memory block of agent {name!r} needs a label")
+    return agents
+
+def read_desired_state(path: Union[str, Path]) -> List[Dict[str, Any]]:
+    """Load and validate a desired-state YAML file"""
+    with open(Path(path).expanduser(), encoding="utf-8") as f:
+        return load_desired_state(yaml.safe_load(f))
+
+def plan_agent(
+    desired: Dict[str, Any],
+    agent: Dict[str, Any],
+    blocks: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Smallest set of writes bringing a live agent to its desired state"""
+    patch = {}
+    for field in MANAGED_FIELDS:
+        if field not in desired:
+            continue
+        want = desired[field]
+        have = tool_names(agent) if field == "tools" else agent.get(field)
+        if field in UNORDERED_FIELDS:
+            differs = set(want or []) != set(have or [])
+        else:
+            differs = want != have
+        if differs:
+            patch[field] = want
+
+    live_blocks = {block.get("label"): block for block in blocks}
+    update_blocks = []
+    create_blocks = []
+    for block in desired.get("memory_blocks") or []:
+        current = live_blocks.get(block["label"])
+        if current is None:
+            create_blocks.append(block)
+            continue
+        changes = {
+            field: block[field] for field in MANAGED_BLOCK_FIELDS
+            if field in block and block[field] != current.get(field)
+        }
+        if changes:
+            update_blocks.append({"id": current["id"], "label": block["label"], "changes": changes})
+
+    return {"patch": patch, "update_blocks": update_blocks, "create_blocks": create_blocks}
+
+def is_noop(plan: Dict[str, Any]) -> bool:
+    return not any(plan.values())
+
+def describe_plan(plan: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Changed field names and block labels of a plan, for reporting"""
+    return {
+        "fields": sorted(plan["patch"]),
+        "blocks_updated": [block["label"] for block in plan["update_blocks"]],
+        "blocks_created": [block["label"] for block in plan["create_blocks"]]
+    }
@@ -4,29 +4,110 @@ Letta MCP Server - Main server implementation using FastMCP
 """
 
 import os
-import json
+import time
+import math
+import hashlib
+import sqlite3
 import asyncio
+import inspect
 import logging
-from typing import Any, Dict, List, Optional, Union
+from typing import Annotated, Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
 from datetime import datetime
+from functools import partial, wraps
+from operator import itemgetter
+from pathlib import Path
 import httpx
-from fastmcp import FastMCP
+from fastmcp import Context, FastMCP
+from pydantic import Field
 
 from .config import LettaConfig, load_config
 from .models import AgentInfo, MemoryBlock, ToolInfo, Message, StreamChunk
-from .exceptions import LettaMCPError, APIError, ConfigurationError
+from .exceptions import LettaMCPError, APIError, ConfigurationError, ValidationError
 from .utils import (
     parse_message_response,
     format_memory_blocks,
     validate_agent_id,
     extract_assistant_message,
-    create_retry_client
+    create_retry_client,
+    decode_cursor,
+    encode_cursor,
+    iter_json_array,
+    parse_timestamp
 )
+from .cache import DiskCache, EntityCache
+from .capabilities import CapabilityRegistry, is_unsupported, rejects_parameter
+from .codec import get_codec
+from .fleet import agent_snapshot, create_payload, pipelined
+from .index import AgentIndex
+from .projection import compile_fields, project
+from .reconcile import describe_plan, is_noop, load_desired_state, plan_agent, read_desired_state
+from .transport import (
+    AdaptiveConcurrencyTransport,
+    CoalescedResponse,
+    CircuitBreakerTransport,
+    DeadlineTransport,
+    HedgingTransport,
+    HttpCacheTransport,
+    RateLimitTransport,
+    RoutingTransport,
+    SingleFlightTransport,
+    BACKEND_EXTENSION,
+    FRESH_READ_HEADERS,
+    STREAMED_REQUEST,
+    collect_metrics,
+    deadline,
+    find_layer,
+    priority
+)
+
+# Agent fields kept in the entity cache for letta_get_agent and letta_get_agent_tools
+AGENT_SUMMARY_FIELDS = (
+    "id", "name", "description", "model", "created_at", "last_modified", "tools", "message_count"
+)
+
+# Arguments of letta_create_agent accepted in letta_create_agents_bulk specs
+CREATE_AGENT_FIELDS = (
+    "name", "description", "human_memory", "persona_memory", "custom_blocks", "model", "tools"
+)
+
+# The ``fields`` argument added to read tools
+FieldsArgument = Annotated[
+    Optional[List[str]],
+    Field(description=(
+        "Dotted paths of the result to return, e.g. [\"agent.name\", \"agent.tools\"]; "
+        "'*' matches any key. Omit for the full result."
+    ))
+]
+
+# Fields letta_update_agents_bulk can change
+UPDATE_AGENT_FIELDS = ("name", "description", "model")
+
+# Page size used when letta_list_agents walks every page
+AGENT_PAGE_SIZE = 100
+
+def summarize_agent(agent: Dict[str, Any]) -> Dict[str, Any]:
+    """Agent fields returned by letta_list_agents"""
+    return {
+        "id": agent.get("id"),
+        "name": agent.get("name"),
+        "description": agent.get("description"),
+        "tool_count": len(agent.get("tools", [])),
+        "created_at": agent.get("created_at"),
+        "model": agent.get("model", "")
+    }
+
+def index_document(agent: Dict[str, Any]) -> Dict[str, Any]:
+    """Agent summary plus the version the agent index compares on resync"""
+    return {**summarize_agent(agent), "last_modified": agent.get("last_modified")}
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _log_agent_index_failure(sync: "asyncio.Future[Dict[str, int]]") -> None:
+    if not sync.cancelled() and sync.exception() is not None:
+        logger.warning(f"Agent index refresh failed: {sync.exception()}")
+
 class LettaMCPServer:
     """Main Letta MCP Server implementation"""
     
@@ -55,17 +136,27 @@ Remember: Letta agents maintain their own conversation history across all client
 """
         )
         
+        # JSON codec shared by response decoding and resource output
+        self.codec = get_codec(self.config.json_backend)
+        
         # Create HTTP client with retry logic
-        self.client = create_retry_client(
-            base_url=self.config.base_url,
-            headers={
-                "Authorization": f"Bearer {self.config.api_key}",
-                "Content-Type": "application/json"
-            },
-            timeout=self.config.timeout,
-            max_retries=self.config.max_retries
+        self.client = self.create_client()
+        
+        # Decoded agents, memory blocks and tool catalog for the read tools
+        self.cache = EntityCache(
+            ttls=self.config.entity_cache_ttls,
+            max_entries=self.config.entity_cache_max_entries,
+            enabled=self.config.entity_cache,
+            store=self._build_disk_cache()
         )
         
+        # Optional endpoints found missing are skipped in favour of fallbacks
+        self.capabilities = CapabilityRegistry(self.cache)
+        
+        # Agent name/description index, resynced when lookups find it due
+        self.agent_index = AgentIndex() if self.config.agent_index else None
+        self._agent_index_sync: Optional["asyncio.Future[Dict[str, int]]"] = None
+        
         # Register all tools
         self._register_tools()
         
@@ -74,12 +165,764 @@ Remember: Letta agents maintain their own conversation history across all client
     
     def validate_config(self):
         """Validate the configuration"""
-        if not self.config.api_key and self.config.base_url == "https://api.letta.com":
+        if not self.config.api_key and "https://api.letta.com" in self.config.backend_urls():
             raise ConfigurationError(
                 "LETTA_API_KEY is required for Letta Cloud. "
                 "Set it in environment or config file."
             )
     
+    def create_client(self, pool: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+        """Create the HTTP client and its transport layers from the configuration
+        
+        ``pool`` replaces the connection pool at the bottom of the stack.
+        """
+        return create_retry_client(
+            base_url=self.config.backend_urls()[0],
+            headers={
+                "Authorization": f"Bearer {self.config.api_key}",
+                "Content-Type": "application/json"
+            },
+            timeout=self.config.timeout,
+            max_retries=self.config.max_retries if self.config.enable_auto_retry else 0,
+            pool_size=self.config.connection_pool_size,
+            http2=self.config.http2,
+            keepalive_expiry=self.config.keepalive_expiry,
+            max_streams=self.config.http2_max_streams,
+            layers=self._build_transport_layers(),
+            retry_base_delay=self.config.retry_base_delay,
+            retry_max_delay=self.config.retry_max_delay,
+            retry_budget_ratio=self.config.retry_budget_ratio,
+            compression=self.config.compression,
+            connect_timeout=self.config.connect_timeout,
+            read_timeout=self.config.read_timeout,
+            write_timeout=self.config.write_timeout,
+            pool_timeout=self.config.pool_timeout,
+            router=self._build_router(),
+            cache=self._build_cache(),
+            pool=pool
+        )
+    
+    def _build_router(self) -> Optional[Callable[[httpx.AsyncBaseTransport], httpx.AsyncBaseTransport]]:
+        """Build the backend router when more than one Letta instance is configured"""
+        backends = self.config.backend_urls()
+        if len(backends) < 2:
+            return None
+        
+        return partial(
+            RoutingTransport,
+            backends=backends,
+            policy=self.config.routing_policy,
+            sticky=self.config.sticky_routing,
+            ejection_threshold=self.config.backend_ejection_threshold,
+            ejection_time=self.config.backend_ejection_time
+        )
+    
+    def _build_cache(self) -> Optional[Callable[[httpx.AsyncBaseTransport], httpx.AsyncBaseTransport]]:
+        """Build the conditional-GET response cache placed outside every other layer"""
+        if not self.config.http_cache:
+            return None
+        
+        return partial(
+            HttpCacheTransport,
+            ttl=self.config.http_cache_ttl,
+            max_entries=self.config.http_cache_max_entries,
+            max_entry_bytes=self.config.http_cache_max_entry_bytes
+        )
+    
+    def _build_disk_cache(self) -> Optional[DiskCache]:
+        """Open the shared on-disk entity store, if enabled"""
+        if not (self.config.entity_cache and self.config.disk_cache):
+            return None
+        
+        # Entries from different Letta servers or accounts never mix
+        scope = hashlib.blake2b(
+            f"{self.config.backend_urls()[0]}\n{self.config.api_key or ''}".encode(),
+            digest_size=8
+        ).hexdigest()
+        try:
+            return DiskCache(
+                self.config.disk_cache_dir,
+                scope=scope,
+                max_bytes=int(self.config.disk_cache_max_mb * 1024 * 1024),
+                codec=self.codec
+            )
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Disk cache disabled: {e}")
+            return None
+    
+    def _build_transport_layers(self) -> List[Callable[[httpx.AsyncBaseTransport], httpx.AsyncBaseTransport]]:
+        """Build the transport layers wrapped around the connection pool, innermost first"""
+        layers = []
+        
+        if self.config.adaptive_concurrency:
+            # Requests beyond the pool's capacity would only queue for a
+            # connection, hiding the latency the limiter reacts to
+            capacity = self.config.pool_capacity()
+            layers.append(partial(
+                AdaptiveConcurrencyTransport,
+                initial_limit=self.config.connection_pool_size,
+                min_limit=min(self.config.concurrency_min_limit, capacity),
+                max_limit=min(self.config.concurrency_max_limit, capacity),
+                max_queue=self.config.concurrency_max_queue,
+                scheduling=self.config.priority_scheduling,
+                weights=self.config.priority_weights
+            ))
+        
+        if self.config.respect_rate_limits:
+            layers.append(partial(
+                RateLimitTransport,
+                rate=self.config.rate_limit_per_second,
+                burst=self.config.rate_limit_burst,
+                max_wait=self.config.rate_limit_max_wait,
+                max_attempts=self.config.max_retries + 1
+            ))
+        
+        if self.config.circuit_breaker:
+            layers.append(partial(
+                CircuitBreakerTransport,
+                failure_threshold=self.config.circuit_failure_threshold,
+                reset_timeout=self.config.circuit_reset_timeout
+            ))
+        
+        if self.config.hedge_requests:
+            layers.append(partial(
+                HedgingTransport,
+                percentile=self.config.hedge_percentile,
+                max_ratio=self.config.hedge_max_ratio,
+                min_delay=self.config.hedge_min_delay
+            ))
+        
+        if self.config.coalesce_requests:
+            layers.append(partial(SingleFlightTransport, loads=self.codec.loads))
+        
+        # Outermost, so queueing and retries in every layer count against the deadline
+        layers.append(DeadlineTransport)
+        
+        return layers
+    
+    def _tool(
+        self,
+        priority_class: str = "standard",
+        projectable: bool = False
+    ) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """Register an MCP tool whose calls run under its deadline budget and priority class
+        
+        ``priority_class`` is "interactive" for calls a user is waiting on,
+        "standard", or "bulk" for sweeps that should yield to the others.
+        ``projectable`` read tools gain a ``fields`` argument selecting the
+        parts of the result to return.
+        """
+        def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+            budget = self.config.deadline_for(fn.__name__)
+            
+            @wraps(fn)
+            async def scheduled(*args: Any, fields: Optional[List[str]] = None, **kwargs: Any) -> Any:
+                try:
+                    tree = compile_fields(fields) if fields else None
+                except ValidationError as e:
+                    return {"success": False, "error": str(e)}
+                
+                with deadline(budget, operation=fn.__name__), priority(priority_class):
+                    return project(await fn(*args, **kwargs), tree)
+            
+            if projectable:
+                signature = inspect.signature(fn)
+                scheduled.__signature__ = signature.replace(parameters=[
+                    *signature.parameters.values(),
+                    inspect.Parameter(
+                        "fields", inspect.Parameter.KEYWORD_ONLY, default=None, annotation=FieldsArgument
+                    )
+                ])
+                scheduled.__annotations__ = {**fn.__annotations__, "fields": FieldsArgument}
+            
+            self.mcp.tool()(scheduled)
+            return scheduled
+        
+        return decorator
+    
+    def _decode_json(self, response: httpx.Response) -> Any:
+        """Decode a response body with the configured JSON codec"""
+        if isinstance(response, CoalescedResponse):
+            # Coalesced callers share a single parse made with the same codec
+            return response.json()
+        return self.codec.loads(response.content)
+    
+    async def _get_json(self, path: str, fresh: bool = False) -> Any:
+        """GET ``path`` and decode the response body, bypassing the HTTP cache when ``fresh``"""
+        response = await self.client.get(path, headers=FRESH_READ_HEADERS if fresh else None)
+        response.raise_for_status()
+        return self._decode_json(response)
+    
+    async def _get_agent(self, agent_id: str) -> Dict[str, Any]:
+        """Fetch an agent summary through the entity cache"""
+        return await self.cache.get_or_load("agent", agent_id, partial(self._load_agent, agent_id))
+    
+    async def _load_agent(self, agent_id: str) -> Dict[str, Any]:
+        """Fetch an agent, keeping the fields the agent tools report
+        
+        Memory blocks are reduced to their IDs and labels so block contents
+        are never cached, in memory or on disk.
+        """
+        agent = await self._get_json(f"/v1/agents/{agent_id}")
+        summary = {key: agent[key] for key in AGENT_SUMMARY_FIELDS if key in agent}
+        summary["memory_blocks"] = [
+            {"id": block.get("id"), "label": block.get("label")}
+            for block in agent.get("memory_blocks", [])
+        ]
+        return summary
+    
+    def _bulk_concurrency(self, requested: Optional[int]) -> int:
+        """Concurrency for a bulk tool call, capped at the configured limit"""
+        return max(min(requested or self.config.bulk_concurrency, self.config.bulk_concurrency), 1)
+    
+    async def _run_bulk(
+        self,
+        items: List[Any],
+        concurrency: int,
+        operation: Callable[[Any], Awaitable[Dict[str, Any]]],
+        ctx: Optional[Context] = None,
+        offset: int = 0,
+        total: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], float]:
+        """Run ``operation`` over ``items`` at most ``concurrency`` at a time
+        
+        Returns one result per item, in input order, each tagged with its
+        index and duration, and the total wall time in milliseconds. With a
+        request ``ctx``, progress is reported to the client as items finish.
+        ``offset`` and ``total`` place ``items`` within a larger batched run
+        for the reported indexes and progress.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        start = time.monotonic()
+        finished = 0
+        
+        async def run(index: int, item: Any) -> Dict[str, Any]:
+            nonlocal finished
+            async with semaphore:
+                step = time.monotonic()
+                try:
+                    result = await operation(item)
+                except Exception as e:
+                    result = {"success": False, "error": str(e)}
+                duration_ms = round((time.monotonic() - step) * 1000, 1)
+            
+            finished += 1
+            if ctx is not None:
+                await ctx.report_progress(offset + finished, total or len(items))
+            return {"index": index, **result, "duration_ms": duration_ms}
+        
+        results = await asyncio.gather(*(run(index, item) for index, item in enumerate(items, offset)))
+        return list(results), round((time.monotonic() - start) * 1000, 1)
+    
+    @staticmethod
+    def _bulk_report(outcome: Tuple[List[Dict[str, Any]], float], verb: str) -> Dict[str, Any]:
+        results, wall_ms = outcome
+        failed = sum(1 for result in results if not result["success"])
+        return {
+            "success": failed == 0,
+            verb: len(results) - failed,
+            "failed": failed,
+            "results": results,
+            "duration_ms": wall_ms
+        }
+    
+    async def _select_agents(
+        self,
+        agent_ids: Optional[List[str]],
+        name: Optional[str],
+        model: Optional[str],
+        created_after: Optional[str],
+        created_before: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """Resolve the agents a bulk update or delete applies to
+        
+        Takes either explicit IDs or a selector (name substring, exact model,
+        created_at range). Selectors are resolved from a fresh upstream
+        listing, never the agent index, since the result is written to.
+        """
+        selector = (name, model, created_after, created_before)
+        if agent_ids is not None:
+            if any(value is not None for value in selector):
+                raise ValidationError("Pass either agent_ids or selector filters, not both")
+            for agent_id in agent_ids:
+                validate_agent_id(agent_id)
+            return [{"id": agent_id} for agent_id in dict.fromkeys(agent_ids)]
+        
+        if all(value is None for value in selector):
+            raise ValidationError(
+                "Pass agent_ids or at least one of name, model, created_after, created_before"
+            )
+        
+        after = parse_timestamp(created_after, "created_after") if created_after else None
+        before = parse_timestamp(created_before, "created_before") if created_before else None
+        name_lower = (name or "").lower()
+        
+        def matches(agent: Dict[str, Any]) -> bool:
+            if name_lower not in (agent.get("name") or "").lower():
+                return False
+            if model is not None and agent.get("model") != model:
+                return False
+            if after is None and before is None:
+                return True
+            try:
+                created_at = parse_timestamp(agent.get("created_at") or "")
+            except ValidationError:
+                return False
+            return (after is None or created_at >= after) and (before is None or created_at < before)
+        
+        listing = await self._list_agent_pages(matches, math.inf, 0, name, fresh=True)
+        return listing["agents"]
+    
+    async def _bulk_agent_operation(
+        self,
+        verb: str,
+        operation: Callable[..., Awaitable[Dict[str, Any]]],
+        selector: Dict[str, Any],
+        dry_run: bool,
+        concurrency: Optional[int],
+        ctx: Optional[Context]
+    ) -> Dict[str, Any]:
+        """Resolve the selected agents and run ``operation(agent_id=...)`` on each
+        
+        A dry run lists every match. A real run works through the matches in
+        batches of ``bulk_max_items``, one batch after the other.
+        """
+        try:
+            targets = await self._select_agents(**selector)
+        except Exception as e:
+            logger.error(f"Error selecting agents: {e}")
+            return {"success": False, "error": str(e)}
+        
+        if dry_run:
+            return {
+                "success": True,
+                "dry_run": True,
+                "matched": len(targets),
+                "agents": [{"id": agent["id"], "name": agent.get("name")} for agent in targets]
+            }
+        
+        async def run(agent: Dict[str, Any]) -> Dict[str, Any]:
+            result = await operation(agent_id=agent["id"])
+            return {
+                "agent_id": agent["id"],
+                "success": result["success"],
+                **({} if result["success"] else {"error": result["error"]})
+            }
+        
+        start = time.monotonic()
+        batch_size = self.config.bulk_max_items
+        results: List[Dict[str, Any]] = []
+        for offset in range(0, len(targets), batch_size):
+            batch, _ = await self._run_bulk(
+                targets[offset:offset + batch_size], self._bulk_concurrency(concurrency), run, ctx,
+                offset=offset, total=len(targets)
+            )
+            results.extend(batch)
+        return self._bulk_report((results, round((time.monotonic() - start) * 1000, 1)), verb)
+    
+    async def _iter_agent_ids(self) -> AsyncIterator[str]:
+        """Yield every agent ID, listing one page at a time"""
+        offset = 0
+        while True:
+            agent_ids, _ = await self._fetch_agent_page(offset, AGENT_PAGE_SIZE, summarize=itemgetter("id"))
+            for agent_id in agent_ids:
+                yield agent_id
+            if len(agent_ids) < AGENT_PAGE_SIZE:
+                return
+            offset += AGENT_PAGE_SIZE
+    
+    async def _load_live_agent(self, agent_id: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """Fetch the full agent record and its memory blocks in parallel, bypassing the cache"""
+        agent, blocks = await asyncio.gather(
+            self._get_json(f"/v1/agents/{agent_id}", fresh=True),
+            self._get_json(f"/v1/agents/{agent_id}/memory-blocks", fresh=True)
+        )
+        return agent, blocks
+    
+    async def _load_agent_snapshot(self, agent_id: str) -> Dict[str, Any]:
+        return agent_snapshot(*await self._load_live_agent(agent_id))
+    
+    async def export_fleet(
+        self,
+        write: Callable[[str], Any],
+        concurrency: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Write a snapshot of every agent to ``write`` as NDJSON lines
+        
+        Snapshots are fetched ``concurrency`` agents at a time while the
+        listing is paged through, and written in listing order as they
+        arrive. Agents that fail to load are reported and skipped.
+        """
+        start = time.monotonic()
+        exported = 0
+        failures = []
+        with priority("bulk"):
+            async for agent_id, outcome in pipelined(
+                self._iter_agent_ids(), self._load_agent_snapshot, self._bulk_concurrency(concurrency)
+            ):
+                if isinstance(outcome, Exception):
+                    failures.append({"agent_id": agent_id, "error": str(outcome)})
+                    continue
+                write(self.codec.dumps(outcome) + "\n")
+                exported += 1
+        
+        return {
+            "success": not failures,
+            "exported": exported,
+            "failed": len(failures),
+            "failures": failures,
+            "duration_ms": round((time.monotonic() - start) * 1000, 1)
+        }
+    
+    async def export_fleet_to(
+        self,
+        path: Union[str, Path],
+        concurrency: Optional[int] = None,
+        overwrite: bool = False
+    ) -> Dict[str, Any]:
+        """Export the fleet to ``path``, which appears only once the export finishes
+        
+        An existing file is refused unless ``overwrite`` is set, both before
+        the export starts and when the finished file is moved into place. On
+        filesystems without hard links the finished file is checked for and
+        renamed instead, which narrows the race rather than closing it.
+        """
+        target = Path(path).expanduser()
+        if not overwrite and os.path.lexists(target):
+            raise ValidationError(f"{target} already exists; pass overwrite=True to replace it", field="path")
+        
+        staging = target.with_name(target.name + ".partial")
+        try:
+            with open(staging, "w", encoding="utf-8") as out:
+                result = await self.export_fleet(out.write, concurrency)
+            if overwrite:
+                os.replace(staging, target)
+            else:
+                try:
+                    # Fails if the target appeared meanwhile, unlike a rename
+                    os.link(staging, target)
+                except FileExistsError:
+                    raise ValidationError(
+                        f"{target} already exists; pass overwrite=True to replace it", field="path"
+                    ) from None
+                except OSError:
+                    # No hard links here (e.g. FAT, some network mounts)
+                    if os.path.lexists(target):
+                        raise ValidationError(
+                            f"{target} already exists; pass overwrite=True to replace it", field="path"
+                        ) from None
+                    os.replace(staging, target)
+        finally:
+            staging.unlink(missing_ok=True)
+        return {**result, "path": str(target)}
+    
+    async def import_fleet(
+        self,
+        lines: Iterable[str],
+        concurrency: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Create an agent for each NDJSON snapshot line
+        
+        Lines are read only as creates complete, at most ``concurrency`` in
+        flight, so the input is never loaded whole. Lines that fail to parse
+        or create are reported by line number.
+        """
+        async def create(entry: Tuple[int, str]) -> Dict[str, Any]:
+            payload = create_payload(
+                self.codec.loads(entry[1]), self.config.default_model, self.config.default_embedding
+            )
+            response = await self.client.post("/v1/agents", json=payload)
+            response.raise_for_status()
+            
+            agent = self._decode_json(response)
+            if self.agent_index is not None:
+                self.agent_index.upsert(index_document(agent))
+            return agent
+        
+        start = time.monotonic()
+        created = 0
+        failures = []
+        numbered = ((number, line) for number, line in enumerate(lines, 1) if line.strip())
+        with priority("bulk"):
+            async for (number, _), outcome in pipelined(numbered, create, self._bulk_concurrency(concurrency)):
+                if isinstance(outcome, Exception):
+                    failures.append({"line": number, "error": str(outcome)})
+                else:
+                    created += 1
+        
+        return {
+            "success": not failures,
+            "created": created,
+            "failed": len(failures),
+            "failures": failures,
+            "duration_ms": round((time.monotonic() - start) * 1000, 1)
+        }
+    
+    async def _live_agent_ids(self) -> Dict[str, List[str]]:
+        """Live agent IDs by name, from a fresh upstream listing"""
+        agents = (await self._list_agent_pages(lambda agent: True, math.inf, 0, None, fresh=True))["agents"]
+        
+        ids: Dict[str, List[str]] = {}
+        for agent in agents:
+            ids.setdefault(agent.get("name"), []).append(agent["id"])
+        return ids
+    
+    async def _apply_plan(self, agent_id: str, plan: Dict[str, Any]) -> None:
+        """Send the writes of a reconciliation plan: agent PATCH first, then memory blocks"""
+        try:
+            if plan["patch"]:
+                response = await self.client.patch(f"/v1/agents/{agent_id}", json=plan["patch"])
+                response.raise_for_status()
+                if self.agent_index is not None:
+                    self.agent_index.update(agent_id, {
+                        field: plan["patch"][field] for field in ("description", "model") if field in plan["patch"]
+                    })
+            
+            writes = [
+                self.client.patch(f"/v1/agents/{agent_id}/memory-blocks/{block['id']}", json=block["changes"])
+                for block in plan["update_blocks"]
+            ] + [
+                self.client.post(f"/v1/agents/{agent_id}/memory-blocks", json=block)
+                for block in plan["create_blocks"]
+            ]
+            for outcome in await asyncio.gather(*writes, return_exceptions=True):
+                if isinstance(outcome, Exception):
+                    raise outcome
+                outcome.raise_for_status()
+        finally:
+            self.cache.invalidate_agent(agent_id)
+    
+    async def _sync_agent(
+        self,
+        spec: Dict[str, Any],
+        live_ids: Dict[str, List[str]],
+        dry_run: bool
+    ) -> Dict[str, Any]:
+        """Reconcile one declared agent, creating it if no live agent has its name"""
+        name = spec["name"]
+        matches = live_ids.get(name, [])
+        try:
+            if len(matches) > 1:
+                raise ValidationError(f"{len(matches)} live agents are named {name!r}")
+            
+            if not matches:
+                if dry_run:
+                    return {"success": True, "name": name, "action": "create"}
+                payload = create_payload(spec, self.config.default_model, self.config.default_embedding)
+                response = await self.client.post("/v1/agents", json=payload)
+                response.raise_for_status()
+                agent = self._decode_json(response)
+                if self.agent_index is not None:
+                    self.agent_index.upsert(index_document(agent))
+                return {"success": True, "name": name, "agent_id": agent["id"], "action": "create"}
+            
+            agent_id = matches[0]
+            plan = plan_agent(spec, *await self._load_live_agent(agent_id))
+            if is_noop(plan):
+                return {"success": True, "name": name, "agent_id": agent_id, "action": "none"}
+            if not dry_run:
+                await self._apply_plan(agent_id, plan)
+            return {
+                "success": True,
+                "name": name,
+                "agent_id": agent_id,
+                "action": "update",
+                "changes": describe_plan(plan)
+            }
+        except Exception as e:
+            logger.error(f"Error syncing agent {name}: {e}")
+            return {"success": False, "name": name, "error": str(e)}
+    
+    async def sync_fleet(
+        self,
+        desired: List[Dict[str, Any]],
+        dry_run: bool = False,
+        concurrency: Optional[int] = None,
+        ctx: Optional[Context] = None
+    ) -> Dict[str, Any]:
+        """Reconcile live agents with a desired state from ``load_desired_state``
+        
+        Live agents are matched by name against a fresh upstream listing,
+        fetched ``concurrency`` at a time and diffed; only the differences
+        are written. Agents that are not declared are left alone. With
+        ``dry_run`` nothing is written and the counts say what would change.
+        """
+        with priority("bulk"):
+            live_ids = await self._live_agent_ids()
+            results, wall_ms = await self._run_bulk(
+                desired,
+                self._bulk_concurrency(concurrency),
+                partial(self._sync_agent, live_ids=live_ids, dry_run=dry_run),
+                ctx
+            )
+        
+        actions = [result.get("action") for result in results if result["success"]]
+        failed = len(results) - len(actions)
+        return {
+            "success": failed == 0,
+            "dry_run": dry_run,
+            "created": actions.count("create"),
+            "updated": actions.count("update"),
+            "unchanged": actions.count("none"),
+            "failed": failed,
+            "results": results,
+            "duration_ms": wall_ms
+        }
+    
+    async def _create_one_agent(self, spec: Any) -> Dict[str, Any]:
+        """Create one agent of a bulk request, reporting its ID instead of the full record"""
+        if not isinstance(spec, dict) or not spec.get("name"):
+            return {"success": False, "error": "Each agent spec needs a name"}
+        
+        unknown = sorted(set(spec) - set(CREATE_AGENT_FIELDS))
+        if unknown:
+            return {"success": False, "name": spec["name"], "error": f"Unknown fields: {', '.join(unknown)}"}
+        
+        result = await self._call_tool("letta_create_agent", **spec)
+        if not result["success"]:
+            return {"success": False, "name": spec["name"], "error": result["error"]}
+        return {"success": True, "name": spec["name"], "agent_id": result["agent"]["id"]}
+    
+    async def _fetch_agent_page(
+        self,
+        offset: int,
+        limit: int,
+        name: Optional[str] = None,
+        summarize: Callable[[Dict[str, Any]], Dict[str, Any]] = summarize_agent,
+        use_query: bool = True,
+        fresh: bool = False
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Fetch one page of agent summaries and the X-Total-Count header
+        
+        ``name`` is sent as ``query_text`` unless the server is known to
+        reject it; callers still match names locally since servers that
+        ignore the parameter return every agent. A rejection is recorded and
+        the page fetched once more without it. ``fresh`` bypasses the HTTP
+        cache.
+        """
+        params: Dict[str, Any] = {"limit": limit, "offset": offset}
+        if name and use_query and self.capabilities.supported("agent_name_search") is not False:
+            params["query_text"] = name
+        
+        summaries = []
+        total = None
+        async with self.client.stream(
+            "GET", "/v1/agents", params=params, extensions=STREAMED_REQUEST,
+            headers=FRESH_READ_HEADERS if fresh else None
+        ) as response:
+            rejected = False
+            if "query_text" in params and response.status_code in (400, 422):
+                await response.aread()
+                rejected = rejects_parameter(response, "query_text")
+            if not rejected:
+                response.raise_for_status()
+                total = response.headers.get("X-Total-Count")
+                
+                # Keep only the summary of each agent as it is decoded
+                async for agent in iter_json_array(response.aiter_bytes()):
+                    summaries.append(summarize(agent))
+        
+        if rejected:
+            self.capabilities.record("agent_name_search", False)
+            return await self._fetch_agent_page(offset, limit, name, summarize, use_query=False, fresh=fresh)
+        if "query_text" in params and self.capabilities.supported("agent_name_search") is None:
+            self.capabilities.record("agent_name_search", True)
+        return summaries, total
+    
+    async def _list_agent_pages(
+        self,
+        matches: Callable[[Dict[str, Any]], bool],
+        limit: float,
+        offset: int,
+        name: Optional[str],
+        summarize: Callable[[Dict[str, Any]], Dict[str, Any]] = summarize_agent,
+        fresh: bool = False
+    ) -> Dict[str, Any]:
+        """Collect up to ``limit`` matching agents across pages
+        
+        The first page is fetched alone, since it usually holds every agent;
+        later pages are fetched ``pagination_concurrency`` at a time and
+        consumed in order, cancelling the rest once ``limit`` is reached.
+        ``fresh`` bypasses the HTTP cache.
+        """
+        found: List[Dict[str, Any]] = []
+        page_size = AGENT_PAGE_SIZE
+        pages = 0
+        total: Optional[str] = None
+        window = 1
+        
+        while True:
+            offsets = [offset + i * page_size for i in range(window)]
+            if total is not None and total.isdigit():
+                offsets = [page_offset for page_offset in offsets if page_offset < int(total)]
+            if not offsets:
+                next_offset = None
+                break
+            
+            tasks = [
+                asyncio.ensure_future(self._fetch_agent_page(page_offset, page_size, name, summarize, fresh=fresh))
+                for page_offset in offsets
+            ]
+            next_offset = None
+            try:
+                for page_offset, task in zip(offsets, tasks, strict=True):
+                    summaries, page_total = await task
+                    pages += 1
+                    total = page_total if page_total is not None else total
+                    
+                    for index, agent in enumerate(summaries):
+                        if matches(agent):
+                            found.append(agent)
+                            if len(found) >= limit:
+                                next_offset = page_offset + index + 1
+                                break
+                    else:
+                        next_offset = page_offset + page_size if len(summaries) == page_size else None
+                    
+                    if next_offset is None or len(found) >= limit:
+                        break
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+            
+            if next_offset is None or len(found) >= limit:
+                break
+            offset = next_offset
+            window = self.config.pagination_concurrency
+        
+        return {
+            "count": len(found),
+            "total": total if total is not None else len(found),
+            "agents": found,
+            "pages_fetched": pages,
+            "next_cursor": encode_cursor(next_offset, name=name) if next_offset is not None else None
+        }
+    
+    async def _load_tool_catalog(self) -> List[Dict[str, Any]]:
+        """Stream the tool catalog, keeping only the fields the listing tools report"""
+        catalog = []
+        async with self.client.stream(
+            "GET", "/v1/tools", extensions=STREAMED_REQUEST
+        ) as response:
+            response.raise_for_status()
+            
+            # Decode item by item so source code and schemas are never held
+            async for tool in iter_json_array(response.aiter_bytes()):
+                catalog.append({
+                    key: tool[key] for key in ("id", "name", "description", "tags") if key in tool
+                })
+        return catalog
+    
+    def _dump_json(self, data: Any) -> str:
+        """Serialize tool output for resources and exports"""
+        return self.codec.dumps(data, indent=not self.config.compact_json)
+    
+    async def _call_tool(self, tool_name: str, **kwargs: Any) -> Dict[str, Any]:
+        """Invoke a registered tool's function directly"""
+        tool = await self.mcp.get_tool(tool_name)
+        return await tool.fn(**kwargs)
+    
     def _register_tools(self):
         """Register all MCP tools"""
         # Agent Management
@@ -100,57 +943,74 @@ Remember: Letta agents maintain their own conversation history across all client
     def _register_agent_tools(self):
         """Register agent management tools"""
         
-        @self.mcp.tool()
+        @self._tool(projectable=True)
         async def letta_list_agents(
             filter: Optional[str] = None,
             limit: int = 50,
-            offset: int = 0
+            offset: int = 0,
+            name: Optional[str] = None,
+            all_pages: bool = False,
+            cursor: Optional[str] = None
         ) -> Dict[str, Any]:
             """
             List all available Letta agents with pagination support.
             
             Args:
-                filter: Optional text to filter agent names
-                limit: Number of agents to return (max 100)
+                filter: Optional text to filter agent names and descriptions
+                limit: Number of agents to return (max 100, or 1000 with all_pages)
                 offset: Offset for pagination
+                name: Only agents whose name contains this text (searched by
+                    the server where supported)
+                all_pages: Keep fetching pages until limit matches are found
+                    or the list ends, instead of filtering a single page
+                cursor: next_cursor from a previous all_pages call, to resume it
             
             Returns:
                 List of agent summaries (id, name, description, tool_count, created_at, model)
                 to stay within token limits. Use letta_get_agent for full details.
+                With all_pages, next_cursor resumes the listing (None when complete).
             """
             try:
-                params = {"limit": min(limit, 100), "offset": offset}
-                response = await self.client.get("/v1/agents", params=params)
-                response.raise_for_status()
+                filter_lower = filter.lower() if filter else None
+                name_lower = name.lower() if name else None
+                
+                def matches(agent: Dict[str, Any]) -> bool:
+                    if name_lower and name_lower not in (agent.get("name") or "").lower():
+                        return False
+                    return not filter_lower or (
+                        filter_lower in (agent.get("name") or "").lower() or
+                        filter_lower in (agent.get("description") or "").lower()
+                    )
+                
+                if cursor:
+                    offset = decode_cursor(cursor, name=name)
+                
+                if (filter or name) and offset == 0 and self._agent_index_fresh():
+                    # Resolve from the local index instead of scanning the list upstream
+                    found = self.agent_index.search(filter, min(limit, 1000 if all_pages else 100), name)
+                    return {
+                        "success": True,
+                        "count": len(found),
+                        "total": len(self.agent_index),
+                        "agents": [summarize_agent(agent) for agent in found],
+                        "source": "index",
+                        **({"next_cursor": None} if all_pages else {})
+                    }
                 
-                agents = response.json()
-                
-                # Apply filter if provided
-                if filter:
-                    filter_lower = filter.lower()
-                    agents = [
-                        a for a in agents 
-                        if filter_lower in a.get("name", "").lower() or
-                           filter_lower in a.get("description", "").lower()
-                    ]
-                
-                # Return summarized agents to stay under token limit
-                summarized_agents = []
-                for agent in agents:
-                    summarized_agents.append({
-                        "id": agent.get("id"),
-                        "name": agent.get("name"),
-                        "description": agent.get("description"),
-                        "tool_count": len(agent.get("tools", [])),
-                        "created_at": agent.get("created_at"),
-                        "model": agent.get("model", "")
-                    })
+                if not all_pages:
+                    summaries, total = await self._fetch_agent_page(offset, min(limit, 100), name)
+                    summarized_agents = [agent for agent in summaries if matches(agent)]
+                    
+                    return {
+                        "success": True,
+                        "count": len(summarized_agents),
+                        "total": total if total is not None else len(summarized_agents),
+                        "agents": summarized_agents
+                    }
                 
                 return {
                     "success": True,
-                    "count": len(summarized_agents),
-                    "total": response.headers.get("X-Total-Count", len(agents)),
-                    "agents": summarized_agents
+                    **await self._list_agent_pages(matches, min(limit, 1000), offset, name)
                 }
                 
             except httpx.HTTPError as e:
@@ -160,7 +1020,7 @@ Remember: Letta agents maintain their own conversation history across all client
                 logger.error(f"Error listing agents: {e}")
                 return {"success": False, "error": str(e)}
         
-        @self.mcp.tool()
+        @self._tool()
         async def letta_create_agent(
             name: str,
             description: Optional[str] = None,
@@ -230,7 +1090,9 @@ Remember: Letta agents maintain their own conversation history across all client
                 response = await self.client.post("/v1/agents", json=payload)
                 response.raise_for_status()
                 
-                agent = response.json()
+                agent = self._decode_json(response)
+                if self.agent_index is not None:
+                    self.agent_index.upsert(index_document(agent))
                 
                 return {
                     "success": True,
@@ -245,16 +1107,45 @@ Remember: Letta agents maintain their own conversation history across all client
                 logger.error(f"Error creating agent: {e}")
                 return {"success": False, "error": str(e)}
         
-        @self.mcp.tool()
+        @self._tool(priority_class="bulk")
+        async def letta_create_agents_bulk(
+            agents: List[Dict[str, Any]],
+            concurrency: Optional[int] = None,
+            ctx: Optional[Context] = None
+        ) -> Dict[str, Any]:
+            """
+            Create several Letta agents in one call.
+            
+            Args:
+                agents: Agent specs, each with the arguments of letta_create_agent
+                    (name required; description, human_memory, persona_memory,
+                    custom_blocks, model, tools optional)
+                concurrency: Agents created at once (default and maximum: from config)
+            
+            Returns:
+                Per-agent results in input order (agent_id or error), counts of
+                created and failed agents, and total wall time
+            """
+            if not agents:
+                return {"success": False, "error": "No agents provided"}
+            if len(agents) > self.config.bulk_max_items:
+                return {
+                    "success": False,
+                    "error": f"At most {self.config.bulk_max_items} agents can be created per call"
+                }
+            
+            results = await self._run_bulk(
+                agents, self._bulk_concurrency(concurrency), self._create_one_agent, ctx
+            )
+            return self._bulk_report(results, "created")
+        
+        @self._tool(projectable=True)
         async def letta_get_agent(agent_id: str) -> Dict[str, Any]:
             """Get detailed information about a specific Letta agent."""
             try:
                 validate_agent_id(agent_id)
                 
-                response = await self.client.get(f"/v1/agents/{agent_id}")
-                response.raise_for_status()
-                
-                agent = response.json()
+                agent = await self._get_agent(agent_id)
                 
                 # Format the response nicely
                 return {
@@ -276,7 +1167,7 @@ Remember: Letta agents maintain their own conversation history across all client
                 logger.error(f"Error getting agent info: {e}")
                 return {"success": False, "error": str(e)}
         
-        @self.mcp.tool()
+        @self._tool()
         async def letta_update_agent(
             agent_id: str,
             name: Optional[str] = None,
@@ -307,6 +1198,9 @@ Remember: Letta agents maintain their own conversation history across all client
                     json=updates
                 )
                 response.raise_for_status()
+                self.cache.invalidate("agent", agent_id)
+                if self.agent_index is not None:
+                    self.agent_index.update(agent_id, updates)
                 
                 return {
                     "success": True,
@@ -318,7 +1212,7 @@ Remember: Letta agents maintain their own conversation history across all client
                 logger.error(f"Error updating agent: {e}")
                 return {"success": False, "error": str(e)}
         
-        @self.mcp.tool()
+        @self._tool()
         async def letta_delete_agent(
             agent_id: str,
             confirm: bool = False
@@ -344,6 +1238,9 @@ Remember: Letta agents maintain their own conversation history across all client
                 
                 response = await self.client.delete(f"/v1/agents/{agent_id}")
                 response.raise_for_status()
+                self.cache.invalidate_agent(agent_id)
+                if self.agent_index is not None:
+                    self.agent_index.remove(agent_id)
                 
                 return {
                     "success": True,
@@ -353,11 +1250,179 @@ Remember: Letta agents maintain their own conversation history across all client
             except Exception as e:
                 logger.error(f"Error deleting agent: {e}")
                 return {"success": False, "error": str(e)}
+        
+        @self._tool(priority_class="bulk")
+        async def letta_update_agents_bulk(
+            updates: Dict[str, Any],
+            agent_ids: Optional[List[str]] = None,
+            name: Optional[str] = None,
+            model: Optional[str] = None,
+            created_after: Optional[str] = None,
+            created_before: Optional[str] = None,
+            dry_run: bool = False,
+            concurrency: Optional[int] = None,
+            ctx: Optional[Context] = None
+        ) -> Dict[str, Any]:
+            """
+            Apply the same update to many agents.
+            
+            Args:
+                updates: Fields to set on every agent (name, description, model)
+                agent_ids: Agents to update; or select them with the filters below
+                name: Select agents whose name contains this text
+                model: Select agents using exactly this model
+                created_after: Select agents created at or after this ISO 8601 time
+                created_before: Select agents created before this ISO 8601 time
+                dry_run: Only return the agents that would be updated
+                concurrency: Agents updated at once (default and maximum: from config)
+            
+            Returns:
+                Per-agent results (error for the ones that failed), counts of
+                updated and failed agents, and total wall time. Progress is
+                reported as agents finish.
+            """
+            unknown = sorted(set(updates) - set(UPDATE_AGENT_FIELDS))
+            if not updates or unknown:
+                return {
+                    "success": False,
+                    "error": f"Updates must set some of: {', '.join(UPDATE_AGENT_FIELDS)}"
+                }
+            
+            return await self._bulk_agent_operation(
+                "updated",
+                partial(self._call_tool, "letta_update_agent", **updates),
+                dict(agent_ids=agent_ids, name=name, model=model,
+                     created_after=created_after, created_before=created_before),
+                dry_run, concurrency, ctx
+            )
+        
+        @self._tool(priority_class="bulk")
+        async def letta_delete_agents_bulk(
+            agent_ids: Optional[List[str]] = None,
+            name: Optional[str] = None,
+            model: Optional[str] = None,
+            created_after: Optional[str] = None,
+            created_before: Optional[str] = None,
+            confirm: bool = False,
+            dry_run: bool = False,
+            concurrency: Optional[int] = None,
+            ctx: Optional[Context] = None
+        ) -> Dict[str, Any]:
+            """
+            Delete many agents (requires confirmation).
+            
+            Args:
+                agent_ids: Agents to delete; or select them with the filters below
+                name: Select agents whose name contains this text
+                model: Select agents using exactly this model
+                created_after: Select agents created at or after this ISO 8601 time
+                created_before: Select agents created before this ISO 8601 time
+                confirm: Must be True to delete (not needed for dry_run)
+                dry_run: Only return the agents that would be deleted
+                concurrency: Agents deleted at once (default and maximum: from config)
+            
+            Returns:
+                Per-agent results (error for the ones that failed), counts of
+                deleted and failed agents, and total wall time. Progress is
+                reported as agents finish.
+            """
+            if not confirm and not dry_run:
+                return {
+                    "success": False,
+                    "error": "Deletion requires confirm=True to prevent accidents"
+                }
+            
+            return await self._bulk_agent_operation(
+                "deleted",
+                partial(self._call_tool, "letta_delete_agent", confirm=True),
+                dict(agent_ids=agent_ids, name=name, model=model,
+                     created_after=created_after, created_before=created_before),
+                dry_run, concurrency, ctx
+            )
+        
+        @self._tool(priority_class="bulk")
+        async def letta_export_fleet(
+            path: str,
+            concurrency: Optional[int] = None,
+            overwrite: bool = False
+        ) -> Dict[str, Any]:
+            """
+            Export every agent to an NDJSON file for backup or migration.
+            
+            Args:
+                path: New file to write, one agent per line (configuration, memory
+                    blocks and tool names); created only once the export finishes
+                concurrency: Agents fetched at once (default and maximum: from config)
+                overwrite: Replace the file if it already exists
+            
+            Returns:
+                Counts of exported and failed agents, the failures, and wall time
+            """
+            try:
+                return await self.export_fleet_to(path, concurrency, overwrite)
+            except Exception as e:
+                logger.error(f"Error exporting fleet: {e}")
+                return {"success": False, "error": str(e)}
+        
+        @self._tool(priority_class="bulk")
+        async def letta_import_fleet(
+            path: str,
+            concurrency: Optional[int] = None
+        ) -> Dict[str, Any]:
+            """
+            Create agents from an NDJSON file written by letta_export_fleet.
+            
+            Args:
+                path: NDJSON file with one agent snapshot per line
+                concurrency: Agents created at once (default and maximum: from config)
+            
+            Returns:
+                Counts of created and failed agents, the failed lines, and wall time
+            """
+            try:
+                with open(Path(path).expanduser(), encoding="utf-8") as lines:
+                    return await self.import_fleet(lines, concurrency)
+            except Exception as e:
+                logger.error(f"Error importing fleet: {e}")
+                return {"success": False, "error": str(e)}
+        
+        @self._tool(priority_class="bulk")
+        async def letta_sync_agents(
+            path: Optional[str] = None,
+            agents: Optional[List[Dict[str, Any]]] = None,
+            dry_run: bool = False,
+            concurrency: Optional[int] = None,
+            ctx: Optional[Context] = None
+        ) -> Dict[str, Any]:
+            """
+            Reconcile agents with a declared desired state, writing only what differs.
+            
+            Args:
+                path: YAML file with an 'agents' list; or pass agents inline
+                agents: Desired agents, matched to live agents by name. Each may set
+                    description, system, model, embedding, tags, tools and
+                    memory_blocks (label, value, limit, description); fields left
+                    out are not changed. Undeclared agents are left alone.
+                dry_run: Only report what would be created or updated
+                concurrency: Agents fetched and reconciled at once (default and maximum: from config)
+            
+            Returns:
+                Per-agent action (create, update with the changed fields, or none),
+                counts of created, updated, unchanged and failed agents, and wall time
+            """
+            try:
+                if (path is None) == (agents is None):
+                    raise ValidationError("Pass either path or agents")
+                desired = read_desired_state(path) if path is not None else load_desired_state(agents)
+                return await self.sync_fleet(desired, dry_run, concurrency, ctx)
+            except Exception as e:
+                logger.error(f"Error syncing agents: {e}")
+                return {"success": False, "error": str(e)}
     
     def _register_conversation_tools(self):
         """Register conversation management tools"""
         
-        @self.mcp.tool()
+        @self._tool(priority_class="interactive")
         async def letta_send_message(
             agent_id: str,
             message: str,
@@ -378,7 +1443,10 @@ Remember: Letta agents maintain their own conversation history across all client
                 validate_agent_id(agent_id)
                 
                 if stream:
-                    return await self._stream_message(agent_id, message)
+                    try:
+                        return await self._stream_message(agent_id, message)
+                    finally:
+                        self.cache.invalidate("memory", agent_id)
                 
                 response = await self.client.post(
                     f"/v1/agents/{agent_id}/messages",
@@ -390,7 +1458,10 @@ Remember: Letta agents maintain their own conversation history across all client
                 )
                 response.raise_for_status()
                 
-                result = response.json()
+                # The agent may have rewritten its own memory blocks
+                self.cache.invalidate("memory", agent_id)
+                
+                result = self._decode_json(response)
                 
                 # Parse the response
                 parsed = parse_message_response(result)
@@ -432,14 +1503,14 @@ Remember: Letta agents maintain their own conversation history across all client
                     async for line in response.aiter_lines():
                         if line.startswith("data: "):
                             try:
-                                chunk_data = json.loads(line[6:])
+                                chunk_data = self.codec.loads(line[6:])
                                 chunks.append(chunk_data)
                                 
                                 # Yield progress for UI
                                 if chunk_data.get("messageType") == "assistant_message":
                                     logger.info(f"Streaming: {chunk_data.get('content', '')}")
                                     
-                            except json.JSONDecodeError:
+                            except ValueError:
                                 continue
                 
                 # Combine chunks into final response
@@ -474,7 +1545,7 @@ Remember: Letta agents maintain their own conversation history across all client
                 logger.error(f"Error streaming message: {e}")
                 return {"success": False, "error": str(e)}
         
-        @self.mcp.tool()
+        @self._tool(projectable=True)
         async def letta_get_conversation_history(
             agent_id: str,
             limit: int = 10,
@@ -498,33 +1569,33 @@ Remember: Letta agents maintain their own conversation history across all client
                 if before:
                     params["before"] = before
                 
-                response = await self.client.get(
-                    f"/v1/agents/{agent_id}/messages",
-                    params=params
-                )
-                response.raise_for_status()
-                
-                messages = response.json()
-                
-                # Format messages for readability
+                # Format messages for readability as they are decoded
                 formatted_messages = []
-                for msg in messages:
-                    formatted = {
-                        "timestamp": msg.get("created_at"),
-                        "type": msg.get("message_type"),
-                        "role": msg.get("role")
-                    }
-                    
-                    # Add content based on type
-                    if msg.get("message_type") == "assistant_message":
-                        formatted["content"] = msg.get("content")
-                    elif msg.get("message_type") == "tool_call_message":
-                        formatted["tool"] = msg.get("tool_call", {}).get("name")
-                        formatted["args"] = msg.get("tool_call", {}).get("arguments")
-                    elif msg.get("message_type") == "tool_return_message":
-                        formatted["result"] = msg.get("tool_return")
+                async with self.client.stream(
+                    "GET",
+                    f"/v1/agents/{agent_id}/messages",
+                    params=params,
+                    extensions=STREAMED_REQUEST
+                ) as response:
+                    response.raise_for_status()
                     
-                    formatted_messages.append(formatted)
+                    async for msg in iter_json_array(response.aiter_bytes()):
+                        formatted = {
+                            "timestamp": msg.get("created_at"),
+                            "type": msg.get("message_type"),
+                            "role": msg.get("role")
+                        }
+                        
+                        # Add content based on type
+                        if msg.get("message_type") == "assistant_message":
+                            formatted["content"] = msg.get("content")
+                        elif msg.get("message_type") == "tool_call_message":
+                            formatted["tool"] = msg.get("tool_call", {}).get("name")
+                            formatted["args"] = msg.get("tool_call", {}).get("arguments")
+                        elif msg.get("message_type") == "tool_return_message":
+                            formatted["result"] = msg.get("tool_return")
+                        
+                        formatted_messages.append(formatted)
                 
                 return {
                     "success": True,
@@ -537,7 +1608,7 @@ Remember: Letta agents maintain their own conversation history across all client
                 logger.error(f"Error getting conversation history: {e}")
                 return {"success": False, "error": str(e)}
         
-        @self.mcp.tool()
+        @self._tool(priority_class="bulk", projectable=True)
         async def letta_export_conversation(
             agent_id: str,
             format: str = "markdown",
@@ -580,10 +1651,10 @@ Remember: Letta agents maintain their own conversation history across all client
                             content += f"## Assistant ({timestamp})\n{msg.get('content', '')}\n\n"
                         elif include_tools and msg["type"] == "tool_call_message":
                             content += f"### Tool Call: {msg.get('tool')}\n"
-                            content += f"```json\n{json.dumps(msg.get('args', {}), indent=2)}\n```\n\n"
+                            content += f"```json\n{self.codec.dumps(msg.get('args', {}), indent=True)}\n```\n\n"
                 
                 elif format == "json":
-                    content = json.dumps(messages, indent=2)
+                    content = self._dump_json(messages)
                 
                 elif format == "text":
                     content = ""
@@ -613,16 +1684,15 @@ Remember: Letta agents maintain their own conversation history across all client
     def _register_memory_tools(self):
         """Register memory management tools"""
         
-        @self.mcp.tool()
+        @self._tool(projectable=True)
         async def letta_get_memory(agent_id: str) -> Dict[str, Any]:
             """Get all memory blocks for a Letta agent."""
             try:
                 validate_agent_id(agent_id)
                 
-                response = await self.client.get(f"/v1/agents/{agent_id}/memory-blocks")
-                response.raise_for_status()
-                
-                memory_blocks = response.json()
+                memory_blocks = await self.cache.get_or_load(
+                    "memory", agent_id, partial(self._get_json, f"/v1/agents/{agent_id}/memory-blocks")
+                )
                 
                 # Format memory blocks
                 formatted = format_memory_blocks(memory_blocks)
@@ -638,7 +1708,7 @@ Remember: Letta agents maintain their own conversation history across all client
                 logger.error(f"Error getting memory: {e}")
                 return {"success": False, "error": str(e)}
         
-        @self.mcp.tool()
+        @self._tool()
         async def letta_update_memory(
             agent_id: str,
             block_label: str,
@@ -659,9 +1729,11 @@ Remember: Letta agents maintain their own conversation history across all client
                 validate_agent_id(agent_id)
                 
                 # First get all memory blocks to find the right one
-                response = await self.client.get(f"/v1/agents/{agent_id}/memory-blocks")
+                response = await self.client.get(
+                    f"/v1/agents/{agent_id}/memory-blocks", headers=FRESH_READ_HEADERS
+                )
                 response.raise_for_status()
-                memory_blocks = response.json()
+                memory_blocks = self._decode_json(response)
                 
                 # Find the block with matching label
                 block_id = None
@@ -682,8 +1754,9 @@ Remember: Letta agents maintain their own conversation history across all client
                     json={"value": value}
                 )
                 response.raise_for_status()
+                self.cache.invalidate("memory", agent_id)
                 
-                updated_block = response.json()
+                updated_block = self._decode_json(response)
                 
                 return {
                     "success": True,
@@ -698,7 +1771,7 @@ Remember: Letta agents maintain their own conversation history across all client
                 logger.error(f"Error updating memory: {e}")
                 return {"success": False, "error": str(e)}
         
-        @self.mcp.tool()
+        @self._tool()
         async def letta_create_memory_block(
             agent_id: str,
             label: str,
@@ -730,8 +1803,10 @@ Remember: Letta agents maintain their own conversation history across all client
                     }
                 )
                 response.raise_for_status()
+                # The cached agent summary lists its blocks, so drop it too
+                self.cache.invalidate_agent(agent_id)
                 
-                block = response.json()
+                block = self._decode_json(response)
                 
                 return {
                     "success": True,
@@ -744,7 +1819,7 @@ Remember: Letta agents maintain their own conversation history across all client
                 logger.error(f"Error creating memory block: {e}")
                 return {"success": False, "error": str(e)}
         
-        @self.mcp.tool()
+        @self._tool(projectable=True)
         async def letta_search_memory(
             agent_id: str,
             query: str,
@@ -764,58 +1839,74 @@ Remember: Letta agents maintain their own conversation history across all client
             try:
                 validate_agent_id(agent_id)
                 
-                # Search through messages
-                response = await self.client.get(
-                    f"/v1/agents/{agent_id}/messages/search",
-                    params={
-                        "query": query,
-                        "limit": limit
-                    }
+                probed = False
+                if not self.capabilities.use_fallback("message_search"):
+                    # Search through messages
+                    response = await self.client.get(
+                        f"/v1/agents/{agent_id}/messages/search",
+                        params={
+                            "query": query,
+                            "limit": limit
+                        }
+                    )
+                    try:
+                        response.raise_for_status()
+                    except httpx.HTTPStatusError as e:
+                        if not is_unsupported(e):
+                            raise
+                        probed = True
+                    else:
+                        self.capabilities.record("message_search", True)
+                        results = self._decode_json(response)
+                        
+                        return {
+                            "success": True,
+                            "agent_id": agent_id,
+                            "query": query,
+                            "result_count": len(results),
+                            "results": results
+                        }
+                
+                # Search endpoint not available: search the recent history instead
+                history = await self._call_tool(
+                    "letta_get_conversation_history", agent_id=agent_id, limit=1000
                 )
-                response.raise_for_status()
+                if not history["success"]:
+                    return {"success": False, "error": history["error"]}
+                
+                if probed:
+                    # A 404 may also mean the agent does not exist, so the
+                    # endpoint is only marked missing once the agent is found
+                    self.capabilities.record("message_search", False)
+                
+                # Manual search through messages
+                query_lower = query.lower()
+                matches = []
                 
-                results = response.json()
+                for msg in history["messages"]:
+                    content = (msg.get("content") or "").lower()
+                    if query_lower in content:
+                        matches.append(msg)
+                        if len(matches) >= limit:
+                            break
                 
                 return {
                     "success": True,
                     "agent_id": agent_id,
                     "query": query,
-                    "result_count": len(results),
-                    "results": results
+                    "result_count": len(matches),
+                    "results": matches,
+                    "method": "manual_search"
                 }
                 
             except Exception as e:
-                # If search endpoint doesn't exist, fall back to manual search
-                if "404" in str(e):
-                    history = await letta_get_conversation_history(agent_id, limit=1000)
-                    if history["success"]:
-                        # Manual search through messages
-                        query_lower = query.lower()
-                        matches = []
-                        
-                        for msg in history["messages"]:
-                            content = msg.get("content", "").lower()
-                            if query_lower in content:
-                                matches.append(msg)
-                                if len(matches) >= limit:
-                                    break
-                        
-                        return {
-                            "success": True,
-                            "agent_id": agent_id,
-                            "query": query,
-                            "result_count": len(matches),
-                            "results": matches,
-                            "method": "manual_search"
-                        }
-                
                 logger.error(f"Error searching memory: {e}")
                 return {"success": False, "error": str(e)}
     
     def _register_tool_management(self):
         """Register tool management functionality"""
         
-        @self.mcp.tool()
+        @self._tool(priority_class="bulk", projectable=True)
         async def letta_list_tools(
             filter: Optional[str] = None,
             tags: Optional[List[str]] = None
@@ -832,29 +1923,27 @@ Remember: Letta agents maintain their own conversation history across all client
                 Descriptions are truncated to 200 characters.
             """
             try:
-                response = await self.client.get("/v1/tools")
-                response.raise_for_status()
-                
-                tools = response.json()
+                filter_lower = filter.lower() if filter else None
                 
-                # Apply filters
-                if filter:
-                    filter_lower = filter.lower()
-                    tools = [
-                        t for t in tools
-                        if filter_lower in t.get("name", "").lower() or
-                           filter_lower in t.get("description", "").lower()
-                    ]
+                catalog = await self.cache.get_or_load("tools", "", self._load_tool_catalog)
                 
-                if tags:
-                    tools = [
-                        t for t in tools
-                        if any(tag in t.get("tags", []) for tag in tags)
-                    ]
-                
-                # Group by tags
+                tool_count = 0
                 tools_by_tag = {}
-                for tool in tools:
+                tool_summaries = []
+                for tool in catalog:
+                    # Apply filters
+                    if filter_lower and not (
+                        filter_lower in tool.get("name", "").lower() or
+                        filter_lower in tool.get("description", "").lower()
+                    ):
+                        continue
+                    
+                    if tags and not any(tag in tool.get("tags", []) for tag in tags):
+                        continue
+                    
+                    tool_count += 1
+                    
+                    # Group by tags
                     for tag in tool.get("tags", ["other"]):
                         if tag not in tools_by_tag:
                             tools_by_tag[tag] = []
@@ -863,10 +1952,8 @@ Remember: Letta agents maintain their own conversation history across all client
                             "description": tool.get("description"),
                             "id": tool.get("id")
                         })
-                
-                # Return tool summaries to stay under token limit
-                tool_summaries = []
-                for tool in tools:
+                    
+                    # Return tool summaries to stay under token limit
                     tool_summaries.append({
                         "id": tool.get("id"),
                         "name": tool.get("name"),
@@ -876,7 +1963,7 @@ Remember: Letta agents maintain their own conversation history across all client
                 
                 return {
                     "success": True,
-                    "total_tools": len(tools),
+                    "total_tools": tool_count,
                     "tools_by_tag": tools_by_tag,
                     "tools": tool_summaries
                 }
@@ -885,16 +1972,13 @@ Remember: Letta agents maintain their own conversation history across all client
                 logger.error(f"Error listing tools: {e}")
                 return {"success": False, "error": str(e)}
         
-        @self.mcp.tool()
+        @self._tool(projectable=True)
         async def letta_get_agent_tools(agent_id: str) -> Dict[str, Any]:
             """Get the tools attached to a specific agent."""
             try:
                 validate_agent_id(agent_id)
                 
-                response = await self.client.get(f"/v1/agents/{agent_id}")
-                response.raise_for_status()
-                
-                agent = response.json()
+                agent = await self._get_agent(agent_id)
                 tools = agent.get("tools", [])
                 
                 return {
@@ -909,7 +1993,7 @@ Remember: Letta agents maintain their own conversation history across all client
                 logger.error(f"Error getting agent tools: {e}")
                 return {"success": False, "error": str(e)}
         
-        @self.mcp.tool()
+        @self._tool()
         async def letta_attach_tool(
             agent_id: str,
             tool_name: str
@@ -928,9 +2012,9 @@ Remember: Letta agents maintain their own conversation history across all client
                 validate_agent_id(agent_id)
                 
                 # Get current tools
-                agent_response = await self.client.get(f"/v1/agents/{agent_id}")
+                agent_response = await self.client.get(f"/v1/agents/{agent_id}", headers=FRESH_READ_HEADERS)
                 agent_response.raise_for_status()
-                agent = agent_response.json()
+                agent = self._decode_json(agent_response)
                 
                 current_tools = agent.get("tools", [])
                 
@@ -951,6 +2035,7 @@ Remember: Letta agents maintain their own conversation history across all client
                     json={"tools": updated_tools}
                 )
                 response.raise_for_status()
+                self.cache.invalidate("agent", agent_id)
                 
                 return {
                     "success": True,
@@ -963,7 +2048,7 @@ Remember: Letta agents maintain their own conversation history across all client
                 logger.error(f"Error attaching tool: {e}")
                 return {"success": False, "error": str(e)}
         
-        @self.mcp.tool()
+        @self._tool()
         async def letta_detach_tool(
             agent_id: str,
             tool_name: str
@@ -982,9 +2067,9 @@ Remember: Letta agents maintain their own conversation history across all client
                 validate_agent_id(agent_id)
                 
                 # Get current tools
-                agent_response = await self.client.get(f"/v1/agents/{agent_id}")
+                agent_response = await self.client.get(f"/v1/agents/{agent_id}", headers=FRESH_READ_HEADERS)
                 agent_response.raise_for_status()
-                agent = agent_response.json()
+                agent = self._decode_json(agent_response)
                 
                 current_tools = agent.get("tools", [])
                 
@@ -1005,6 +2090,7 @@ Remember: Letta agents maintain their own conversation history across all client
                     json={"tools": updated_tools}
                 )
                 response.raise_for_status()
+                self.cache.invalidate("agent", agent_id)
                 
                 return {
                     "success": True,
@@ -1020,33 +2106,47 @@ Remember: Letta agents maintain their own conversation history across all client
     def _register_utility_tools(self):
         """Register utility and helper tools"""
         
-        @self.mcp.tool()
+        @self._tool(priority_class="interactive", projectable=True)
         async def letta_health_check() -> Dict[str, Any]:
             """Check the health of the Letta API connection."""
-            try:
-                # Try to list agents with limit=1 as a health check
-                response = await self.client.get("/v1/agents", params={"limit": 1})
-                response.raise_for_status()
-                
-                return {
-                    "success": True,
-                    "status": "healthy",
+            router = find_layer(self.client, RoutingTransport)
+            if router is None:
+                result = {
+                    **await self._probe_backend(),
                     "base_url": self.config.base_url,
-                    "api_version": response.headers.get("X-API-Version", "unknown"),
                     "timestamp": datetime.now().isoformat()
                 }
-                
-            except Exception as e:
-                logger.error(f"Health check failed: {e}")
-                return {
-                    "success": False,
-                    "status": "unhealthy",
-                    "error": str(e),
-                    "base_url": self.config.base_url,
+            else:
+                # Probe every backend, not just whichever the router picks
+                urls = [backend.url for backend in router.backends]
+                probes = await asyncio.gather(*(self._probe_backend(url) for url in urls))
+                healthy = sum(probe["success"] for probe in probes)
+                result = {
+                    "success": healthy > 0,
+                    "status": (
+                        "healthy" if healthy == len(probes) else "degraded" if healthy else "unhealthy"
+                    ),
+                    "backends": {
+                        url: {key: value for key, value in probe.items() if key != "success"}
+                        for url, probe in zip(urls, probes, strict=True)
+                    },
                     "timestamp": datetime.now().isoformat()
                 }
+            
+            breaker = find_layer(self.client, CircuitBreakerTransport)
+            if breaker is not None:
+                result["circuits"] = breaker.states()
+            
+            if self.config.enable_performance_metrics:
+                result["client_metrics"] = collect_metrics(self.client)
+                result["entity_cache"] = self.cache.metrics()
+                result["capabilities"] = self.capabilities.metrics()
+                if self.agent_index is not None:
+                    result["agent_index"] = self.agent_index.metrics()
+            
+            return result
         
-        @self.mcp.tool()
+        @self._tool(priority_class="bulk", projectable=True)
         async def letta_get_usage_stats(
             agent_id: Optional[str] = None,
             period: str = "day"
@@ -1061,6 +2161,21 @@ Remember: Letta agents maintain their own conversation history across all client
             Returns:
                 Usage statistics
             """
+            unavailable = {
+                "success": True,
+                "period": period,
+                "agent_id": agent_id,
+                "stats": {
+                    "message_count": "N/A",
+                    "tool_calls": "N/A",
+                    "tokens_used": "N/A"
+                },
+                "note": "Usage stats endpoint not available"
+            }
+            
+            if self.capabilities.use_fallback("usage_stats"):
+                return unavailable
+            
             try:
                 params = {"period": period}
                 if agent_id:
@@ -1068,8 +2183,9 @@ Remember: Letta agents maintain their own conversation history across all client
                 
                 response = await self.client.get("/v1/stats/usage", params=params)
                 response.raise_for_status()
+                self.capabilities.record("usage_stats", True)
                 
-                stats = response.json()
+                stats = self._decode_json(response)
                 
                 return {
                     "success": True,
@@ -1079,19 +2195,10 @@ Remember: Letta agents maintain their own conversation history across all client
                 }
                 
             except Exception as e:
-                # If stats endpoint doesn't exist, return mock data
-                if "404" in str(e):
-                    return {
-                        "success": True,
-                        "period": period,
-                        "agent_id": agent_id,
-                        "stats": {
-                            "message_count": "N/A",
-                            "tool_calls": "N/A",
-                            "tokens_used": "N/A"
-                        },
-                        "note": "Usage stats endpoint not available"
-                    }
+                # If stats endpoint doesn't exist, return placeholder data
+                if is_unsupported(e):
+                    self.capabilities.record("usage_stats", False)
+                    return unavailable
                 
                 logger.error(f"Error getting usage stats: {e}")
                 return {"success": False, "error": str(e)}
@@ -1099,35 +2206,189 @@ Remember: Letta agents maintain their own conversation history across all client
     def _register_resources(self):
         """Register MCP resources for data access"""
         
-        @self.mcp.resource("letta://agents")
+        @self.mcp.resource("letta://agents", mime_type="application/json")
         async def get_agents_resource() -> str:
             """List of all Letta agents"""
-            result = await letta_list_agents()
-            return json.dumps(result, indent=2)
+            result = await self._call_tool("letta_list_agents")
+            return self._dump_json(result)
         
-        @self.mcp.resource("letta://tools")
+        @self.mcp.resource("letta://tools", mime_type="application/json")
         async def get_tools_resource() -> str:
             """List of all available tools"""
-            result = await letta_list_tools()
-            return json.dumps(result, indent=2)
+            result = await self._call_tool("letta_list_tools")
+            return self._dump_json(result)
         
-        @self.mcp.resource("letta://agent/{agent_id}")
+        @self.mcp.resource("letta://agent/{agent_id}", mime_type="application/json")
         async def get_agent_resource(agent_id: str) -> str:
             """Get detailed information about a specific agent"""
-            result = await letta_get_agent(agent_id)
-            return json.dumps(result, indent=2)
+            result = await self._call_tool("letta_get_agent", agent_id=agent_id)
+            return self._dump_json(result)
         
-        @self.mcp.resource("letta://agent/{agent_id}/memory")
+        @self.mcp.resource("letta://agent/{agent_id}/memory", mime_type="application/json")
         async def get_agent_memory_resource(agent_id: str) -> str:
             """Get memory blocks for a specific agent"""
-            result = await letta_get_memory(agent_id)
-            return json.dumps(result, indent=2)
+            result = await self._call_tool("letta_get_memory", agent_id=agent_id)
+            return self._dump_json(result)
         
-        @self.mcp.resource("letta://health")
+        @self.mcp.resource("letta://health", mime_type="application/json")
         async def get_health_resource() -> str:
             """Health status of the Letta connection"""
-            result = await letta_health_check()
-            return json.dumps(result, indent=2)
+            result = await self._call_tool("letta_health_check")
+            return self._dump_json(result)
+    
+    async def warm_up(self) -> Dict[str, Any]:
+        """Prepare the HTTP client before the first tool call
+        
+        Resolves the Letta host, opens ``warmup_connections`` keepalive
+        connections and, with ``warmup_preload``, fetches the agent and tool
+        lists. Failures are logged and never raised.
+        """
+        start = time.monotonic()
+        report: Dict[str, Any] = {"resolved": False, "connections": 0, "preloaded": []}
+        
+        try:
+            with priority("bulk"):
+                await asyncio.wait_for(self._warm_up(report), timeout=self.config.warmup_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Warm-up timed out after {self.config.warmup_timeout}s")
+        except Exception as e:
+            logger.warning(f"Warm-up failed: {e}")
+        
+        report["duration_ms"] = round((time.monotonic() - start) * 1000, 1)
+        logger.info(
+            f"Warm-up finished in {report['duration_ms']}ms: "
+            f"{report['connections']} connection(s) opened, "
+            f"preloaded {', '.join(report['preloaded']) or 'nothing'}"
+        )
+        return report
+    
+    async def _warm_up(self, report: Dict[str, Any]) -> None:
+        urls = [httpx.URL(backend) for backend in self.config.backend_urls()]
+        
+        step = time.monotonic()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.getaddrinfo(url.host, url.port or (443 if url.scheme == "https" else 80))
+            for url in urls
+        ))
+        report["resolved"] = True
+        logger.debug(
+            f"Resolved {', '.join(url.host for url in urls)} "
+            f"in {(time.monotonic() - step) * 1000:.1f}ms"
+        )
+        
+        # Concurrent requests make the pool open one connection each; with
+        # several backends the router spreads them across the fleet
+        step = time.monotonic()
+        count = min(self.config.warmup_connections, self.config.connection_pool_size) * len(urls)
+        results = await asyncio.gather(
+            *(self._open_connection() for _ in range(count)),
+            return_exceptions=True
+        )
+        report["connections"] = sum(1 for result in results if result is None)
+        logger.debug(
+            f"Opened {report['connections']}/{count} connection(s) "
+            f"in {(time.monotonic() - step) * 1000:.1f}ms"
+        )
+        
+        if self.config.warmup_preload:
+            for name in ("letta_list_agents", "letta_list_tools"):
+                result = await self._call_tool(name)
+                if result.get("success"):
+                    report["preloaded"].append(name)
+    
+    async def _open_connection(self) -> None:
+        # Streamed so concurrent warm-up requests are not coalesced into one
+        async with self.client.stream(
+            "GET", "/v1/agents", params={"limit": 1}, extensions=STREAMED_REQUEST
+        ) as response:
+            # Drain the body so the connection returns to the pool
+            await response.aread()
+    
+    async def _probe_backend(self, url: Optional[str] = None) -> Dict[str, Any]:
+        """List one agent upstream, pinned to the backend at ``url`` when given"""
+        try:
+            response = await self.client.get(
+                "/v1/agents",
+                params={"limit": 1},
+                headers=FRESH_READ_HEADERS,
+                extensions={BACKEND_EXTENSION: url} if url is not None else None
+            )
+            response.raise_for_status()
+            return {
+                "success": True,
+                "status": "healthy",
+                "api_version": response.headers.get("X-API-Version", "unknown")
+            }
+        except Exception as e:
+            logger.error(f"Health check failed{f' for {url}' if url else ''}: {e}")
+            return {"success": False, "status": "unhealthy", "error": str(e)}
+    
+    def _agent_index_fresh(self) -> bool:
+        """Whether the agent index can answer queries in place of the upstream list
+        
+        An index older than ``agent_index_refresh`` is resynced in the
+        background, so only processes that actually look agents up pay for
+        listing the fleet. It keeps answering until twice that age.
+        """
+        if self.agent_index is None:
+            return False
+        if self.agent_index.age() >= self.config.agent_index_refresh:
+            self._start_agent_index_sync()
+        return self.agent_index.ready and self.agent_index.age() < 2 * self.config.agent_index_refresh
+    
+    def _start_agent_index_sync(self) -> "asyncio.Future[Dict[str, int]]":
+        if self._agent_index_sync is None or self._agent_index_sync.done():
+            self._agent_index_sync = asyncio.ensure_future(self._sync_agent_index())
+            self._agent_index_sync.add_done_callback(_log_agent_index_failure)
+        return self._agent_index_sync
+    
+    async def refresh_agent_index(self) -> Dict[str, int]:
+        """Resync the agent index with the full agent list
+        
+        Every page is listed, but only agents whose ``last_modified`` changed
+        are re-indexed; agents no longer listed are dropped. Concurrent
+        callers share one resync.
+        """
+        return await asyncio.shield(self._start_agent_index_sync())
+    
+    async def _sync_agent_index(self) -> Dict[str, int]:
+        with priority("bulk"):
+            listing = await self._list_agent_pages(
+                lambda agent: True, math.inf, 0, None, summarize=index_document
+            )
+        changes = self.agent_index.sync(listing["agents"])
+        logger.debug(
+            f"Agent index synced: {len(self.agent_index)} agents "
+            f"({changes['added']} added, {changes['updated']} updated, {changes['removed']} removed)"
+        )
+        return changes
+    
+    async def _keep_agent_index_fresh(self) -> None:
+        while True:
+            try:
+                await self.refresh_agent_index()
+            except Exception:
+                # Already logged by the resync task
+                pass
+            await asyncio.sleep(self.config.agent_index_refresh)
+    
+    async def run_async(self, transport: str = "stdio"):
+        """Run the MCP server on the current event loop, warming up in the background"""
+        background = []
+        if self.config.warmup:
+            background.append(asyncio.ensure_future(self.warm_up()))
+        if self.agent_index is not None and self.config.agent_index_background:
+            background.append(asyncio.ensure_future(self._keep_agent_index_fresh()))
+        try:
+            await self.mcp.run_async(transport=transport)
+        finally:
+            if self._agent_index_sync is not None:
+                background.append(self._agent_index_sync)
+            for task in background:
+                if not task.done():
+                    task.cancel()
+            self.cache.close()
     
     def run(self, transport: str = "stdio"):
         """Run the MCP server"""
@@ -1136,7 +2397,7 @@ Remember: Letta agents maintain their own conversation history across all client
         logger.info(f"Connected to: {self.config.base_url}")
         logger.info(f"Transport: {transport}")
         
-        self.mcp.run(transport=transport)
+        asyncio.run(self.run_async(transport))
 
 def create_server(config: Optional[LettaConfig] = None) -> LettaMCPServer:
     """Create a new Letta MCP Server instance"""
@@ -0,0 +1,1771 @@
+"""
+Composable transport layers for the Letta HTTP client
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import time
+import zlib
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Collection, Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+from .exceptions import CircuitOpenError, ConcurrencyLimitError, RateLimitError
+from .exceptions import TimeoutError as LettaTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Status codes that signal an overloaded upstream
+OVERLOAD_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+# Status codes that signal a failing upstream endpoint
+FAILURE_STATUS_CODES = frozenset({500, 502, 503, 504})
+
+# Request extensions marking a body that the caller decodes incrementally;
+# such responses are passed through rather than buffered for sharing
+STREAMED_REQUEST = {"letta_streamed": True}
+
+# Request extension pinning a request to one RoutingTransport backend URL,
+# e.g. to probe each backend's health
+BACKEND_EXTENSION = "letta_backend"
+
+# Request extension in which RoutingTransport records the backend URLs that
+# attempts of one request (retries, hedges) have been sent to
+ATTEMPTED_BACKENDS_EXTENSION = "letta_attempted_backends"
+
+# Request headers for reads that must see current upstream state (health
+# probes, read-modify-write pre-reads); the HTTP cache goes upstream for them
+FRESH_READ_HEADERS = {"Cache-Control": "no-cache"}
+
+# Methods that can be replayed without side effects. PATCH is included
+# because every PATCH this server sends sets absolute values.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "PATCH", "DELETE"})
+
+def endpoint_family(path: str) -> str:
+    """Map a Letta API path to its endpoint family.
+
+    ``/v1/agents`` and ``/v1/agents/{id}`` are "agents", while agent
+    sub-resources such as ``/v1/agents/{id}/messages/search`` are keyed by
+    the sub-resource ("messages"). Other paths use their first segment
+    ("tools", "stats").
+    """
+    segments = [segment for segment in path.split("/") if segment]
+    if segments and segments[0] == "v1":
+        segments = segments[1:]
+    
+    if not segments:
+        return "root"
+    if segments[0] == "agents" and len(segments) >= 3:
+        return segments[2]
+    return segments[0]
+
+class Deadline(NamedTuple):
+    """Absolute deadline shared by every request an operation makes"""
+
+    expires_at: float
+    seconds: float
+    operation: str
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("letta_deadline", default=None)
+
+@contextmanager
+def deadline(seconds: Optional[float], operation: str = "request") -> Iterator[Optional[Deadline]]:
+    """Bound every request made inside the block to ``seconds`` from now.
+
+    The deadline follows the context into tasks spawned by the block. A
+    nested deadline can only shorten the enclosing one.
+    """
+    current = _current_deadline.get()
+    if seconds is None or (current is not None and current.remaining() <= seconds):
+        yield current
+        return
+    
+    token = _current_deadline.set(Deadline(time.monotonic() + seconds, seconds, operation))
+    try:
+        yield _current_deadline.get()
+    finally:
+        _current_deadline.reset(token)
+
+def current_deadline() -> Optional[Deadline]:
+    """Return the deadline of the running operation, if any"""
+    return _current_deadline.get()
+
+# Priority classes in the order a strict scheduler serves them
+PRIORITY_CLASSES = ("interactive", "standard", "bulk")
+
+# Share of queued slots each class receives under weighted-fair scheduling
+DEFAULT_PRIORITY_WEIGHTS = {"interactive": 8.0, "standard": 4.0, "bulk": 1.0}
+
+_current_priority: ContextVar[Optional[str]] = ContextVar("letta_priority", default=None)
+
+@contextmanager
+def priority(name: str) -> Iterator[str]:
+    """Schedule requests made inside the block under priority class ``name``.
+
+    Like deadlines, priorities follow the context into spawned tasks. A
+    nested block can lower the class but never raise it, so an interactive
+    tool called from a bulk export still queues as bulk.
+    """
+    if name not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class: {name}")
+    
+    current = _current_priority.get()
+    if current is not None and PRIORITY_CLASSES.index(current) >= PRIORITY_CLASSES.index(name):
+        yield current
+        return
+    
+    token = _current_priority.set(name)
+    try:
+        yield name
+    finally:
+        _current_priority.reset(token)
+
+def current_priority() -> str:
+    """Return the priority class of the running operation"""
+    return _current_priority.get() or "standard"
+
+class TransportLayer(httpx.AsyncBaseTransport):
+    """Base class for transports that wrap another transport"""
+
+    name = "layer"
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.inner.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return a snapshot of this layer's counters"""
+        return {}
+
+class _ClosingStream(httpx.AsyncByteStream):
+    """Byte stream that runs a callback once the body is closed"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close: Optional[Callable[[], None]] = on_close
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._on_close is not None:
+                callback, self._on_close = self._on_close, None
+                callback()
+
+def on_response_close(
+    response: httpx.Response,
+    callback: Callable[[], None]
+) -> httpx.Response:
+    """Return a copy of ``response`` that calls ``callback`` when its body is closed"""
+    return httpx.Response(
+        status_code=response.status_code,
+        headers=response.headers,
+        stream=_ClosingStream(response.stream, callback),
+        extensions=response.extensions
+    )
+
+class StreamLimitTransport(TransportLayer):
+    """Caps the number of requests in flight across the connection pool.
+
+    Used in HTTP/2 mode, where ``pool_size`` bounds TCP connections and each
+    connection multiplexes up to ``max_streams`` concurrent requests.
+    """
+
+    name = "streams"
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, max_in_flight: int):
+        super().__init__(inner)
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self._semaphore.acquire()
+        self.in_flight += 1
+        try:
+            response = await self.inner.handle_async_request(request)
+        except BaseException:
+            self._release()
+            raise
+        return on_response_close(response, self._release)
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight
+        }
+
+class _PriorityStats:
+    """Queueing and latency samples for one priority class"""
+
+    def __init__(self, window: int = 200):
+        self.requests = 0
+        self.queued = 0
+        self.wait_seconds = 0.0
+        self.latencies: Deque[float] = deque(maxlen=window)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+class AdaptiveConcurrencyTransport(TransportLayer):
+    """AIMD concurrency limiter and priority scheduler in front of the pool.
+
+    The in-flight window grows by roughly one request per round trip while
+    latency stays within ``latency_tolerance`` of the observed baseline, and
+    shrinks by ``backoff`` on overload responses, transport errors or latency
+    spikes. Requests beyond the window wait in one FIFO queue per priority
+    class (see ``priority()``), at most ``max_queue`` entries in total;
+    further requests are rejected.
+
+    Freed slots go to the highest waiting class with ``scheduling="strict"``,
+    or are shared in proportion to ``weights`` with ``"weighted"``, so bulk
+    work still progresses while interactive calls jump the queue.
+    """
+
+    name = "concurrency"
+
+    SCHEDULING_MODES = ("weighted", "strict")
+
+    def __init__(
+        self,
+        inner: httpx.AsyncBaseTransport,
+        initial_limit: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 100,
+        max_queue: int = 1000,
+        latency_tolerance: float = 2.0,
+        backoff: float = 0.75,
+        smoothing: float = 0.05,
+        scheduling: str = "weighted",
+        weights: Optional[Dict[str, float]] = None
+    ):
+        super().__init__(inner)
+        if scheduling not in self.SCHEDULING_MODES:
+            raise ValueError(f"Unknown scheduling mode: {scheduling}")
+        
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self.scheduling = scheduling
+        self.weights = {**DEFAULT_PRIORITY_WEIGHTS, **(weights or {})}
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.in_flight = 0
+        self.rejected = 0
+        self.increases = 0
+        self.decreases = 0
+        self.baseline_latency: Optional[float] = None
+        self._last_decrease = 0.0
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {
+            name: deque() for name in PRIORITY_CLASSES
+        }
+        self._credits = {name: 0.0 for name in PRIORITY_CLASSES}
+        self._stats = {name: _PriorityStats() for name in PRIORITY_CLASSES}
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        priority_class = current_priority()
+        stats = self._stats[priority_class]
+        stats.requests += 1
+        
+        queued_at = time.monotonic()
+        await self._acquire(priority_class)
+        start = time.monotonic()
+        if start > queued_at:
+            stats.wait_seconds += start - queued_at
+        try:
+            response = await self.inner.handle_async_request(request)
+        except BaseException as e:
+            if isinstance(e, httpx.TransportError):
+                self._on_overload()
+            self._release()
+            raise
+        
+        latency = time.monotonic() - start
+        stats.latencies.append(time.monotonic() - queued_at)
+        if response.status_code in OVERLOAD_STATUS_CODES:
+            self._on_overload()
+        else:
+            self._on_sample(latency)
+        return on_response_close(response, self._release)
+
+    async def _acquire(self, priority_class: str) -> None:
+        if not self.queue_depth and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return
+        
+        if self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            raise ConcurrencyLimitError(int(self.limit), self.queue_depth)
+        
+        waiters = self._waiters[priority_class]
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        self._stats[priority_class].queued += 1
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted as we were cancelled; hand it on
+                self._release()
+            else:
+                waiters.remove(waiter)
+            raise
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _next_class(self) -> str:
+        waiting = [name for name in PRIORITY_CLASSES if self._waiters[name]]
+        if self.scheduling == "strict" or len(waiting) == 1:
+            return waiting[0]
+        
+        # Smooth weighted round-robin over the classes with waiters
+        total = 0.0
+        for name in waiting:
+            self._credits[name] += self.weights[name]
+            total += self.weights[name]
+        chosen = max(waiting, key=lambda name: self._credits[name])
+        self._credits[chosen] -= total
+        return chosen
+
+    def _wake(self) -> None:
+        while self.queue_depth and self.in_flight < int(self.limit):
+            waiter = self._waiters[self._next_class()].popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _on_sample(self, latency: float) -> None:
+        if self.baseline_latency is None:
+            self.baseline_latency = latency
+            return
+        
+        if latency > self.baseline_latency * self.latency_tolerance:
+            self._on_overload()
+            return
+        
+        self.baseline_latency += self.smoothing * (latency - self.baseline_latency)
+        if self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self.increases += 1
+            self._wake()
+
+    def _on_overload(self) -> None:
+        # Back off at most once per round trip so a burst of failures from
+        # the same window does not collapse the limit
+        now = time.monotonic()
+        if now - self._last_decrease < (self.baseline_latency or 0.0):
+            return
+        
+        self._last_decrease = now
+        new_limit = max(float(self.min_limit), self.limit * self.backoff)
+        if new_limit < self.limit:
+            self.limit = new_limit
+            self.decreases += 1
+
+    def _class_metrics(self, name: str) -> Dict[str, Any]:
+        stats = self._stats[name]
+        p50 = stats.percentile(50)
+        p95 = stats.percentile(95)
+        return {
+            "requests": stats.requests,
+            "queued": stats.queued,
+            "queue_depth": len(self._waiters[name]),
+            "avg_wait_ms": (
+                round(stats.wait_seconds / stats.requests * 1000, 1) if stats.requests else 0.0
+            ),
+            "latency_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "rejected": self.rejected,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "baseline_latency_ms": (
+                round(self.baseline_latency * 1000, 1)
+                if self.baseline_latency is not None else None
+            ),
+            "scheduling": self.scheduling,
+            "priorities": {name: self._class_metrics(name) for name in PRIORITY_CLASSES}
+        }
+
+class RetryBudget:
+    """Caps retries to a fraction of recent traffic.
+
+    Every request deposits ``ratio`` tokens and every retry spends one, with
+    a trickle of ``min_per_second`` tokens so a quiet client can still retry.
+    During an outage the balance drains and retries stop, so they cannot
+    multiply load on an already failing upstream.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, capacity: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self.balance = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.balance = min(self.capacity, self.balance + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self) -> None:
+        self._refill()
+        self.balance = min(self.capacity, self.balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        self._refill()
+        if self.balance < 1:
+            return False
+        self.balance -= 1
+        return True
+
+class RetryTransport(TransportLayer):
+    """Status- and idempotency-aware retries with decorrelated jitter.
+
+    Connection failures are retried for every method since the request never
+    reached Letta. Read failures and 408/5xx responses are only retried for
+    idempotent methods, so a message send is never delivered twice. 429s are
+    left to the rate-limit scheduler. Each retry must be paid for from a
+    shared ``RetryBudget``; the number of attempts is recorded on the
+    response as the ``retry_attempts`` extension.
+    """
+
+    name = "retry"
+
+    RETRY_STATUS_CODES = frozenset({408, 500, 502, 503, 504})
+    CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+    def __init__(
+        self,
+        inner: httpx.AsyncBaseTransport,
+        max_retries: int = 3,
+        base_delay: float = 0.2,
+        max_delay: float = 10.0,
+        budget: Optional[RetryBudget] = None
+    ):
+        super().__init__(inner)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+        self.requests = 0
+        self.retries = 0
+        self.budget_exhausted = 0
+        self.deadline_skipped = 0
+        self.attempts: Dict[int, int] = {}
+
+    def _can_replay(self, request: httpx.Request) -> bool:
+        return isinstance(request.stream, httpx.ByteStream)
+
+    def _should_retry_error(self, request: httpx.Request, error: Exception) -> bool:
+        if isinstance(error, self.CONNECT_ERRORS):
+            return True
+        return request.method in IDEMPOTENT_METHODS and isinstance(error, httpx.TransportError)
+
+    def _should_retry_status(self, request: httpx.Request, response: httpx.Response) -> bool:
+        return (
+            request.method in IDEMPOTENT_METHODS
+            and response.status_code in self.RETRY_STATUS_CODES
+        )
+
+    def _next_delay(self, previous: float) -> float:
+        return min(self.max_delay, random.uniform(self.base_delay, previous * 3))
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        self.budget.deposit()
+        delay = self.base_delay
+        attempt = 0
+        
+        while True:
+            attempt += 1
+            retry_after: Optional[float] = None
+            next_delay = self._next_delay(delay)
+            try:
+                response = await self.inner.handle_async_request(request)
+            except Exception as e:
+                if not (
+                    self._should_retry_error(request, e)
+                    and self._may_retry(request, attempt, next_delay)
+                ):
+                    self._record(attempt)
+                    raise
+                reason = f"{type(e).__name__}: {e}"
+            else:
+                retry_after = parse_retry_after(response.headers.get("retry-after"))
+                if retry_after is not None:
+                    next_delay = max(next_delay, retry_after)
+                if not (
+                    self._should_retry_status(request, response)
+                    and (retry_after is None or retry_after <= self.max_delay)
+                    and self._may_retry(request, attempt, next_delay)
+                ):
+                    self._record(attempt)
+                    response.extensions["retry_attempts"] = attempt
+                    return response
+                reason = f"HTTP {response.status_code}"
+                await response.aclose()
+            
+            delay = next_delay
+            self.retries += 1
+            logger.warning(
+                f"Retrying {request.method} {request.url.path} in {delay:.2f}s "
+                f"(attempt {attempt + 1}/{self.max_retries + 1}, {reason})"
+            )
+            await asyncio.sleep(delay)
+
+    def _may_retry(self, request: httpx.Request, attempt: int, delay: float) -> bool:
+        if attempt > self.max_retries or not self._can_replay(request):
+            return False
+        
+        # A retry that cannot finish before the deadline only hides the real error
+        active = current_deadline()
+        if active is not None and delay >= active.remaining():
+            self.deadline_skipped += 1
+            logger.warning(
+                f"Not retrying {request.method} {request.url.path}: "
+                f"{max(0.0, active.remaining()):.2f}s left of the {active.operation} deadline"
+            )
+            return False
+        
+        if not self.budget.withdraw():
+            self.budget_exhausted += 1
+            logger.warning(f"Retry budget exhausted; not retrying {request.method} {request.url.path}")
+            return False
+        return True
+
+    def _record(self, attempts: int) -> None:
+        self.attempts[attempts] = self.attempts.get(attempts, 0) + 1
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "budget_exhausted": self.budget_exhausted,
+            "deadline_skipped": self.deadline_skipped,
+            "budget_balance": round(self.budget.balance, 2),
+            "attempts": {str(n): count for n, count in sorted(self.attempts.items())}
+        }
+
+class _SharedBody:
+    """A response body shared by coalesced callers, parsed at most once"""
+
+    _UNPARSED = object()
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: httpx.Headers,
+        content: bytes,
+        loads: Callable[[bytes], Any] = json.loads
+    ):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self._loads = loads
+        self._parsed: Any = self._UNPARSED
+
+    def json(self) -> Any:
+        if self._parsed is self._UNPARSED:
+            self._parsed = self._loads(self.content)
+        return self._parsed
+
+class CoalescedResponse(httpx.Response):
+    """Response whose parsed JSON is shared with other coalesced callers.
+
+    The object returned by ``json()`` is shared and must be treated as read-only.
+    """
+
+    def __init__(self, shared: _SharedBody):
+        super().__init__(
+            status_code=shared.status_code,
+            headers=shared.headers,
+            content=shared.content
+        )
+        self._shared = shared
+
+    def json(self, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().json(**kwargs)
+        return self._shared.json()
+
+class SingleFlightTransport(TransportLayer):
+    """Coalesces concurrent identical idempotent requests into one upstream call
+
+    Conditional and ``Cache-Control`` headers are part of the key, so a
+    revalidation that may be answered with a 304 is never shared with a
+    plain or ``no-cache`` read of the same URL.
+    """
+
+    name = "singleflight"
+
+    COALESCED_METHODS = frozenset({"GET", "HEAD"})
+    KEY_HEADERS = ("authorization", "accept", "if-none-match", "if-modified-since", "cache-control")
+
+    def __init__(
+        self,
+        inner: httpx.AsyncBaseTransport,
+        loads: Callable[[bytes], Any] = json.loads
+    ):
+        super().__init__(inner)
+        self.loads = loads
+        self.leaders = 0
+        self.coalesced = 0
+        self._in_flight: Dict[Tuple[str, ...], "asyncio.Future[_SharedBody]"] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if (
+            request.method not in self.COALESCED_METHODS
+            or request.extensions.get("letta_streamed")
+        ):
+            return await self.inner.handle_async_request(request)
+        
+        key = (request.method, str(request.url), request.extensions.get(BACKEND_EXTENSION, "")) + tuple(
+            request.headers.get(name, "") for name in self.KEY_HEADERS
+        )
+        
+        task = self._in_flight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(self._fetch(request))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        
+        # Shield the shared fetch so one caller's cancellation does not
+        # cancel it for everyone else
+        shared = await asyncio.shield(task)
+        return CoalescedResponse(shared)
+
+    async def _fetch(self, request: httpx.Request) -> _SharedBody:
+        response = await self.inner.handle_async_request(request)
+        try:
+            content = await response.aread()
+        finally:
+            await response.aclose()
+        
+        # The body has been decoded once already; drop the framing headers
+        # so each coalesced copy is served as plain bytes
+        headers = httpx.Headers(response.headers)
+        headers.pop("content-encoding", None)
+        headers.pop("transfer-encoding", None)
+        headers["content-length"] = str(len(content))
+        return _SharedBody(response.status_code, headers, content, self.loads)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "upstream_requests": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight_keys": len(self._in_flight)
+        }
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def _header_number(headers: httpx.Headers, *names: str) -> Optional[float]:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return float(value)
+            except ValueError:
+                continue
+    return None
+
+class RateLimitTransport(TransportLayer):
+    """Global token-bucket scheduler fed by Letta's rate-limit signals.
+
+    Requests are paced by a token bucket whose rate is either configured or
+    learned from ``X-RateLimit-*`` / ``RateLimit-*`` headers, which spread the
+    remaining budget over the rest of the window. A 429 pauses all outbound
+    requests for its ``Retry-After`` and the throttled request is queued and
+    replayed, so callers wait instead of failing. Only waits longer than
+    ``max_wait`` raise ``RateLimitError``.
+    """
+
+    name = "rate_limit"
+
+    def __init__(
+        self,
+        inner: httpx.AsyncBaseTransport,
+        rate: float = 0.0,
+        burst: int = 10,
+        max_wait: float = 60.0,
+        max_attempts: int = 3
+    ):
+        super().__init__(inner)
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.max_attempts = max_attempts
+        self.tokens = float(burst)
+        self.blocked_until = 0.0
+        self.learned_rate: Optional[float] = None
+        self.upstream_limit: Optional[float] = None
+        self.upstream_remaining: Optional[float] = None
+        self.upstream_reset_at: Optional[float] = None
+        self.throttled = 0
+        self.queued = 0
+        self.wait_seconds = 0.0
+        self._refilled_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def effective_rate(self) -> float:
+        """Requests per second currently allowed, or 0 when unpaced"""
+        rates = [r for r in (self.rate, self.learned_rate) if r]
+        return min(rates) if rates else 0.0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            attempt += 1
+            await self._acquire()
+            response = await self.inner.handle_async_request(request)
+            self._observe(response.headers)
+            
+            if response.status_code != 429:
+                return response
+            
+            self.throttled += 1
+            await response.aclose()
+            
+            retry_after = parse_retry_after(response.headers.get("retry-after"))
+            delay = retry_after if retry_after is not None else min(2.0 ** attempt, self.max_wait)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+            
+            if attempt >= self.max_attempts or delay > self.max_wait:
+                raise RateLimitError(
+                    f"Letta rate limit exceeded; retry after {delay:.1f}s",
+                    retry_after=math.ceil(delay)
+                )
+
+    async def _acquire(self) -> None:
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    rate = self.effective_rate
+                    if not rate:
+                        break
+                    
+                    self.tokens = min(
+                        float(self.burst),
+                        self.tokens + (now - self._refilled_at) * rate
+                    )
+                    self._refilled_at = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        break
+                    wait = (1 - self.tokens) / rate
+                
+                active = current_deadline()
+                if waited + wait > self.max_wait or (active is not None and wait > active.remaining()):
+                    raise RateLimitError(
+                        f"Letta rate limit budget exhausted; retry after {wait:.1f}s",
+                        retry_after=math.ceil(wait)
+                    )
+                
+                await asyncio.sleep(wait)
+                waited += wait
+        
+        if waited:
+            self.queued += 1
+            self.wait_seconds += waited
+
+    def _observe(self, headers: httpx.Headers) -> None:
+        limit = _header_number(headers, "x-ratelimit-limit", "ratelimit-limit")
+        remaining = _header_number(headers, "x-ratelimit-remaining", "ratelimit-remaining")
+        reset = _header_number(headers, "x-ratelimit-reset", "ratelimit-reset")
+        
+        if limit is not None:
+            self.upstream_limit = limit
+        if remaining is None:
+            return
+        
+        self.upstream_remaining = remaining
+        self.tokens = min(self.tokens, remaining)
+        if reset is None:
+            return
+        
+        # Reset is either seconds until the window resets or an epoch timestamp
+        reset_in = reset - time.time() if reset > 1e9 else reset
+        reset_in = max(reset_in, 0.0)
+        now = time.monotonic()
+        self.upstream_reset_at = now + reset_in
+        
+        if remaining < 1:
+            self.blocked_until = max(self.blocked_until, self.upstream_reset_at)
+            self.learned_rate = None
+        elif reset_in > 0:
+            self.learned_rate = remaining / reset_in
+
+    def metrics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "rate_per_second": round(self.effective_rate, 3) or None,
+            "tokens_available": round(self.tokens, 2) if self.effective_rate else None,
+            "upstream_limit": self.upstream_limit,
+            "upstream_remaining": self.upstream_remaining,
+            "upstream_reset_in": (
+                round(max(0.0, self.upstream_reset_at - now), 2)
+                if self.upstream_reset_at is not None else None
+            ),
+            "blocked_for": round(max(0.0, self.blocked_until - now), 2),
+            "throttled": self.throttled,
+            "queued": self.queued,
+            "wait_seconds": round(self.wait_seconds, 3)
+        }
+
+class _Circuit:
+    """State of a single endpoint family's circuit"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.short_circuited = 0
+        self.trips = 0
+
+class CircuitBreakerTransport(TransportLayer):
+    """Per-endpoint-family circuit breaker with half-open probing.
+
+    After ``failure_threshold`` consecutive failures (5xx responses or
+    transport errors) an endpoint family's circuit opens and its requests
+    fail fast with ``CircuitOpenError``. Once ``reset_timeout`` has passed a
+    single probe request is let through: success closes the circuit, failure
+    re-opens it.
+    """
+
+    name = "circuit_breaker"
+
+    def __init__(
+        self,
+        inner: httpx.AsyncBaseTransport,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0
+    ):
+        super().__init__(inner)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._circuits: Dict[str, _Circuit] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        family = endpoint_family(request.url.path)
+        circuit = self._circuits.setdefault(family, _Circuit())
+        is_probe = self._admit(family, circuit)
+        
+        try:
+            response = await self.inner.handle_async_request(request)
+        except httpx.TransportError:
+            self._record(circuit, success=False, is_probe=is_probe)
+            raise
+        except BaseException:
+            # Local errors (cancellation, client-side limits) say nothing
+            # about the endpoint's health
+            if is_probe:
+                circuit.probing = False
+            raise
+        
+        self._record(
+            circuit,
+            success=response.status_code not in FAILURE_STATUS_CODES,
+            is_probe=is_probe
+        )
+        return response
+
+    def _admit(self, family: str, circuit: _Circuit) -> bool:
+        """Decide whether a request may proceed; returns True for a probe"""
+        if circuit.state == _Circuit.CLOSED:
+            return False
+        
+        retry_in = circuit.opened_at + self.reset_timeout - time.monotonic()
+        if circuit.state == _Circuit.OPEN and retry_in <= 0:
+            circuit.state = _Circuit.HALF_OPEN
+        
+        if circuit.state == _Circuit.HALF_OPEN and not circuit.probing:
+            circuit.probing = True
+            return True
+        
+        circuit.short_circuited += 1
+        raise CircuitOpenError(family, max(retry_in, 0.0))
+
+    def _record(self, circuit: _Circuit, success: bool, is_probe: bool) -> None:
+        if is_probe:
+            circuit.probing = False
+        
+        if success:
+            circuit.state = _Circuit.CLOSED
+            circuit.failures = 0
+            return
+        
+        circuit.failures += 1
+        if is_probe or circuit.failures >= self.failure_threshold:
+            if circuit.state != _Circuit.OPEN:
+                circuit.trips += 1
+            circuit.state = _Circuit.OPEN
+            circuit.opened_at = time.monotonic()
+
+    def states(self) -> Dict[str, str]:
+        """Return the circuit state of each endpoint family seen so far"""
+        return {family: circuit.state for family, circuit in self._circuits.items()}
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            family: {
+                "state": circuit.state,
+                "consecutive_failures": circuit.failures,
+                "trips": circuit.trips,
+                "short_circuited": circuit.short_circuited
+            }
+            for family, circuit in self._circuits.items()
+        }
+
+class HedgingTransport(TransportLayer):
+    """Hedged idempotent GETs to cut tail latency.
+
+    If a GET has not answered within the ``percentile`` latency of its
+    endpoint family, a second identical request is fired and whichever
+    answers first wins; the loser is cancelled. Hedging only starts once
+    ``min_samples`` latencies have been observed, and the number of hedges
+    is capped at ``max_ratio`` of requests so a slow upstream is not hit
+    with twice the load.
+    """
+
+    name = "hedging"
+
+    HEDGED_METHODS = frozenset({"GET", "HEAD"})
+
+    def __init__(
+        self,
+        inner: httpx.AsyncBaseTransport,
+        percentile: float = 95.0,
+        max_ratio: float = 0.1,
+        min_delay: float = 0.05,
+        min_samples: int = 20,
+        window: int = 200
+    ):
+        super().__init__(inner)
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.window = window
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._latencies: Dict[str, Deque[float]] = {}
+
+    def hedge_delay(self, family: str) -> Optional[float]:
+        """Delay before hedging a request to ``family``, or None if not hedging yet"""
+        samples = self._latencies.get(family)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_delay, ordered[index])
+
+    def _record_latency(self, family: str, latency: float) -> None:
+        samples = self._latencies.get(family)
+        if samples is None:
+            samples = self._latencies[family] = deque(maxlen=self.window)
+        samples.append(latency)
+
+    async def _send(self, request: httpx.Request) -> Tuple[httpx.Response, float]:
+        start = time.monotonic()
+        response = await self.inner.handle_async_request(request)
+        return response, time.monotonic() - start
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method not in self.HEDGED_METHODS:
+            return await self.inner.handle_async_request(request)
+        
+        self.requests += 1
+        family = endpoint_family(request.url.path)
+        delay = self.hedge_delay(family)
+        
+        primary = asyncio.ensure_future(self._send(request))
+        tasks = {primary}
+        winner = None
+        try:
+            if delay is not None:
+                await asyncio.wait(tasks, timeout=delay)
+                if not primary.done() and self.hedged + 1 <= self.max_ratio * self.requests:
+                    self.hedged += 1
+                    tasks.add(asyncio.ensure_future(self._send(request)))
+            
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        break
+                if winner is not None:
+                    break
+            
+            if winner is None:
+                # Every attempt failed; surface the primary's error
+                winner = primary
+                return primary.result()[0]
+            
+            response, latency = winner.result()
+            if winner is not primary:
+                self.hedge_wins += 1
+            self._record_latency(family, latency)
+            return response
+        finally:
+            for task in tasks:
+                if task is winner:
+                    continue
+                if not task.done():
+                    task.cancel()
+                task.add_done_callback(self._discard_loser)
+
+    def _discard_loser(self, task: "asyncio.Future[Tuple[httpx.Response, float]]") -> None:
+        if task.cancelled() or task.exception() is not None:
+            return
+        
+        response = task.result()[0]
+        if not response.is_closed:
+            asyncio.ensure_future(response.aclose())
+
+    def metrics(self) -> Dict[str, Any]:
+        delays = {
+            family: self.hedge_delay(family) for family in self._latencies
+        }
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": round(self.hedged / self.requests, 3) if self.requests else 0.0,
+            "hedge_delay_ms": {
+                family: round(delay * 1000, 1)
+                for family, delay in delays.items() if delay is not None
+            }
+        }
+
+class DeadlineTransport(TransportLayer):
+    """Enforces the running operation's deadline across the whole stack.
+
+    Each request's connect/read/write/pool timeouts are clamped to the time
+    left, and the call through the inner layers (queueing, rate-limit
+    waits, retries) is cancelled when the deadline passes, raising the
+    Letta ``TimeoutError``. Requests made outside a deadline pass through.
+    """
+
+    name = "deadline"
+
+    # Slack for timers that fire a little before the deadline itself
+    EXPIRY_TOLERANCE = 0.01
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        super().__init__(inner)
+        self.requests = 0
+        self.clamped = 0
+        self.expired = 0
+
+    def _expired(self, active: Deadline) -> LettaTimeoutError:
+        self.expired += 1
+        return LettaTimeoutError(active.operation, active.seconds)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        active = current_deadline()
+        if active is None:
+            return await self.inner.handle_async_request(request)
+        
+        self.requests += 1
+        remaining = active.remaining()
+        if remaining <= 0:
+            raise self._expired(active)
+        
+        timeouts = dict(request.extensions.get("timeout", {}))
+        for phase in ("connect", "read", "write", "pool"):
+            configured = timeouts.get(phase)
+            if configured is None or configured > remaining:
+                timeouts[phase] = remaining
+                self.clamped += 1
+        request.extensions["timeout"] = timeouts
+        
+        try:
+            return await asyncio.wait_for(self.inner.handle_async_request(request), remaining)
+        except asyncio.TimeoutError as e:
+            raise self._expired(active) from e
+        except httpx.TimeoutException as e:
+            if active.remaining() <= self.EXPIRY_TOLERANCE:
+                raise self._expired(active) from e
+            raise
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "clamped_timeouts": self.clamped,
+            "expired": self.expired
+        }
+
+def agent_id_from_path(path: str) -> Optional[str]:
+    """Return the agent ID in an ``/v1/agents/{agent_id}/...`` path, if any"""
+    segments = [segment for segment in path.split("/") if segment]
+    if segments and segments[0] == "v1":
+        segments = segments[1:]
+    if len(segments) >= 2 and segments[0] == "agents":
+        return segments[1]
+    return None
+
+class _Backend:
+    """Load and health state of one upstream Letta instance"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ewma: Optional[float] = None
+        self.ejected_until = 0.0
+        self.ejections = 0
+
+    def is_ejected(self, now: float) -> bool:
+        return self.ejected_until > now
+
+class RoutingTransport(TransportLayer):
+    """Spreads requests over several Letta instances serving the same agents.
+
+    Requests are built against the first backend's URL and rewritten to the
+    chosen backend. ``policy`` is either ``"ewma"`` (lowest latency EWMA
+    weighted by outstanding requests) or ``"least_outstanding"``. With
+    ``sticky`` enabled, requests for an agent go to the same backend via
+    rendezvous hashing, so only that agent's traffic moves on failover.
+    Backends are passively ejected for ``ejection_time`` after
+    ``ejection_threshold`` consecutive failures; if every backend is
+    ejected, all are tried again. A request whose ``BACKEND_EXTENSION``
+    names a backend URL always goes to that backend.
+
+    Sits below the retry engine and hedging, so each attempt is routed
+    afresh. Attempts of the same request skip the backends that earlier
+    attempts went to, recorded in ``ATTEMPTED_BACKENDS_EXTENSION``; a sticky
+    agent's retry or hedge takes the next rendezvous rank. Once every
+    backend has been tried, attempts may reuse them.
+    """
+
+    name = "routing"
+
+    POLICIES = ("ewma", "least_outstanding")
+
+    def __init__(
+        self,
+        inner: httpx.AsyncBaseTransport,
+        backends: List[str],
+        policy: str = "ewma",
+        sticky: bool = True,
+        ejection_threshold: int = 3,
+        ejection_time: float = 30.0,
+        decay: float = 0.3
+    ):
+        super().__init__(inner)
+        if not backends:
+            raise ValueError("RoutingTransport requires at least one backend")
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown routing policy: {policy}")
+        
+        self.backends = [_Backend(str(httpx.URL(url)).rstrip("/")) for url in backends]
+        self.policy = policy
+        self.sticky = sticky
+        self.ejection_threshold = ejection_threshold
+        self.ejection_time = ejection_time
+        self.decay = decay
+
+    def _candidates(self) -> List[_Backend]:
+        now = time.monotonic()
+        healthy = [backend for backend in self.backends if not backend.is_ejected(now)]
+        if healthy:
+            return healthy
+        
+        # Fail open rather than refusing every request
+        return self.backends
+
+    def _score(self, backend: _Backend) -> Tuple[float, int]:
+        if self.policy == "least_outstanding":
+            return (backend.outstanding, backend.requests)
+        # Untried backends score zero so each gets sampled
+        return ((backend.ewma or 0.0) * (backend.outstanding + 1), backend.outstanding)
+
+    def choose(
+        self,
+        path: str,
+        pinned: Optional[str] = None,
+        attempted: Collection[str] = ()
+    ) -> _Backend:
+        """Pick the backend for a request to ``path``, or the ``pinned`` backend URL
+
+        Backends in ``attempted`` are skipped unless no other candidate is left.
+        """
+        if pinned is not None:
+            for backend in self.backends:
+                if backend.url == pinned:
+                    return backend
+        candidates = self._candidates()
+        untried = [backend for backend in candidates if backend.url not in attempted]
+        candidates = untried or candidates
+        agent_id = agent_id_from_path(path) if self.sticky else None
+        if agent_id is not None:
+            return max(
+                candidates,
+                key=lambda backend: hashlib.blake2b(
+                    f"{agent_id}|{backend.url}".encode(), digest_size=8
+                ).digest()
+            )
+        return min(candidates, key=self._score)
+
+    def _route(self, request: httpx.Request, backend: _Backend) -> httpx.Request:
+        url = str(request.url)
+        primary = self.backends[0].url
+        if url.startswith(primary):
+            url = backend.url + url[len(primary):]
+        
+        headers = httpx.Headers(request.headers)
+        headers["Host"] = httpx.URL(url).netloc.decode("ascii")
+        return httpx.Request(
+            request.method,
+            url,
+            headers=headers,
+            stream=request.stream,
+            extensions=request.extensions
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempted = request.extensions.get(ATTEMPTED_BACKENDS_EXTENSION)
+        if attempted is None:
+            # Replace rather than update the extensions, which may be a dict
+            # shared between requests such as STREAMED_REQUEST
+            attempted = set()
+            request.extensions = {**request.extensions, ATTEMPTED_BACKENDS_EXTENSION: attempted}
+        
+        backend = self.choose(request.url.path, request.extensions.get(BACKEND_EXTENSION), attempted)
+        attempted.add(backend.url)
+        routed = self._route(request, backend)
+        backend.outstanding += 1
+        backend.requests += 1
+        start = time.monotonic()
+        try:
+            response = await self.inner.handle_async_request(routed)
+        except httpx.TransportError:
+            backend.outstanding -= 1
+            self._record(backend, success=False)
+            raise
+        except BaseException:
+            backend.outstanding -= 1
+            raise
+        
+        self._record(
+            backend,
+            success=response.status_code not in FAILURE_STATUS_CODES,
+            latency=time.monotonic() - start
+        )
+        
+        def release() -> None:
+            backend.outstanding -= 1
+        
+        return on_response_close(response, release)
+
+    def _record(self, backend: _Backend, success: bool, latency: Optional[float] = None) -> None:
+        if latency is not None:
+            backend.ewma = latency if backend.ewma is None else (
+                self.decay * latency + (1 - self.decay) * backend.ewma
+            )
+        
+        if success:
+            backend.consecutive_failures = 0
+            return
+        
+        backend.failures += 1
+        backend.consecutive_failures += 1
+        if backend.consecutive_failures >= self.ejection_threshold:
+            backend.consecutive_failures = 0
+            backend.ejected_until = time.monotonic() + self.ejection_time
+            backend.ejections += 1
+            logger.warning(
+                f"Ejecting Letta backend {backend.url} for {self.ejection_time:.0f}s "
+                f"after {self.ejection_threshold} consecutive failures"
+            )
+
+    def metrics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "policy": self.policy,
+            "backends": {
+                backend.url: {
+                    "outstanding": backend.outstanding,
+                    "requests": backend.requests,
+                    "failures": backend.failures,
+                    "ewma_ms": round(backend.ewma * 1000, 1) if backend.ewma is not None else None,
+                    "ejected": backend.is_ejected(now),
+                    "ejections": backend.ejections
+                }
+                for backend in self.backends
+            }
+        }
+
+class _BrotliDecoder:
+    """Adapts brotli's ``Decompressor`` to the zlib decompressobj interface"""
+
+    def __init__(self, module: Any):
+        self._decompressor = module.Decompressor()
+        self._process = getattr(self._decompressor, "process", None) or self._decompressor.decompress
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._process(data)
+
+    def flush(self) -> bytes:
+        return b""
+
+def available_decoders() -> Dict[str, Callable[[], Any]]:
+    """Content codings this process can decompress, most compact first.
+
+    gzip and deflate are always available; br needs ``brotli`` (or
+    ``brotlicffi``) and zstd needs ``zstandard``.
+    """
+    decoders: Dict[str, Callable[[], Any]] = {}
+    
+    try:
+        import zstandard
+        decoders["zstd"] = lambda: zstandard.ZstdDecompressor().decompressobj()
+    except ImportError:
+        pass
+    
+    for module_name in ("brotli", "brotlicffi"):
+        try:
+            module = __import__(module_name)
+        except ImportError:
+            continue
+        decoders["br"] = partial(_BrotliDecoder, module)
+        break
+    
+    # wbits with +32 accepts both zlib and gzip framing
+    decoders["gzip"] = lambda: zlib.decompressobj(zlib.MAX_WBITS | 32)
+    decoders["deflate"] = lambda: zlib.decompressobj(zlib.MAX_WBITS | 32)
+    return decoders
+
+class _DecodingStream(httpx.AsyncByteStream):
+    """Byte stream that decompresses chunks as they arrive, counting bytes on both sides"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, decoders: List[Any], stats: Dict[str, int]):
+        self._stream = stream
+        self._decoders = decoders
+        self._stats = stats
+
+    def _decode(self, data: bytes, final: bool = False) -> bytes:
+        try:
+            for decoder in self._decoders:
+                data = decoder.decompress(data)
+                if final:
+                    data += decoder.flush()
+        except Exception as e:
+            # zlib, brotli and zstandard each raise their own error types
+            raise httpx.DecodingError(f"Failed to decompress response body: {e}") from e
+        return data
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            self._stats["wire_bytes"] += len(chunk)
+            data = self._decode(chunk)
+            if data:
+                self._stats["decoded_bytes"] += len(data)
+                yield data
+        
+        data = self._decode(b"", final=True)
+        if data:
+            self._stats["decoded_bytes"] += len(data)
+            yield data
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+
+class CompressionTransport(TransportLayer):
+    """Negotiates compressed responses and decompresses them as they stream.
+
+    Advertises every coding in ``available_decoders()`` (zstd, br, gzip,
+    deflate) and decodes the body chunk by chunk, so callers see plain bytes.
+    Wire and decoded byte counts are kept per endpoint family to show the
+    bandwidth saved. With ``enabled=False`` only ``identity`` is requested
+    and bytes are still counted.
+    """
+
+    name = "compression"
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, enabled: bool = True):
+        super().__init__(inner)
+        self.decoders = available_decoders() if enabled else {}
+        self.accept_encoding = ", ".join(self.decoders) or "identity"
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _family_stats(self, family: str) -> Dict[str, int]:
+        stats = self._stats.get(family)
+        if stats is None:
+            stats = self._stats[family] = {
+                "responses": 0,
+                "compressed_responses": 0,
+                "wire_bytes": 0,
+                "decoded_bytes": 0
+            }
+        return stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.headers["Accept-Encoding"] = self.accept_encoding
+        response = await self.inner.handle_async_request(request)
+        
+        stats = self._family_stats(endpoint_family(request.url.path))
+        stats["responses"] += 1
+        
+        codings = [
+            coding.strip().lower()
+            for coding in response.headers.get("content-encoding", "").split(",")
+            if coding.strip() and coding.strip().lower() != "identity"
+        ]
+        if any(coding not in self.decoders for coding in codings):
+            # Leave codings we cannot decode to httpx
+            return response
+        
+        headers = httpx.Headers(response.headers)
+        if codings:
+            stats["compressed_responses"] += 1
+            headers.pop("content-encoding", None)
+            headers.pop("content-length", None)
+        
+        # Codings are listed in the order they were applied
+        decoders = [self.decoders[coding]() for coding in reversed(codings)]
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=headers,
+            stream=_DecodingStream(response.stream, decoders, stats),
+            extensions=response.extensions
+        )
+
+    def metrics(self) -> Dict[str, Any]:
+        wire = sum(stats["wire_bytes"] for stats in self._stats.values())
+        decoded = sum(stats["decoded_bytes"] for stats in self._stats.values())
+        return {
+            "accept_encoding": self.accept_encoding,
+            "wire_bytes": wire,
+            "decoded_bytes": decoded,
+            "saved_ratio": round(1 - wire / decoded, 3) if decoded else 0.0,
+            "endpoints": {family: dict(stats) for family, stats in self._stats.items()}
+        }
+
+class _CachedResponse:
+    """A stored GET response and its validators"""
+
+    def __init__(self, status_code: int, headers: httpx.Headers, content: bytes):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.stored_at = time.monotonic()
+
+    @property
+    def validators(self) -> Dict[str, str]:
+        conditional = {}
+        if "etag" in self.headers:
+            conditional["If-None-Match"] = self.headers["etag"]
+        if "last-modified" in self.headers:
+            conditional["If-Modified-Since"] = self.headers["last-modified"]
+        return conditional
+
+class _TeeStream(httpx.AsyncByteStream):
+    """Byte stream that hands the complete body to a callback once fully read"""
+
+    def __init__(
+        self,
+        stream: httpx.AsyncByteStream,
+        max_bytes: int,
+        on_complete: Callable[[bytes], None]
+    ):
+        self._stream = stream
+        self._max_bytes = max_bytes
+        self._on_complete = on_complete
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        chunks: Optional[List[bytes]] = []
+        size = 0
+        async for chunk in self._stream:
+            if chunks is not None:
+                size += len(chunk)
+                if size > self._max_bytes:
+                    chunks = None
+                else:
+                    chunks.append(chunk)
+            yield chunk
+        
+        if chunks is not None:
+            self._on_complete(b"".join(chunks))
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+
+class HttpCacheTransport(TransportLayer):
+    """Private HTTP cache for GET responses with conditional revalidation.
+
+    Responses carrying an ``ETag`` or ``Last-Modified`` validator are
+    revalidated with ``If-None-Match`` / ``If-Modified-Since``, and a 304
+    is answered from the stored body. Responses without validators are
+    only served from cache when a heuristic ``ttl`` is set (off by default),
+    and never for volatile endpoint families such as conversation history.
+    ``Cache-Control: max-age`` is honored as the freshness lifetime and
+    ``no-store`` disables caching. A request sent with ``Cache-Control:
+    no-cache`` always goes upstream and refreshes the entry, for reads that
+    must see current state. A successful write invalidates the cached
+    entries for the written resource and its collection.
+
+    Bodies are captured as the caller streams them, so incremental decoding
+    is unaffected.
+    """
+
+    name = "http_cache"
+
+    KEY_HEADERS = ("authorization", "accept")
+    CONDITIONAL_HEADERS = ("if-none-match", "if-modified-since")
+    VOLATILE_FAMILIES = frozenset({"messages", "stats"})
+
+    def __init__(
+        self,
+        inner: httpx.AsyncBaseTransport,
+        ttl: float = 0.0,
+        max_entries: int = 512,
+        max_entry_bytes: int = 5 * 1024 * 1024
+    ):
+        super().__init__(inner)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_entry_bytes = max_entry_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[Tuple[str, ...], _CachedResponse]" = OrderedDict()
+
+    def _key(self, request: httpx.Request) -> Tuple[str, ...]:
+        return (str(request.url),) + tuple(
+            request.headers.get(name, "") for name in self.KEY_HEADERS
+        )
+
+    def _lifetime(self, request: httpx.Request, entry: _CachedResponse) -> float:
+        directives = _cache_control(entry.headers)
+        if "max-age" in directives:
+            try:
+                return float(directives["max-age"])
+            except ValueError:
+                return 0.0
+        if entry.validators or endpoint_family(request.url.path) in self.VOLATILE_FAMILIES:
+            return 0.0
+        return self.ttl
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method != "GET":
+            response = await self.inner.handle_async_request(request)
+            if response.status_code < 400:
+                self.invalidate(request.url.path)
+            return response
+        
+        directives = _cache_control(request.headers)
+        if "no-store" in directives or any(name in request.headers for name in self.CONDITIONAL_HEADERS):
+            # The caller manages its own validators, or wants nothing stored
+            return await self.inner.handle_async_request(request)
+        
+        key = self._key(request)
+        if "no-cache" in directives:
+            # Read through to upstream; the response replaces the entry
+            self.bypassed += 1
+            self._entries.pop(key, None)
+            entry = None
+        else:
+            entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            if time.monotonic() - entry.stored_at < self._lifetime(request, entry):
+                self.hits += 1
+                return self._serve(entry, "hit")
+            
+            for name, value in entry.validators.items():
+                request.headers[name] = value
+        
+        response = await self.inner.handle_async_request(request)
+        
+        if response.status_code == 304 and entry is not None:
+            await response.aclose()
+            self.revalidated += 1
+            for name in ("etag", "last-modified", "cache-control", "date", "expires"):
+                if name in response.headers:
+                    entry.headers[name] = response.headers[name]
+            entry.stored_at = time.monotonic()
+            return self._serve(entry, "revalidated")
+        
+        self.misses += 1
+        response.extensions["cache"] = "miss"
+        if entry is not None:
+            self._entries.pop(key, None)
+        if not self._storable(response):
+            return response
+        
+        headers = httpx.Headers(response.headers)
+        headers.pop("content-length", None)
+        headers.pop("transfer-encoding", None)
+        
+        def store(content: bytes) -> None:
+            if len(content) > self.max_entry_bytes:
+                return
+            self._entries[key] = _CachedResponse(response.status_code, headers, content)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        
+        if isinstance(response, CoalescedResponse):
+            # Already buffered; keep the shared parse for the caller
+            store(response.content)
+            return response
+        
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_TeeStream(response.stream, self.max_entry_bytes, store),
+            extensions=response.extensions
+        )
+
+    def _storable(self, response: httpx.Response) -> bool:
+        if response.status_code != 200:
+            return False
+        if response.headers.get("vary", "").strip() == "*":
+            return False
+        directives = _cache_control(response.headers)
+        return "no-store" not in directives and "private" not in directives
+
+    def _serve(self, entry: _CachedResponse, outcome: str) -> httpx.Response:
+        return httpx.Response(
+            status_code=entry.status_code,
+            headers=entry.headers,
+            content=entry.content,
+            extensions={"cache": outcome}
+        )
+
+    def invalidate(self, path: str) -> int:
+        """Drop entries for the resource at ``path``, its sub-resources and its collection"""
+        segments = [segment for segment in path.split("/") if segment]
+        prefix_length = 3 if segments[:1] == ["v1"] else 2
+        root = "/" + "/".join(segments[:prefix_length])
+        collection = "/" + "/".join(segments[:prefix_length - 1])
+        
+        def is_stale(key: Tuple[str, ...]) -> bool:
+            entry_path = httpx.URL(key[0]).path
+            return entry_path in (root, collection) or entry_path.startswith(root + "/")
+        
+        stale = [key for key in self._entries if is_stale(key)]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.revalidated + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_ratio": round((self.hits + self.revalidated) / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+def _cache_control(headers: httpx.Headers) -> Dict[str, str]:
+    directives = {}
+    for directive in headers.get("cache-control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+    return directives
+
+def iter_layers(transport: Optional[httpx.AsyncBaseTransport]) -> Iterator[TransportLayer]:
+    """Walk a transport chain from the outermost layer inwards"""
+    while isinstance(transport, TransportLayer):
+        yield transport
+        transport = transport.inner
+
+def find_layer(client: httpx.AsyncClient, layer_type: type) -> Optional[Any]:
+    """Return the first layer of ``layer_type`` in the client's transport chain"""
+    for layer in iter_layers(getattr(client, "_transport", None)):
+        if isinstance(layer, layer_type):
+            return layer
+    return None
+
+def collect_metrics(client: httpx.AsyncClient) -> Dict[str, Dict[str, Any]]:
+    """Gather metrics from every layer in the client's transport chain"""
+    return {
+        layer.name: layer.metrics()
+        for layer in iter_layers(getattr(client, "_transport", None))
+    }
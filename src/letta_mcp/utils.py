@@ -4,20 +4,16 @@ Utility functions for Letta MCP Server
 
 import re
 import json
+import base64
+import codecs
 import logging
-from typing import Dict, Any, List, Optional, Union
-from datetime import datetime
+from typing import Dict, Any, List, Optional, Union, Callable, Sequence, AsyncIterator, AsyncIterable
+from datetime import datetime, timezone
 import httpx
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_exponential,
-    retry_if_exception_type,
-    before_sleep_log
-)
 
 from .models import Message, MessageType, ToolCall
-from .exceptions import ValidationError, APIError
+from .exceptions import ValidationError, APIError, ConfigurationError
+from .transport import CompressionTransport, RetryBudget, RetryTransport, StreamLimitTransport
 
 logger = logging.getLogger(__name__)
 
@@ -121,6 +117,14 @@ def format_timestamp(timestamp: Union[str, datetime, None]) -> Optional[str]:
     
     return str(timestamp)
 
+def parse_timestamp(timestamp: str, field: str = "timestamp") -> datetime:
+    """Parse an ISO 8601 timestamp, treating ones without an offset as UTC"""
+    try:
+        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    except (ValueError, AttributeError) as e:
+        raise ValidationError(f"Invalid ISO 8601 timestamp: {timestamp}", field=field) from e
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
 def truncate_text(text: str, max_length: int = 1000, suffix: str = "...") -> str:
     """Truncate text to maximum length"""
     if len(text) <= max_length:
@@ -148,32 +152,241 @@ def create_retry_client(
     headers: Dict[str, str],
     timeout: int = 60,
     max_retries: int = 3,
-    pool_size: int = 10
+    pool_size: int = 10,
+    http2: bool = False,
+    keepalive_expiry: float = 5.0,
+    max_streams: int = 100,
+    layers: Optional[Sequence[Callable[[httpx.AsyncBaseTransport], httpx.AsyncBaseTransport]]] = None,
+    retry_base_delay: float = 0.2,
+    retry_max_delay: float = 10.0,
+    retry_budget_ratio: float = 0.2,
+    compression: bool = True,
+    connect_timeout: Optional[float] = None,
+    read_timeout: Optional[float] = None,
+    write_timeout: Optional[float] = None,
+    pool_timeout: Optional[float] = None,
+    router: Optional[Callable[[httpx.AsyncBaseTransport], httpx.AsyncBaseTransport]] = None,
+    cache: Optional[Callable[[httpx.AsyncBaseTransport], httpx.AsyncBaseTransport]] = None,
+    pool: Optional[httpx.AsyncBaseTransport] = None
 ) -> httpx.AsyncClient:
-    """Create an HTTP client with retry logic"""
+    """Create an HTTP client with retry logic
+    
+    Retries are handled by ``RetryTransport`` directly above the connection
+    pool, limited to ``max_retries`` per request and to ``retry_budget_ratio``
+    retries per request across the client.
+    
+    In HTTP/2 mode ``pool_size`` bounds the number of TCP connections and each
+    connection multiplexes up to ``max_streams`` concurrent requests.
+    
+    ``CompressionTransport`` sits directly on the pool, negotiating gzip,
+    brotli or zstd (``compression=False`` requests identity encoding) and
+    counting wire and decoded bytes per endpoint family.
+    
+    ``router`` (a transport factory, e.g. a ``RoutingTransport`` partial) is
+    placed directly below the retry engine so every attempt is routed afresh.
+    
+    ``layers`` are transport factories applied innermost first, so the last
+    one sees each request before the others.
+    
+    ``cache`` (a transport factory, e.g. an ``HttpCacheTransport`` partial)
+    wraps everything else, so fresh hits skip limits, retries and the network.
+    
+    ``timeout`` applies to every phase of a request unless overridden by
+    ``connect_timeout``, ``read_timeout``, ``write_timeout`` or ``pool_timeout``.
+    
+    ``pool`` replaces the pooled HTTP transport at the bottom of the stack,
+    e.g. with an ``httpx.MockTransport`` in tests.
+    """
     
     # Configure connection pooling
-    limits = httpx.Limits(
-        max_keepalive_connections=pool_size,
-        max_connections=pool_size * 2
-    )
+    if http2:
+        limits = httpx.Limits(
+            max_keepalive_connections=pool_size,
+            max_connections=pool_size,
+            keepalive_expiry=keepalive_expiry
+        )
+    else:
+        limits = httpx.Limits(
+            max_keepalive_connections=pool_size,
+            max_connections=pool_size * 2,
+            keepalive_expiry=keepalive_expiry
+        )
     
-    # Create transport with retries
-    transport = httpx.AsyncHTTPTransport(
-        limits=limits,
-        retries=max_retries
-    )
+    # Create pooled transport
+    try:
+        transport: httpx.AsyncBaseTransport = pool or httpx.AsyncHTTPTransport(
+            limits=limits,
+            http2=http2
+        )
+    except ImportError as e:
+        raise ConfigurationError(
+            "HTTP/2 mode requires the 'h2' package. "
+            "Install it with: pip install letta-mcp-server[http2]"
+        ) from e
+    
+    transport = CompressionTransport(transport, enabled=compression)
+    
+    if http2:
+        transport = StreamLimitTransport(transport, max_in_flight=pool_size * max_streams)
+    
+    if router is not None:
+        transport = router(transport)
+    
+    if max_retries > 0:
+        transport = RetryTransport(
+            transport,
+            max_retries=max_retries,
+            base_delay=retry_base_delay,
+            max_delay=retry_max_delay,
+            budget=RetryBudget(ratio=retry_budget_ratio)
+        )
+    
+    for layer in layers or ():
+        transport = layer(transport)
+    
+    if cache is not None:
+        transport = cache(transport)
+    
+    phase_timeouts = {
+        phase: value
+        for phase, value in (
+            ("connect", connect_timeout),
+            ("read", read_timeout),
+            ("write", write_timeout),
+            ("pool", pool_timeout)
+        )
+        if value is not None
+    }
     
     # Create client
     client = httpx.AsyncClient(
         base_url=base_url,
         headers=headers,
-        timeout=httpx.Timeout(timeout),
+        timeout=httpx.Timeout(timeout, **phase_timeouts),
         transport=transport
     )
     
     return client
 
+_JSON_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",]"
+
+async def iter_json_array(chunks: AsyncIterable[bytes]) -> AsyncIterator[Any]:
+    """Incrementally decode a top-level JSON array, yielding one item at a time
+    
+    Only the item being decoded is held in memory, so large list responses can
+    be filtered and summarized as they stream in. A document that is not an
+    array is decoded whole so the error reports what was received instead.
+    """
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    iterator = chunks.__aiter__()
+    buffer = ""
+    pos = 0
+    expect_value = True
+    first = True
+    started = False
+    eof = False
+    # Buffer size to reach before re-attempting an incomplete item, so an
+    # item spanning many chunks is re-parsed a logarithmic number of times
+    retry_at = 0
+    
+    while True:
+        if not eof and (pos >= len(buffer) or len(buffer) < retry_at or not started):
+            try:
+                buffer += utf8.decode(await iterator.__anext__())
+            except StopAsyncIteration:
+                buffer += utf8.decode(b"", final=True)
+                eof = True
+            
+            if not started:
+                stripped = buffer.lstrip(_WHITESPACE)
+                if not stripped:
+                    if eof:
+                        raise ValueError("Empty response body; expected a JSON array")
+                    continue
+                if stripped[0] != "[":
+                    # Not an array: fall back to decoding the whole body
+                    async for rest in iterator:
+                        buffer += utf8.decode(rest)
+                    buffer += utf8.decode(b"", final=True)
+                    for item in _whole_document_items(buffer):
+                        yield item
+                    return
+                started = True
+                pos = len(buffer) - len(stripped) + 1
+            continue
+        
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        if pos >= len(buffer):
+            if eof:
+                raise ValueError("Truncated JSON array in response body")
+            continue
+        
+        char = buffer[pos]
+        if char == "]" and (first or not expect_value):
+            return
+        
+        if not expect_value:
+            if char != ",":
+                raise ValueError(f"Malformed JSON array: unexpected {char!r}")
+            pos += 1
+            expect_value = True
+            continue
+        
+        try:
+            item, end = _JSON_DECODER.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            if eof and e.pos >= len(buffer):
+                raise ValueError("Truncated JSON array in response body") from e
+            if eof:
+                raise
+            retry_at = 2 * len(buffer)
+            continue
+        
+        if not eof and (end >= len(buffer) or buffer[end] not in _DELIMITERS):
+            # A number cut off mid-chunk may continue in the next one
+            retry_at = len(buffer) + 1
+            continue
+        
+        yield item
+        first = False
+        expect_value = False
+        retry_at = 0
+        
+        # Drop decoded items to keep memory bounded
+        buffer = buffer[end:]
+        pos = 0
+
+def _whole_document_items(document: str) -> List[Any]:
+    data = json.loads(document)
+    if not isinstance(data, list):
+        raise ValueError(f"Expected a JSON array, got {type(data).__name__}")
+    return data
+
+def encode_cursor(offset: int, **context: Any) -> str:
+    """Encode a resumable listing position as an opaque cursor
+    
+    ``context`` records the arguments the position is only valid for (such
+    as a server-side filter) so ``decode_cursor`` can reject a mismatch.
+    """
+    payload = json.dumps({"offset": offset, **context}, separators=(",", ":"), sort_keys=True)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, **context: Any) -> int:
+    """Return the offset in a cursor made by ``encode_cursor`` with the same context"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        offset = payload.pop("offset")
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        raise ValidationError(f"Invalid cursor: {cursor}", field="cursor") from e
+    
+    if not isinstance(offset, int) or offset < 0 or payload != context:
+        raise ValidationError("Cursor does not belong to this listing", field="cursor")
+    return offset
+
 def parse_tool_definition(tool_def: Dict[str, Any]) -> Dict[str, Any]:
     """Parse a tool definition for MCP format"""
     return {
@@ -223,24 +436,3 @@ def is_streaming_supported(model: str) -> bool:
     }
     
     return model not in non_streaming_models
-
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=4, max=10),
-    retry=retry_if_exception_type(httpx.HTTPError),
-    before_sleep=before_sleep_log(logger, logging.WARNING)
-)
-async def resilient_request(
-    client: httpx.AsyncClient,
-    method: str,
-    url: str,
-    **kwargs
-) -> httpx.Response:
-    """Make an HTTP request with automatic retries"""
-    response = await client.request(method, url, **kwargs)
-    
-    # Raise for status codes that should trigger retry
-    if response.status_code in [429, 500, 502, 503, 504]:
-        response.raise_for_status()
-    
-    return response
\ No newline at end of file
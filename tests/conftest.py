@@ -61,6 +61,26 @@ def mock_server(mock_config):
     return server
 
 
+@pytest.fixture
+def serve(mock_config):
+    """Factory serving a mock Letta API to a server through its full transport stack
+    
+    ``serve(handler)`` builds a server from ``mock_config``, or attaches the
+    handler to ``server`` when one is given. The client comes from
+    ``LettaMCPServer.create_client`` with the handler's ``MockTransport`` as
+    the connection pool, so every configured layer sees the requests.
+    Retries back off for a millisecond to keep failure tests fast.
+    """
+    mock_config.retry_base_delay = 0.001
+    
+    def attach(handler, server: Optional[LettaMCPServer] = None) -> LettaMCPServer:
+        server = server or LettaMCPServer(mock_config)
+        server.client = server.create_client(pool=httpx.MockTransport(handler))
+        return server
+    
+    return attach
+
+
 @pytest.fixture
 def real_server(real_config):
     """Real server instance for integration tests"""
@@ -0,0 +1,227 @@
+"""
+Unit tests for the entity cache
+"""
+
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from letta_mcp.cache import DiskCache, EntityCache
+
+
+def loader(value, calls):
+    async def load():
+        calls.append(value)
+        return value
+    return load
+
+
+class TestEntityCache:
+    """Test read-through caching, expiry, eviction and invalidation"""
+
+    @pytest.mark.asyncio
+    async def test_read_through(self):
+        """Test a miss loads and stores the value and a hit skips the loader"""
+        cache = EntityCache()
+        calls = []
+
+        first = await cache.get_or_load("agent", "agent-1", loader({"id": "agent-1"}, calls))
+        second = await cache.get_or_load("agent", "agent-1", loader({"id": "stale"}, calls))
+
+        assert first == second == {"id": "agent-1"}
+        assert len(calls) == 1
+        assert cache.metrics()["hits"] == 1
+        assert cache.metrics()["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_ttl_per_kind(self):
+        """Test each kind expires on its own TTL and a TTL of 0 disables it"""
+        cache = EntityCache(ttls={"memory": 0, "agent": 0.01})
+        calls = []
+
+        await cache.get_or_load("memory", "agent-1", loader([], calls))
+        await cache.get_or_load("memory", "agent-1", loader([], calls))
+        assert len(calls) == 2
+
+        cache.put("agent", "agent-1", {"id": "agent-1"})
+        assert cache.get("agent", "agent-1") is not None
+        await asyncio.sleep(0.02)
+        assert cache.get("agent", "agent-1") is None
+        assert cache.metrics()["entries"] == 0
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted at capacity"""
+        cache = EntityCache(max_entries=2)
+        cache.put("agent", "agent-1", {})
+        cache.put("agent", "agent-2", {})
+        cache.get("agent", "agent-1")
+        cache.put("agent", "agent-3", {})
+
+        assert cache.get("agent", "agent-2") is None
+        assert cache.get("agent", "agent-1") is not None
+        assert cache.metrics()["evictions"] == 1
+
+    def test_invalidation(self):
+        """Test single entries, whole kinds and everything for an agent can be dropped"""
+        cache = EntityCache()
+        cache.put("agent", "agent-1", {})
+        cache.put("agent", "agent-2", {})
+        cache.put("memory", "agent-1", [])
+        cache.put("tools", "", [])
+
+        assert cache.invalidate_agent("agent-1") == 2
+        assert cache.get("agent", "agent-2") is not None
+        assert cache.invalidate("tools") == 1
+        assert cache.metrics()["entries"] == 1
+        assert cache.metrics()["invalidations"] == 3
+
+    @pytest.mark.asyncio
+    async def test_load_racing_a_write_is_not_stored(self):
+        """Test a value loaded before an invalidation finished is not cached"""
+        cache = EntityCache()
+        release = asyncio.Event()
+
+        async def slow_load():
+            await release.wait()
+            return {"name": "before"}
+
+        task = asyncio.ensure_future(cache.get_or_load("agent", "agent-1", slow_load))
+        await asyncio.sleep(0)
+        cache.invalidate("agent", "agent-1")
+        release.set()
+
+        assert await task == {"name": "before"}
+        assert cache.get("agent", "agent-1") is None
+
+    @pytest.mark.asyncio
+    async def test_disabled(self):
+        """Test a disabled cache always calls the loader"""
+        cache = EntityCache(enabled=False)
+        calls = []
+
+        await cache.get_or_load("tools", "", loader([], calls))
+        await cache.get_or_load("tools", "", loader([], calls))
+
+        assert len(calls) == 2
+        assert cache.metrics()["entries"] == 0
+
+
+class TestDiskCache:
+    """Test the SQLite store shared between server processes"""
+
+    def test_entries_survive_reopening(self, tmp_path):
+        """Test a value written by one process is read by the next"""
+        writer = DiskCache(tmp_path, scope="a")
+        writer.put("tools", "", [{"name": "search"}], ttl=60)
+        writer.close()
+
+        value, remaining = DiskCache(tmp_path, scope="a").get("tools", "")
+
+        assert value == [{"name": "search"}]
+        assert 0 < remaining <= 60
+
+    def test_scopes_are_isolated(self, tmp_path):
+        """Test entries for one Letta server are not visible to another"""
+        writer = DiskCache(tmp_path, scope="a")
+        writer.put("agent", "agent-1", {"name": "A"}, ttl=60)
+        writer.flush()
+
+        assert DiskCache(tmp_path, scope="b").get("agent", "agent-1") is None
+
+    def test_expired_entries_are_misses(self, tmp_path):
+        """Test entries past their TTL are not returned"""
+        store = DiskCache(tmp_path)
+        store.put("agent", "agent-1", {}, ttl=0.01)
+        store.flush()
+        time.sleep(0.02)
+
+        assert store.get("agent", "agent-1") is None
+        assert store.metrics()["misses"] == 1
+
+    def test_size_cap_evicts_least_recently_used(self, tmp_path):
+        """Test the oldest-read entries are removed once the cap is exceeded"""
+        store = DiskCache(tmp_path, max_bytes=250, trim_every=1)
+        for name in ("agent-1", "agent-2"):
+            store.put("agent", name, {"description": "x" * 80}, ttl=60)
+        store.flush()
+        store.get("agent", "agent-1")
+        store.put("agent", "agent-3", {"description": "x" * 80}, ttl=60)
+        store.flush()
+
+        assert store.get("agent", "agent-2") is None
+        assert store.get("agent", "agent-1") is not None
+        assert store.metrics()["bytes"] <= 250
+
+    def test_schema_version_change_rebuilds(self, tmp_path):
+        """Test a store written by another schema version is discarded"""
+        store = DiskCache(tmp_path)
+        store.put("tools", "", [], ttl=60)
+        store.close()
+
+        conn = sqlite3.connect(str(store.path))
+        conn.execute("UPDATE meta SET value = '0' WHERE key = 'schema_version'")
+        conn.commit()
+        conn.close()
+
+        assert DiskCache(tmp_path).get("tools", "") is None
+
+    @pytest.mark.asyncio
+    async def test_entity_cache_reads_and_invalidates_through_store(self, tmp_path):
+        """Test a new process starts warm and invalidations reach other processes"""
+        calls = []
+        first = EntityCache(store=DiskCache(tmp_path))
+        await first.get_or_load("agent", "agent-1", loader({"name": "A"}, calls))
+        await first.get_or_load("memory", "agent-1", loader([], calls))
+        first.store.flush()
+
+        second = EntityCache(store=DiskCache(tmp_path))
+        assert await second.get_or_load("agent", "agent-1", loader({"name": "B"}, calls)) == {"name": "A"}
+        assert second.get("memory", "agent-1") is None
+        assert len(calls) == 2
+
+        first.invalidate("agent", "agent-1")
+        first.store.flush()
+        third = EntityCache(store=DiskCache(tmp_path))
+        assert await third.aget("agent", "agent-1") is None
+
+    @pytest.mark.asyncio
+    async def test_writes_do_not_wait_on_a_locked_database(self, tmp_path):
+        """Test puts return at once while another process holds the write lock"""
+        store = DiskCache(tmp_path)
+        other = sqlite3.connect(str(store.path), isolation_level=None)
+        other.execute("BEGIN EXCLUSIVE")
+
+        started = time.monotonic()
+        store.put("agent", "agent-1", {"name": "A"}, ttl=60)
+        store.delete("tools")
+        elapsed = time.monotonic() - started
+
+        other.execute("COMMIT")
+        other.close()
+        assert elapsed < 0.5
+        assert (await store.aget("agent", "agent-1"))[0] == {"name": "A"}
+
+    def test_size_cap_enforced_every_n_writes(self, tmp_path):
+        """Test trimming is batched rather than run on every write"""
+        store = DiskCache(tmp_path, max_bytes=250, trim_every=3)
+        for name in ("agent-1", "agent-2", "agent-3"):
+            store.put("agent", name, {"description": "x" * 80}, ttl=60)
+        store.flush()
+        assert store.metrics()["entries"] == 2
+
+        store.put("agent", "agent-4", {"description": "x" * 80}, ttl=60)
+        store.flush()
+        assert store.metrics()["entries"] == 3
+        assert store.metrics()["bytes"] > 250
+
+    def test_capabilities_preloaded(self, tmp_path):
+        """Test capabilities, which are looked up synchronously, are read from disk up front"""
+        store = DiskCache(tmp_path)
+        store.put("capabilities", "usage_stats", {"available": False}, ttl=60)
+        store.close()
+
+        cache = EntityCache(store=DiskCache(tmp_path))
+
+        assert cache.get("capabilities", "usage_stats") == {"available": False}
@@ -0,0 +1,65 @@
+"""
+Unit tests for the optional endpoint registry
+"""
+
+import time
+
+import httpx
+
+from letta_mcp.cache import EntityCache
+from letta_mcp.capabilities import CapabilityRegistry, is_unsupported
+
+
+def status_error(status_code):
+    request = httpx.Request("GET", "http://letta.test/v1/stats/usage")
+    response = httpx.Response(status_code, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+class TestCapabilityRegistry:
+    """Test capabilities are remembered and expire with the entity cache"""
+
+    def test_unsupported_statuses(self):
+        """Test only not-found style statuses mark an endpoint as missing"""
+        assert is_unsupported(status_error(404))
+        assert is_unsupported(status_error(501))
+        assert not is_unsupported(status_error(500))
+        assert not is_unsupported(ValueError("404"))
+
+    def test_record_and_skip(self):
+        """Test a missing endpoint is skipped and counted"""
+        registry = CapabilityRegistry(EntityCache())
+
+        assert registry.supported("usage_stats") is None
+        assert registry.use_fallback("usage_stats") is False
+
+        registry.record("usage_stats", False)
+        registry.record("message_search", True)
+
+        assert registry.use_fallback("usage_stats") is True
+        assert registry.use_fallback("message_search") is False
+        assert registry.metrics() == {
+            "endpoints": {
+                "message_search": "available",
+                "usage_stats": "unavailable",
+                "agent_name_search": "unknown"
+            },
+            "skipped_requests": 1
+        }
+
+    def test_results_expire(self):
+        """Test results expire with the capabilities TTL of the entity cache"""
+        registry = CapabilityRegistry(EntityCache(ttls={"capabilities": 0.01}))
+        registry.record("usage_stats", False)
+        assert registry.supported("usage_stats") is False
+
+        time.sleep(0.02)
+        assert registry.supported("usage_stats") is None
+
+    def test_remembered_without_entity_cache(self):
+        """Test results are kept in process when the entity cache would not store them"""
+        for cache in (EntityCache(enabled=False), EntityCache(ttls={"capabilities": 0})):
+            registry = CapabilityRegistry(cache)
+            registry.record("agent_name_search", False)
+
+            assert registry.supported("agent_name_search") is False
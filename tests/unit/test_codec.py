@@ -0,0 +1,82 @@
+"""
+Unit tests for the JSON codec module
+"""
+
+import sys
+from datetime import datetime
+
+import pytest
+
+from letta_mcp.codec import JSONCodec, OrjsonCodec, get_codec
+from letta_mcp.exceptions import ConfigurationError
+
+
+def available_codecs():
+    codecs = [JSONCodec()]
+    for name in ("orjson", "msgspec"):
+        try:
+            codecs.append(get_codec(name))
+        except ConfigurationError:
+            pass
+    return codecs
+
+
+class TestCodecs:
+    """Test every installed backend behaves like the stdlib codec"""
+    
+    @pytest.mark.parametrize("codec", available_codecs(), ids=lambda codec: codec.name)
+    def test_round_trip(self, codec):
+        """Test decode and encode agree with the stdlib"""
+        data = {"agents": [{"id": "agent-1", "name": "Café", "tools": [], "score": 1.5}]}
+        
+        assert codec.loads(b'{"agents": [{"id": "agent-1", "name": "Caf\\u00e9", "tools": [], "score": 1.5}]}') == data
+        assert codec.loads(codec.dumps(data)) == data
+        assert codec.loads(codec.dumps(data, indent=True)) == data
+    
+    @pytest.mark.parametrize("codec", available_codecs(), ids=lambda codec: codec.name)
+    def test_compact_and_indented_output(self, codec):
+        """Test compact output has no whitespace and indented output is readable"""
+        compact = codec.dumps({"a": [1, 2]})
+        indented = codec.dumps({"a": [1, 2]}, indent=True)
+        
+        assert isinstance(compact, str)
+        assert compact == '{"a":[1,2]}'
+        assert "\n  " in indented
+    
+    @pytest.mark.parametrize("codec", available_codecs(), ids=lambda codec: codec.name)
+    def test_malformed_input_raises_value_error(self, codec):
+        """Test every backend reports malformed input as ValueError"""
+        with pytest.raises(ValueError):
+            codec.loads(b'{"id": ')
+    
+    def test_stdlib_encodes_unknown_types_as_strings(self):
+        """Test values such as datetimes do not break serialization"""
+        assert JSONCodec().dumps({"at": datetime(2024, 1, 1)}) == '{"at":"2024-01-01 00:00:00"}'
+
+
+class TestGetCodec:
+    """Test backend selection"""
+    
+    def test_auto_prefers_installed_fast_backend(self):
+        """Test auto picks orjson when it is installed"""
+        pytest.importorskip("orjson")
+        assert isinstance(get_codec("auto"), OrjsonCodec)
+    
+    def test_auto_falls_back_to_stdlib(self, monkeypatch):
+        """Test auto falls back to the stdlib without fast backends"""
+        monkeypatch.setitem(sys.modules, "orjson", None)
+        monkeypatch.setitem(sys.modules, "msgspec", None)
+        
+        assert get_codec("auto").name == "stdlib"
+    
+    def test_missing_backend_raises(self, monkeypatch):
+        """Test naming an uninstalled backend raises ConfigurationError"""
+        monkeypatch.setitem(sys.modules, "msgspec", None)
+        
+        with pytest.raises(ConfigurationError, match="not installed"):
+            get_codec("msgspec")
+    
+    def test_unknown_backend_raises(self):
+        """Test unknown backends are rejected"""
+        with pytest.raises(ConfigurationError, match="Unknown JSON backend"):
+            get_codec("simplejson")
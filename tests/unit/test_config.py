@@ -7,7 +7,7 @@ import pytest
 from unittest.mock import patch
 from pydantic import ValidationError
 
-from letta_mcp.config import LettaConfig, load_config
+from letta_mcp.config import DEFAULT_TOOL_DEADLINES, LettaConfig, create_default_config, load_config
 from letta_mcp.exceptions import ConfigurationError
 
 
@@ -87,6 +87,187 @@ class TestLettaConfig:
         assert restored_config.base_url == original_config.base_url
         assert restored_config.timeout == original_config.timeout
 
+    
+    def test_from_yaml_performance_section(self, tmp_path):
+        """Test HTTP/2 and pool settings are read from the performance section"""
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text(
+            "letta:\n"
+            "  api_key: test-key\n"
+            "  base_url: http://localhost:8283\n"
+            "performance:\n"
+            "  connection_pool_size: 4\n"
+            "  http2: true\n"
+            "  keepalive_expiry: 30\n"
+            "  max_streams: 250\n"
+        )
+        
+        config = LettaConfig.from_yaml(config_file)
+        
+        assert config.connection_pool_size == 4
+        assert config.http2 is True
+        assert config.keepalive_expiry == 30
+        assert config.http2_max_streams == 250
+    
+    def test_http2_from_env(self, env_var_helper):
+        """Test HTTP/2 settings are read from environment variables"""
+        env_var_helper.set("LETTA_HTTP2", "true")
+        env_var_helper.set("LETTA_HTTP2_MAX_STREAMS", "50")
+        env_var_helper.set("LETTA_KEEPALIVE_EXPIRY", "12.5")
+        
+        config = LettaConfig.from_env()
+        
+        assert config.http2 is True
+        assert config.http2_max_streams == 50
+        assert config.keepalive_expiry == 12.5
+    
+    def test_invalid_max_streams(self):
+        """Test that max streams must be positive"""
+        config = LettaConfig(base_url="http://localhost:8283", http2_max_streams=0)
+        
+        with pytest.raises(ConfigurationError, match="max streams"):
+            config.validate()
+    
+    def test_deadlines_from_yaml(self, tmp_path):
+        """Test deadline budgets and phase timeouts are read from YAML"""
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text(
+            "letta:\n"
+            "  base_url: http://localhost:8283\n"
+            "performance:\n"
+            "  timeout: 30\n"
+            "  connect_timeout: 5\n"
+            "deadlines:\n"
+            "  default: 45\n"
+            "  letta_send_message: 120\n"
+        )
+        
+        config = LettaConfig.from_yaml(config_file)
+        
+        assert config.connect_timeout == 5
+        assert config.read_timeout is None
+        assert config.deadline_for("letta_send_message") == 120
+        assert config.deadline_for("letta_get_agent") == 45
+        assert config.deadline_for("letta_health_check") == 10
+        assert LettaConfig(timeout=30).deadline_for("letta_get_agent") == 30
+    
+    def test_deadlines_from_env(self, env_var_helper):
+        """Test deadline budgets are read from environment variables"""
+        env_var_helper.set("LETTA_BASE_URL", "http://localhost:8283")
+        env_var_helper.set("LETTA_TOOL_DEADLINES", "letta_health_check=3, letta_send_message=90")
+        env_var_helper.set("LETTA_READ_TIMEOUT", "20")
+        
+        config = LettaConfig.from_env()
+        
+        assert config.tool_deadlines == {"letta_health_check": 3.0, "letta_send_message": 90.0}
+        assert config.read_timeout == 20.0
+        
+        config.tool_deadlines["letta_send_message"] = 0
+        with pytest.raises(ConfigurationError, match="Deadline for letta_send_message"):
+            config.validate()
+    
+    def test_backends_from_env(self, env_var_helper):
+        """Test a list of backends replaces base_url"""
+        env_var_helper.set("LETTA_BACKENDS", "http://letta-1:8283, http://letta-2:8283")
+        env_var_helper.set("LETTA_ROUTING_POLICY", "least_outstanding")
+        
+        config = LettaConfig.from_env()
+        config.validate()
+        
+        assert config.backend_urls() == ["http://letta-1:8283", "http://letta-2:8283"]
+        assert config.routing_policy == "least_outstanding"
+        assert LettaConfig(base_url="http://localhost:8283").backend_urls() == ["http://localhost:8283"]
+        
+        config.routing_policy = "random"
+        with pytest.raises(ConfigurationError, match="Routing policy"):
+            config.validate()
+    
+    def test_json_codec_settings(self, env_var_helper):
+        """Test the JSON backend is read from the environment and validated"""
+        env_var_helper.set("LETTA_JSON_BACKEND", "stdlib")
+        env_var_helper.set("LETTA_COMPACT_JSON", "false")
+        
+        config = LettaConfig.from_env()
+        
+        assert config.json_backend == "stdlib"
+        assert config.compact_json is False
+        
+        config = LettaConfig(base_url="http://localhost:8283", json_backend="simplejson")
+        with pytest.raises(ConfigurationError, match="JSON backend"):
+            config.validate()
+    
+    def test_http_cache_settings(self, env_var_helper):
+        """Test the response cache is configured from the environment and validated"""
+        env_var_helper.set("LETTA_HTTP_CACHE_TTL", "5")
+        env_var_helper.set("LETTA_HTTP_CACHE_MAX_ENTRIES", "64")
+        
+        config = LettaConfig.from_env()
+        
+        assert config.http_cache is True
+        assert config.http_cache_ttl == 5.0
+        assert config.http_cache_max_entries == 64
+        
+        config = LettaConfig(base_url="http://localhost:8283", http_cache_max_entries=0)
+        with pytest.raises(ConfigurationError, match="HTTP cache"):
+            config.validate()
+    
+    def test_bulk_settings(self, env_var_helper):
+        """Test bulk concurrency and item limits are read and validated"""
+        env_var_helper.set("LETTA_BULK_CONCURRENCY", "3")
+        env_var_helper.set("LETTA_BULK_MAX_ITEMS", "20")
+        
+        config = LettaConfig.from_env()
+        
+        assert config.bulk_concurrency == 3
+        assert config.bulk_max_items == 20
+        assert config.deadline_for("letta_create_agents_bulk") == 300.0
+        
+        config = LettaConfig(base_url="http://localhost:8283", bulk_concurrency=0)
+        with pytest.raises(ConfigurationError, match="Bulk concurrency"):
+            config.validate()
+    
+    def test_default_deadlines_match_config_template(self, tmp_path):
+        """Test the generated config file declares the built-in deadlines"""
+        path = create_default_config(tmp_path / "config.yaml")
+        
+        config = LettaConfig.from_yaml(path)
+        
+        assert config.tool_deadlines == DEFAULT_TOOL_DEADLINES
+        assert config.deadline_for("letta_send_message") == 120.0
+        assert LettaConfig().deadline_for("letta_send_message") == 120.0
+    
+    def test_entity_cache_section(self, tmp_path):
+        """Test the cache section of a YAML config sets per-kind TTLs"""
+        path = tmp_path / "config.yaml"
+        path.write_text(
+            "letta:\n  base_url: http://localhost:8283\n"
+            "cache:\n  max_entries: 50\n  ttl:\n    agent: 5\n    tools: 0\n"
+        )
+        
+        config = LettaConfig.from_yaml(path)
+        config.validate()
+        
+        assert config.entity_cache is True
+        assert config.entity_cache_max_entries == 50
+        assert config.entity_cache_ttls == {"agent": 5.0, "tools": 0.0}
+        
+        config.entity_cache_ttls["blocks"] = 10
+        with pytest.raises(ConfigurationError, match="Unknown cache entity"):
+            config.validate()
+    
+    def test_disk_cache_settings(self, env_var_helper):
+        """Test the on-disk cache is opt-in and configured from the environment"""
+        assert LettaConfig().disk_cache is False
+        
+        env_var_helper.set("LETTA_DISK_CACHE", "true")
+        env_var_helper.set("LETTA_DISK_CACHE_DIR", "/tmp/letta-cache")
+        env_var_helper.set("LETTA_DISK_CACHE_MAX_MB", "5")
+        
+        config = LettaConfig.from_env()
+        
+        assert config.disk_cache is True
+        assert config.disk_cache_dir == "/tmp/letta-cache"
+        assert config.disk_cache_max_mb == 5.0
 
 class TestLoadConfig:
     """Test the load_config function"""
@@ -0,0 +1,85 @@
+"""
+Unit tests for fleet snapshots
+"""
+
+import asyncio
+
+import pytest
+
+from letta_mcp.exceptions import ValidationError
+from letta_mcp.fleet import agent_snapshot, create_payload, pipelined
+
+
+class TestSnapshots:
+    """Test the portable agent snapshot format"""
+    
+    def test_round_trip_to_create_payload(self):
+        """Test a snapshot keeps what is needed to recreate the agent"""
+        agent = {
+            "id": "agent-1", "name": "Support", "description": "Helps", "system": "Be kind",
+            "model": "openai/gpt-4o", "tags": ["prod"], "llm_config": {"model_endpoint": "http://internal"},
+            "tools": [{"id": "tool-1", "name": "web_search"}, "run_code"]
+        }
+        blocks = [{"id": "block-1", "label": "human", "value": "Zack", "limit": 2000, "description": None}]
+        
+        snapshot = agent_snapshot(agent, blocks)
+        payload = create_payload(snapshot, "openai/gpt-4o-mini", "openai/text-embedding-3-small")
+        
+        assert snapshot["tools"] == ["web_search", "run_code"]
+        assert snapshot["memory_blocks"] == [{"label": "human", "value": "Zack", "limit": 2000}]
+        assert "llm_config" not in snapshot
+        assert payload["model"] == "openai/gpt-4o"
+        assert payload["embedding"] == "openai/text-embedding-3-small"
+        assert payload["system"] == "Be kind"
+        assert payload["tags"] == ["prod"]
+    
+    def test_invalid_snapshots(self):
+        """Test snapshots without a name or from a newer format are rejected"""
+        with pytest.raises(ValidationError):
+            create_payload({"description": "nameless"}, "m", "e")
+        with pytest.raises(ValidationError, match="version"):
+            create_payload({"name": "A", "version": 99}, "m", "e")
+
+
+class TestPipelined:
+    """Test the bounded, ordered pipeline used by export and import"""
+    
+    @pytest.mark.asyncio
+    async def test_order_bound_and_errors(self):
+        """Test results keep input order, stay within the bound and carry exceptions"""
+        state = {"in_flight": 0, "peak": 0}
+        
+        async def operation(n):
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+            await asyncio.sleep(0.001 * (10 - n))
+            state["in_flight"] -= 1
+            if n == 4:
+                raise ValueError("bad item")
+            return n * 2
+        
+        results = [pair async for pair in pipelined(range(10), operation, 3)]
+        
+        assert [item for item, _ in results] == list(range(10))
+        assert results[1] == (1, 2)
+        assert isinstance(results[4][1], ValueError)
+        assert state["peak"] == 3
+    
+    @pytest.mark.asyncio
+    async def test_source_read_lazily(self):
+        """Test items are only pulled from the source as slots free up"""
+        pulled = []
+        
+        async def source():
+            for n in range(100):
+                pulled.append(n)
+                yield n
+        
+        async def operation(n):
+            return n
+        
+        async for item, _ in pipelined(source(), operation, 2):
+            if item == 5:
+                break
+        
+        assert len(pulled) <= 8
@@ -0,0 +1,104 @@
+"""
+Unit tests for the agent search index
+"""
+
+from letta_mcp.index import AgentIndex, tokenize
+
+
+def agent(agent_id, name, description="", last_modified="2026-01-01T00:00:00Z"):
+    return {"id": agent_id, "name": name, "description": description, "last_modified": last_modified}
+
+
+def ids(results):
+    return [result["id"] for result in results]
+
+
+class TestAgentIndex:
+    """Test search semantics and incremental maintenance"""
+
+    def build(self):
+        index = AgentIndex()
+        index.sync([
+            agent("a1", "Billing Bot", "Handles invoices and refunds"),
+            agent("a2", "Support Triage", "Routes billing questions"),
+            agent("a3", "Research", "Summarizes papers"),
+        ])
+        return index
+
+    def test_tokenize(self):
+        """Test words are lower-cased and split on punctuation"""
+        assert tokenize("Billing-Bot v2.0") == ["billing", "bot", "v2", "0"]
+
+    def test_word_and_prefix_queries(self):
+        """Test queries match whole words and word prefixes in names and descriptions"""
+        index = self.build()
+
+        assert ids(index.search("billing")) == ["a1", "a2"]
+        assert ids(index.search("supp")) == ["a2"]
+        assert ids(index.search("billing bot")) == ["a1"]
+        assert index.search("nothing") == []
+
+    def test_substring_semantics_are_kept(self):
+        """Test matches inside words are found through the index, as with the upstream filter"""
+        index = self.build()
+
+        assert ids(index.search("ill")) == ["a1", "a2"]
+        assert ids(index.search("g bot")) == ["a1"]
+        assert ids(index.search("arizes")) == ["a3"]
+        assert index.search("llib") == []
+        assert index.metrics()["scans"] == 0
+
+    def test_only_wordless_queries_scan(self):
+        """Test a scan happens only for queries with no letters or digits"""
+        index = self.build()
+        index.upsert(agent("a4", "Ops - Nightly"))
+
+        assert ids(index.search("billing", limit=1)) == ["a1"]
+        assert ids(index.search("zzz", limit=5)) == []
+        assert index.metrics()["scans"] == 0
+        assert ids(index.search(" - ")) == ["a4"]
+        assert index.metrics()["scans"] == 1
+
+    def test_results_in_one_stable_order(self):
+        """Test results are ordered by name then ID, whatever the limit"""
+        index = AgentIndex()
+        index.sync([agent("b2", "Helper"), agent("b1", "helper"), agent("b0", "Assistant helper")])
+
+        assert ids(index.search("help")) == ["b0", "b1", "b2"]
+        assert ids(index.search("elp", limit=2)) == ["b0", "b1"]
+        assert ids(index.search()) == ["b0", "b1", "b2"]
+
+    def test_name_only_matches_names(self):
+        """Test the name argument ignores descriptions"""
+        index = self.build()
+
+        assert ids(index.search(name="billing")) == ["a1"]
+        assert ids(index.search("routes", name="support")) == ["a2"]
+
+    def test_sync_reindexes_only_changes(self):
+        """Test a resync adds, updates and removes only what changed"""
+        index = self.build()
+
+        changes = index.sync([
+            agent("a1", "Billing Bot", "Handles invoices and refunds"),
+            agent("a2", "Escalations", "Routes angry customers", last_modified="2026-02-01T00:00:00Z"),
+            agent("a4", "Scheduler"),
+        ])
+
+        assert changes == {"added": 1, "updated": 1, "removed": 1}
+        assert ids(index.search("support")) == []
+        assert ids(index.search("escal")) == ["a2"]
+        assert ids(index.search("research")) == []
+        assert index.metrics()["agents"] == 3
+
+    def test_write_through_updates(self):
+        """Test upserts, field updates and removals are searchable immediately"""
+        index = self.build()
+
+        index.upsert(agent("a5", "Onboarding Guide"))
+        index.update("a3", {"name": "Literature Review"})
+        index.remove("a1")
+
+        assert ids(index.search("onboard")) == ["a5"]
+        assert ids(index.search("literature")) == ["a3"]
+        assert ids(index.search("billing")) == ["a2"]
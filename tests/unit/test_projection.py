@@ -0,0 +1,78 @@
+"""
+Unit tests for read tool field projection
+"""
+
+import pytest
+
+from letta_mcp.exceptions import ValidationError
+from letta_mcp.projection import compile_fields, project
+
+
+RESULT = {
+    "success": True,
+    "agent": {
+        "id": "agent-1",
+        "name": "Support",
+        "tools": [{"name": "search", "tags": ["web"]}, {"name": "run_code", "tags": []}],
+        "memory": {"human": {"value": "Likes tea", "limit": 2000}, "persona": {"value": "Helpful", "limit": 2000}}
+    },
+    "count": 1
+}
+
+
+class TestProjection:
+    """Test dotted-path selection over tool results"""
+    
+    def test_paths_select_nested_values(self):
+        """Test only the selected keys are returned, plus the success flag"""
+        projected = project(RESULT, compile_fields(["agent.name", "count"]))
+        
+        assert projected == {"success": True, "agent": {"name": "Support"}, "count": 1}
+    
+    def test_lists_and_wildcards(self):
+        """Test paths apply to every list element and '*' matches any key"""
+        projected = project(RESULT, compile_fields(["agent.tools.name", "agent.memory.*.value"]))
+        
+        assert projected["agent"]["tools"] == [{"name": "search"}, {"name": "run_code"}]
+        assert projected["agent"]["memory"] == {"human": {"value": "Likes tea"}, "persona": {"value": "Helpful"}}
+    
+    def test_wildcard_over_lists_selects_elements(self):
+        """Test '*' steps into list elements instead of matching every element key"""
+        history = {"success": True, "messages": [
+            {"role": "user", "content": "hi", "id": "message-1"},
+            {"role": "assistant", "content": "hello", "id": "message-2"}
+        ]}
+        
+        assert project(history, compile_fields(["messages.*.content"]))["messages"] == [
+            {"content": "hi"}, {"content": "hello"}
+        ]
+        assert project(history, compile_fields(["messages.*.content", "messages.role"]))["messages"] == [
+            {"content": "hi", "role": "user"}, {"content": "hello", "role": "assistant"}
+        ]
+        assert project(history, compile_fields(["messages.*"]))["messages"] == history["messages"]
+        assert project(RESULT, compile_fields(["agent.tools.*.name"]))["agent"]["tools"] == [
+            {"name": "search"}, {"name": "run_code"}
+        ]
+    
+    def test_shorter_path_keeps_value_whole(self):
+        """Test a parent path wins over its children in either order"""
+        assert compile_fields(["agent.name", "agent"]) == compile_fields(["agent", "agent.name"])
+        assert project(RESULT, compile_fields(["agent", "agent.name"]))["agent"] is RESULT["agent"]
+    
+    def test_source_not_modified_and_missing_paths_ignored(self):
+        """Test projection builds new containers and skips unknown paths"""
+        projected = project(RESULT, compile_fields(["agent.nope", "missing.path"]))
+        
+        assert projected == {"success": True, "agent": {}}
+        assert set(RESULT["agent"]) == {"id", "name", "tools", "memory"}
+    
+    def test_failures_returned_whole(self):
+        """Test error results keep every detail"""
+        failure = {"success": False, "error": "boom", "status": 404}
+        
+        assert project(failure, compile_fields(["agent"])) is failure
+    
+    def test_invalid_paths(self):
+        """Test empty path segments are rejected"""
+        with pytest.raises(ValidationError):
+            compile_fields(["agent..name"])
@@ -0,0 +1,84 @@
+"""
+Unit tests for declarative agent reconciliation
+"""
+
+import pytest
+
+from letta_mcp.exceptions import ValidationError
+from letta_mcp.reconcile import describe_plan, is_noop, load_desired_state, plan_agent, read_desired_state
+
+
+LIVE_AGENT = {
+    "id": "agent-1",
+    "name": "support",
+    "description": "Helps customers",
+    "model": "openai/gpt-4o-mini",
+    "tags": ["prod", "support"],
+    "tools": [{"id": "tool-1", "name": "web_search"}, {"id": "tool-2", "name": "run_code"}]
+}
+LIVE_BLOCKS = [
+    {"id": "block-1", "label": "human", "value": "Zack", "limit": 2000},
+    {"id": "block-2", "label": "persona", "value": "Helpful", "limit": 2000}
+]
+
+
+class TestPlanAgent:
+    """Test diffing a declared agent against its live state"""
+    
+    def test_matching_state_is_noop(self):
+        """Test equal values, reordered sets and undeclared fields need no writes"""
+        desired = {
+            "name": "support",
+            "description": "Helps customers",
+            "tags": ["support", "prod"],
+            "tools": ["run_code", "web_search"],
+            "memory_blocks": [{"label": "human", "value": "Zack"}]
+        }
+        
+        assert is_noop(plan_agent(desired, LIVE_AGENT, LIVE_BLOCKS))
+    
+    def test_only_differences_are_planned(self):
+        """Test the plan holds just the changed fields and blocks"""
+        desired = {
+            "name": "support",
+            "description": "Helps customers",
+            "model": "openai/gpt-4.1-mini",
+            "tools": ["web_search"],
+            "memory_blocks": [
+                {"label": "human", "value": "Zack", "limit": 4000},
+                {"label": "persona", "value": "Helpful"},
+                {"label": "policies", "value": "No refunds"}
+            ]
+        }
+        
+        plan = plan_agent(desired, LIVE_AGENT, LIVE_BLOCKS)
+        
+        assert plan["patch"] == {"model": "openai/gpt-4.1-mini", "tools": ["web_search"]}
+        assert plan["update_blocks"] == [{"id": "block-1", "label": "human", "changes": {"limit": 4000}}]
+        assert plan["create_blocks"] == [{"label": "policies", "value": "No refunds"}]
+        assert describe_plan(plan) == {
+            "fields": ["model", "tools"], "blocks_updated": ["human"], "blocks_created": ["policies"]
+        }
+
+
+class TestDesiredState:
+    """Test validation of desired-state documents"""
+    
+    def test_file_with_agents_list(self, tmp_path):
+        """Test a YAML file with an agents list is loaded"""
+        path = tmp_path / "agents.yaml"
+        path.write_text("agents:\n  - name: support\n    tools: [web_search]\n")
+        
+        assert read_desired_state(path) == [{"name": "support", "tools": ["web_search"]}]
+    
+    @pytest.mark.parametrize("document, message", [
+        ({"agents": "support"}, "list of agents"),
+        ([{"description": "nameless"}], "needs a name"),
+        ([{"name": "a", "colour": "blue"}], "Unknown fields"),
+        ([{"name": "a"}, {"name": "a"}], "more than once"),
+        ([{"name": "a", "memory_blocks": [{"value": "x"}]}], "needs a label"),
+    ])
+    def test_invalid_documents(self, document, message):
+        """Test malformed declarations are rejected before anything is fetched"""
+        with pytest.raises(ValidationError, match=message):
+            load_desired_state(document)
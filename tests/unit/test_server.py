@@ -5,10 +5,28 @@ Unit tests for the main server module
 import pytest
 from unittest.mock import Mock, AsyncMock, patch
 import httpx
+import json
+import asyncio
 
 from letta_mcp.server import LettaMCPServer, create_server, run_server
 from letta_mcp.config import LettaConfig
-from letta_mcp.exceptions import ConfigurationError
+from letta_mcp.exceptions import ConfigurationError, ValidationError
+from letta_mcp.transport import (
+    AdaptiveConcurrencyTransport,
+    CircuitBreakerTransport,
+    DeadlineTransport,
+    HttpCacheTransport,
+    RetryTransport,
+    RoutingTransport,
+    SingleFlightTransport,
+    current_priority,
+    find_layer
+)
+
+
+async def get_tool_fn(server, name):
+    """Return the underlying function of a registered tool"""
+    return (await server.mcp.get_tool(name)).fn
 
 
 class TestLettaMCPServer:
@@ -445,4 +463,1428 @@ class TestServerIntegration:
         
         # Verify all API calls were made
         assert mock_server.client.post.call_count == 2
-        assert mock_server.client.get.call_count == 1
\ No newline at end of file
+        assert mock_server.client.get.call_count == 1
+
+
+class TestClientLayers:
+    """Test the transport layers wired into the server's HTTP client"""
+    
+    def test_adaptive_concurrency_enabled_by_default(self, mock_config):
+        """Test the AIMD limiter starts at the configured pool size"""
+        mock_config.connection_pool_size = 7
+        server = LettaMCPServer(mock_config)
+        
+        limiter = find_layer(server.client, AdaptiveConcurrencyTransport)
+        assert limiter is not None
+        assert limiter.limit == 7
+    
+    def test_concurrency_limit_capped_at_pool_capacity(self, mock_config):
+        """Test the limiter never allows more requests than the pool can carry"""
+        mock_config.connection_pool_size = 4
+        mock_config.concurrency_min_limit = 8
+        
+        limiter = find_layer(LettaMCPServer(mock_config).client, AdaptiveConcurrencyTransport)
+        assert (limiter.min_limit, limiter.max_limit) == (4, 4)
+        
+        mock_config.http2 = True
+        mock_config.http2_max_streams = 20
+        
+        limiter = find_layer(LettaMCPServer(mock_config).client, AdaptiveConcurrencyTransport)
+        assert (limiter.min_limit, limiter.max_limit) == (8, 80)
+    
+    def test_router_added_for_multiple_backends(self, mock_config):
+        """Test several backends put a router below the retry engine"""
+        assert find_layer(LettaMCPServer(mock_config).client, RoutingTransport) is None
+        
+        mock_config.backends = ["http://letta-1:8283", "http://letta-2:8283"]
+        server = LettaMCPServer(mock_config)
+        
+        router = find_layer(server.client, RoutingTransport)
+        assert [backend.url for backend in router.backends] == mock_config.backends
+        assert isinstance(find_layer(server.client, RetryTransport).inner, RoutingTransport)
+        assert str(server.client.base_url) == "http://letta-1:8283"
+    
+    def test_adaptive_concurrency_disabled(self, mock_config):
+        """Test the limiter can be turned off"""
+        mock_config.adaptive_concurrency = False
+        server = LettaMCPServer(mock_config)
+        
+        assert find_layer(server.client, AdaptiveConcurrencyTransport) is None
+    
+    @pytest.mark.asyncio
+    async def test_health_check_reports_client_metrics(self, mock_config):
+        """Test letta_health_check includes transport layer metrics"""
+        server = LettaMCPServer(mock_config)
+        server.client = httpx.AsyncClient(
+            base_url=mock_config.base_url,
+            transport=AdaptiveConcurrencyTransport(
+                httpx.MockTransport(lambda request: httpx.Response(200, json=[]))
+            )
+        )
+        
+        health_check = await get_tool_fn(server, "letta_health_check")
+        result = await health_check()
+        
+        assert result["success"] is True
+        assert result["client_metrics"]["concurrency"]["in_flight"] == 0
+        assert result["client_metrics"]["concurrency"]["rejected"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_health_check_reports_circuit_state(self, mock_config):
+        """Test letta_health_check reports open circuits and fails fast"""
+        calls = 0
+        
+        def handler(request):
+            nonlocal calls
+            calls += 1
+            return httpx.Response(503)
+        
+        server = LettaMCPServer(mock_config)
+        server.client = httpx.AsyncClient(
+            base_url=mock_config.base_url,
+            transport=CircuitBreakerTransport(httpx.MockTransport(handler), failure_threshold=1)
+        )
+        
+        health_check = await get_tool_fn(server, "letta_health_check")
+        first = await health_check()
+        second = await health_check()
+        
+        assert first["status"] == "unhealthy"
+        assert second["circuits"] == {"agents": "open"}
+        assert "circuit open" in second["error"]
+        assert calls == 1
+    
+    @pytest.mark.asyncio
+    async def test_health_check_probes_every_backend(self, mock_config):
+        """Test each routed backend is probed and reported by its own URL"""
+        backends = ["http://letta-1:8283", "http://letta-2:8283", "http://letta-3:8283"]
+        hosts = []
+        
+        def handler(request):
+            hosts.append(request.url.host)
+            if request.url.host == "letta-2":
+                return httpx.Response(503)
+            return httpx.Response(200, headers={"X-API-Version": "1.2"}, json=[])
+        
+        server = LettaMCPServer(mock_config)
+        server.client = httpx.AsyncClient(
+            base_url=backends[0],
+            transport=SingleFlightTransport(RoutingTransport(httpx.MockTransport(handler), backends))
+        )
+        
+        result = await (await get_tool_fn(server, "letta_health_check"))()
+        
+        assert sorted(hosts) == ["letta-1", "letta-2", "letta-3"]
+        assert result["success"] is True
+        assert result["status"] == "degraded"
+        assert "base_url" not in result
+        assert result["backends"]["http://letta-1:8283"] == {"status": "healthy", "api_version": "1.2"}
+        assert result["backends"]["http://letta-2:8283"]["status"] == "unhealthy"
+        assert "503" in result["backends"]["http://letta-2:8283"]["error"]
+
+
+
+class TestFreshReads:
+    """Test health checks and read-modify-write pre-reads bypass the HTTP cache"""
+    
+    AGENT_ID = "agent-12345678-1234-1234-1234-123456789012"
+    
+    @pytest.fixture
+    def served(self, mock_config, serve):
+        state = {
+            "status": 200,
+            "agent": {"id": self.AGENT_ID, "name": "bot", "model": "openai/gpt-4o-mini", "tools": ["web_search"]},
+            "blocks": [{"id": "block-1", "label": "human", "value": "Zack"}]
+        }
+        writes = []
+        
+        def handler(request):
+            path = request.url.path
+            if request.method != "GET":
+                body = json.loads(request.content)
+                writes.append((path, body))
+                return httpx.Response(200, json=body)
+            if state["status"] != 200:
+                return httpx.Response(state["status"])
+            if path == "/v1/agents":
+                first_page = int(request.url.params.get("offset", 0)) == 0
+                return httpx.Response(200, json=[state["agent"]] if first_page else [])
+            if path.endswith("/memory-blocks"):
+                return httpx.Response(200, json=state["blocks"])
+            return httpx.Response(200, json=state["agent"])
+        
+        # A heuristic TTL opted into, so plain GETs would otherwise be reused
+        mock_config.http_cache_ttl = 60
+        return serve(handler), state, writes
+    
+    @pytest.mark.asyncio
+    async def test_health_check_sees_upstream_failure(self, served):
+        """Test a cached healthy listing does not hide a 503"""
+        server, state, _ = served
+        health_check = await get_tool_fn(server, "letta_health_check")
+        await server.client.get("/v1/agents", params={"limit": 1})
+        assert (await health_check())["status"] == "healthy"
+        
+        state["status"] = 503
+        result = await health_check()
+        
+        assert result["status"] == "unhealthy"
+    
+    @pytest.mark.asyncio
+    async def test_attach_keeps_concurrent_change(self, served):
+        """Test attach reads the live tool list, not a cached copy"""
+        server, state, writes = served
+        await server.client.get(f"/v1/agents/{self.AGENT_ID}")
+        state["agent"] = {**state["agent"], "tools": ["web_search", "run_code"]}
+        
+        result = await (await get_tool_fn(server, "letta_attach_tool"))(agent_id=self.AGENT_ID, tool_name="memory")
+        
+        assert result["tools"] == ["web_search", "run_code", "memory"]
+        assert writes == [(f"/v1/agents/{self.AGENT_ID}", {"tools": ["web_search", "run_code", "memory"]})]
+    
+    @pytest.mark.asyncio
+    async def test_detach_keeps_concurrent_change(self, served):
+        """Test detach reads the live tool list, not a cached copy"""
+        server, state, writes = served
+        await server.client.get(f"/v1/agents/{self.AGENT_ID}")
+        state["agent"] = {**state["agent"], "tools": ["web_search", "run_code"]}
+        
+        await (await get_tool_fn(server, "letta_detach_tool"))(agent_id=self.AGENT_ID, tool_name="web_search")
+        
+        assert writes == [(f"/v1/agents/{self.AGENT_ID}", {"tools": ["run_code"]})]
+    
+    @pytest.mark.asyncio
+    async def test_update_memory_reads_live_blocks(self, served):
+        """Test update_memory finds a block replaced since the last cached read"""
+        server, state, writes = served
+        await server.client.get(f"/v1/agents/{self.AGENT_ID}/memory-blocks")
+        state["blocks"] = [{"id": "block-2", "label": "human", "value": "Zack"}]
+        
+        result = await (await get_tool_fn(server, "letta_update_memory"))(
+            agent_id=self.AGENT_ID, block_label="human", value="Ada"
+        )
+        
+        assert result["block_id"] == "block-2"
+        assert writes == [(f"/v1/agents/{self.AGENT_ID}/memory-blocks/block-2", {"value": "Ada"})]
+    
+    @pytest.mark.asyncio
+    async def test_sync_plans_against_live_agent(self, served):
+        """Test sync compares against the live agent, not a cached copy"""
+        server, state, writes = served
+        await server.client.get(f"/v1/agents/{self.AGENT_ID}")
+        await server.client.get(f"/v1/agents/{self.AGENT_ID}/memory-blocks")
+        state["agent"] = {**state["agent"], "model": "openai/gpt-4.1-mini"}
+        
+        result = await (await get_tool_fn(server, "letta_sync_agents"))(
+            agents=[{"name": "bot", "model": "openai/gpt-4.1-mini"}]
+        )
+        
+        assert result["unchanged"] == 1
+        assert writes == []
+
+
+class TestStreamedListings:
+    """Test list tools decoding their responses incrementally"""
+    
+    @pytest.mark.asyncio
+    async def test_list_agents_filters_while_streaming(self, serve, sample_agent_data):
+        """Test letta_list_agents summarizes matching agents from a streamed body"""
+        agents = [
+            sample_agent_data,
+            {**sample_agent_data, "id": "agent-456", "name": "Other", "description": ""}
+        ]
+        seen = []
+        
+        def handler(request):
+            seen.append(request)
+            return httpx.Response(
+                200,
+                headers={"X-Total-Count": "2"},
+                stream=httpx.ByteStream(json.dumps(agents).encode())
+            )
+        
+        server = serve(handler)
+        
+        list_agents = await get_tool_fn(server, "letta_list_agents")
+        result = await list_agents(filter="test", limit=10)
+        
+        assert result["success"] is True
+        assert result["count"] == 1
+        assert result["total"] == "2"
+        assert result["agents"][0]["id"] == sample_agent_data["id"]
+        assert result["agents"][0]["tool_count"] == len(sample_agent_data["tools"])
+        assert seen[0].url.params["limit"] == "10"
+        assert seen[0].extensions["letta_streamed"] is True
+    
+    @pytest.mark.asyncio
+    async def test_list_tools_groups_streamed_items(self, serve):
+        """Test letta_list_tools groups and truncates streamed tools"""
+        tools = [
+            {"id": "tool-1", "name": "search", "description": "x" * 300, "tags": ["web"]},
+            {"id": "tool-2", "name": "calc", "description": "math"}
+        ]
+        server = serve(lambda request: httpx.Response(200, json=tools))
+        
+        list_tools = await get_tool_fn(server, "letta_list_tools")
+        result = await list_tools()
+        
+        assert result["success"] is True
+        assert result["total_tools"] == 2
+        assert set(result["tools_by_tag"]) == {"web", "other"}
+        assert len(result["tools"][0]["description"]) == 200
+    
+    @pytest.mark.asyncio
+    async def test_conversation_history_formats_streamed_messages(self, serve):
+        """Test letta_get_conversation_history formats streamed messages"""
+        messages = [
+            {"message_type": "assistant_message", "content": "Hi", "role": "assistant"},
+            {"message_type": "tool_call_message", "tool_call": {"name": "search", "arguments": "{}"}}
+        ]
+        server = serve(lambda request: httpx.Response(200, json=messages))
+        
+        history = await get_tool_fn(server, "letta_get_conversation_history")
+        result = await history(agent_id="agent-12345678-1234-1234-1234-123456789012")
+        
+        assert result["success"] is True
+        assert result["messages"][0]["content"] == "Hi"
+        assert result["messages"][1]["tool"] == "search"
+    
+    @pytest.mark.asyncio
+    async def test_truncated_body_fails_gracefully(self, serve):
+        """Test a truncated list body surfaces as a tool error"""
+        server = serve(lambda request: httpx.Response(200, content=b'[{"id": "agent-1"}, {"id"'))
+        
+        list_agents = await get_tool_fn(server, "letta_list_agents")
+        result = await list_agents()
+        
+        assert result["success"] is False
+        assert "Truncated" in result["error"]
+
+
+class TestEntityCache:
+    """Test read tools reuse cached entities until a write tool changes them"""
+    
+    AGENT_ID = "agent-12345678-1234-1234-1234-123456789012"
+    
+    @pytest.fixture
+    def served(self, serve, sample_agent_data):
+        """A server over a mock Letta API that records upstream requests"""
+        agent = {**sample_agent_data, "id": self.AGENT_ID}
+        blocks = [{"id": "block-1", "label": "human", "value": "Zack"}]
+        calls = []
+        
+        def handler(request):
+            calls.append((request.method, request.url.path))
+            if request.url.path.endswith("/memory-blocks"):
+                return httpx.Response(200, json=blocks)
+            if request.url.path == "/v1/tools":
+                return httpx.Response(200, json=[{"id": "tool-1", "name": "search", "source_code": "x" * 1000}])
+            if request.method == "PATCH":
+                agent.update(json.loads(request.content))
+            return httpx.Response(200, json=agent)
+        
+        return serve(handler), calls
+    
+    @pytest.mark.asyncio
+    async def test_agent_reads_share_one_fetch_until_updated(self, served):
+        """Test get_agent and get_agent_tools share the cached agent and updates drop it"""
+        server, calls = served
+        get_agent = await get_tool_fn(server, "letta_get_agent")
+        get_agent_tools = await get_tool_fn(server, "letta_get_agent_tools")
+        
+        await get_agent(agent_id=self.AGENT_ID)
+        await get_agent_tools(agent_id=self.AGENT_ID)
+        assert calls == [("GET", f"/v1/agents/{self.AGENT_ID}")]
+        
+        attach = await get_tool_fn(server, "letta_attach_tool")
+        await attach(agent_id=self.AGENT_ID, tool_name="calculator")
+        result = await get_agent_tools(agent_id=self.AGENT_ID)
+        
+        assert "calculator" in result["tools"]
+        assert calls.count(("GET", f"/v1/agents/{self.AGENT_ID}")) == 3
+    
+    @pytest.mark.asyncio
+    async def test_memory_invalidated_by_writes_and_messages(self, served):
+        """Test memory writes and agent messages drop the cached memory blocks"""
+        server, calls = served
+        get_memory = await get_tool_fn(server, "letta_get_memory")
+        memory_path = ("GET", f"/v1/agents/{self.AGENT_ID}/memory-blocks")
+        
+        await get_memory(agent_id=self.AGENT_ID)
+        await get_memory(agent_id=self.AGENT_ID)
+        assert calls.count(memory_path) == 1
+        
+        send = await get_tool_fn(server, "letta_send_message")
+        await send(agent_id=self.AGENT_ID, message="My name is Zack")
+        await get_memory(agent_id=self.AGENT_ID)
+        assert calls.count(memory_path) == 2
+        
+        update = await get_tool_fn(server, "letta_update_memory")
+        await update(agent_id=self.AGENT_ID, block_label="human", value="Zack, likes tea")
+        await get_memory(agent_id=self.AGENT_ID)
+        # One read inside the update and one after it
+        assert calls.count(memory_path) == 4
+    
+    @pytest.mark.asyncio
+    async def test_new_memory_block_invalidates_agent(self, served):
+        """Test creating a block drops the cached agent, whose summary lists the blocks"""
+        server, calls = served
+        get_agent = await get_tool_fn(server, "letta_get_agent")
+        get_memory = await get_tool_fn(server, "letta_get_memory")
+        agent_path = ("GET", f"/v1/agents/{self.AGENT_ID}")
+        memory_path = ("GET", f"/v1/agents/{self.AGENT_ID}/memory-blocks")
+        
+        await get_agent(agent_id=self.AGENT_ID)
+        await get_memory(agent_id=self.AGENT_ID)
+        
+        create = await get_tool_fn(server, "letta_create_memory_block")
+        await create(agent_id=self.AGENT_ID, label="policies", value="Be nice", description="Rules")
+        await get_agent(agent_id=self.AGENT_ID)
+        await get_memory(agent_id=self.AGENT_ID)
+        
+        assert calls.count(agent_path) == 2
+        assert calls.count(memory_path) == 2
+    
+    @pytest.mark.asyncio
+    async def test_tool_catalog_cached_without_source(self, served):
+        """Test the tool catalog is fetched once and kept without unused fields"""
+        server, calls = served
+        list_tools = await get_tool_fn(server, "letta_list_tools")
+        
+        await list_tools()
+        result = await list_tools(filter="search")
+        
+        assert result["total_tools"] == 1
+        assert calls.count(("GET", "/v1/tools")) == 1
+        assert "source_code" not in server.cache.get("tools")[0]
+    
+    @pytest.mark.asyncio
+    async def test_disk_cache_warms_a_new_process(self, mock_config, tmp_path, serve):
+        """Test a second server reads the agent summary from disk without memory contents"""
+        mock_config.disk_cache = True
+        mock_config.disk_cache_dir = str(tmp_path)
+        calls = []
+        
+        def handler(request):
+            calls.append(request.url.path)
+            return httpx.Response(200, json={
+                "id": self.AGENT_ID,
+                "name": "Support",
+                "system": "x" * 1000,
+                "memory_blocks": [{"id": "block-1", "label": "human", "value": "secret"}]
+            })
+        
+        for _ in range(2):
+            server = serve(handler)
+            result = await (await get_tool_fn(server, "letta_get_agent"))(agent_id=self.AGENT_ID)
+        
+        assert len(calls) == 1
+        assert result["agent"]["name"] == "Support"
+        assert result["agent"]["memory_blocks"] == 1
+        assert all(b"secret" not in path.read_bytes() for path in tmp_path.iterdir())
+        assert server.cache.metrics()["disk"]["hits"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_disabled_cache(self, served):
+        """Test a disabled cache sends every read upstream"""
+        server, calls = served
+        server.cache.enabled = False
+        get_agent = await get_tool_fn(server, "letta_get_agent")
+        
+        await get_agent(agent_id=self.AGENT_ID)
+        await get_agent(agent_id=self.AGENT_ID)
+        
+        assert len(calls) == 2
+
+
+class TestCapabilityFallbacks:
+    """Test tools skip optional endpoints the server is known to lack"""
+    
+    AGENT_ID = "agent-12345678-1234-1234-1234-123456789012"
+    
+    @staticmethod
+    def recording(handler, calls):
+        def record(request):
+            calls.append(request.url.path)
+            return handler(request)
+        
+        return record
+    
+    @pytest.mark.asyncio
+    async def test_search_falls_back_directly_once_endpoint_is_missing(self, serve):
+        """Test the message search endpoint is only tried until it is found missing"""
+        messages = [
+            {"message_type": "assistant_message", "content": "Your order shipped", "role": "assistant"},
+            {"message_type": "tool_call_message", "tool_call": {"name": "lookup", "arguments": "{}"}}
+        ]
+        
+        def handler(request):
+            if request.url.path.endswith("/search"):
+                return httpx.Response(404)
+            return httpx.Response(200, json=messages)
+        
+        calls = []
+        server = serve(self.recording(handler, calls))
+        search = await get_tool_fn(server, "letta_search_memory")
+        
+        first = await search(agent_id=self.AGENT_ID, query="order")
+        second = await search(agent_id=self.AGENT_ID, query="shipped")
+        
+        assert first["method"] == second["method"] == "manual_search"
+        assert first["result_count"] == 1
+        assert calls.count(f"/v1/agents/{self.AGENT_ID}/messages/search") == 1
+        assert server.capabilities.metrics()["skipped_requests"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_missing_agent_does_not_mark_search_missing(self, serve):
+        """Test a 404 for an unknown agent leaves the capability unknown"""
+        calls = []
+        server = serve(self.recording(lambda request: httpx.Response(404), calls))
+        
+        result = await (await get_tool_fn(server, "letta_search_memory"))(agent_id=self.AGENT_ID, query="x")
+        
+        assert result["success"] is False
+        assert server.capabilities.supported("message_search") is None
+    
+    @pytest.mark.asyncio
+    async def test_usage_stats_remembered_both_ways(self, serve):
+        """Test usage stats are served directly when available and skipped when missing"""
+        calls = []
+        server = serve(self.recording(lambda request: httpx.Response(404), calls))
+        stats = await get_tool_fn(server, "letta_get_usage_stats")
+        
+        await stats()
+        result = await stats(period="week")
+        
+        assert result["note"] == "Usage stats endpoint not available"
+        assert calls == ["/v1/stats/usage"]
+        
+        server.capabilities.record("usage_stats", True)
+        serve(self.recording(lambda request: httpx.Response(200, json={"message_count": 3}), calls), server)
+        result = await stats()
+        
+        assert result["stats"] == {"message_count": 3}
+
+
+class TestAgentPagination:
+    """Test letta_list_agents walking every page of a large account"""
+    
+    @pytest.fixture(autouse=True)
+    def without_index(self, mock_config):
+        # Keep index resyncs out of the upstream requests measured here
+        mock_config.agent_index = False
+    
+    @staticmethod
+    def fleet(size):
+        return [
+            {"id": f"agent-{i}", "name": f"bot-{i}", "description": "", "tools": []}
+            for i in range(size)
+        ]
+    
+    @staticmethod
+    def api(server, agents, seen, supports_query_text=True, delay=0.0, rejection=None):
+        """Mock agent listing that pages, filters by query_text and tracks concurrency"""
+        in_flight = [0]
+        
+        async def handler(request):
+            seen.append(dict(request.url.params))
+            query_text = request.url.params.get("query_text")
+            if query_text is not None and not supports_query_text:
+                return rejection or httpx.Response(422)
+            
+            in_flight[0] += 1
+            server.max_in_flight = max(getattr(server, "max_in_flight", 0), in_flight[0])
+            await asyncio.sleep(delay)
+            in_flight[0] -= 1
+            
+            selected = [agent for agent in agents if not query_text or query_text in agent["name"]]
+            offset = int(request.url.params["offset"])
+            limit = int(request.url.params["limit"])
+            return httpx.Response(
+                200,
+                headers={"X-Total-Count": str(len(selected))},
+                json=selected[offset:offset + limit]
+            )
+        
+        return handler
+    
+    @pytest.mark.asyncio
+    async def test_finds_matches_beyond_first_page(self, mock_config, serve):
+        """Test the filter is applied to every page, not just the first"""
+        agents = self.fleet(250)
+        agents[180]["description"] = "billing support"
+        agents[240]["description"] = "billing escalations"
+        seen = []
+        server = LettaMCPServer(mock_config)
+        serve(self.api(server, agents, seen), server)
+        list_agents = await get_tool_fn(server, "letta_list_agents")
+        
+        single = await list_agents(filter="billing")
+        result = await list_agents(filter="billing", all_pages=True)
+        
+        assert single["count"] == 0
+        assert [agent["id"] for agent in result["agents"]] == ["agent-180", "agent-240"]
+        assert result["pages_fetched"] == 3
+        assert result["total"] == "250"
+        assert result["next_cursor"] is None
+    
+    @pytest.mark.asyncio
+    async def test_stops_early_and_resumes_from_cursor(self, mock_config, serve):
+        """Test the listing stops at limit matches and the cursor resumes after the last one"""
+        agents = self.fleet(1000)
+        for i in (5, 6, 450):
+            agents[i]["description"] = "match"
+        seen = []
+        mock_config.pagination_concurrency = 2
+        server = LettaMCPServer(mock_config)
+        serve(self.api(server, agents, seen), server)
+        list_agents = await get_tool_fn(server, "letta_list_agents")
+        
+        first = await list_agents(filter="match", limit=1, all_pages=True)
+        assert [agent["id"] for agent in first["agents"]] == ["agent-5"]
+        assert first["pages_fetched"] == 1
+        
+        rest = await list_agents(filter="match", limit=5, all_pages=True, cursor=first["next_cursor"])
+        
+        assert [agent["id"] for agent in rest["agents"]] == ["agent-6", "agent-450"]
+        assert rest["next_cursor"] is None
+        # Pages after the end of the list are never requested
+        assert max(int(params["offset"]) for params in seen) < 1000
+    
+    @pytest.mark.asyncio
+    async def test_pages_fetched_with_bounded_concurrency(self, mock_config, serve):
+        """Test later pages are fetched concurrently, at most pagination_concurrency at once"""
+        seen = []
+        mock_config.pagination_concurrency = 3
+        server = LettaMCPServer(mock_config)
+        serve(self.api(server, self.fleet(900), seen, delay=0.01), server)
+        
+        result = await (await get_tool_fn(server, "letta_list_agents"))(filter="nomatch", all_pages=True)
+        
+        assert result["count"] == 0
+        assert result["pages_fetched"] == 9
+        assert server.max_in_flight == 3
+    
+    @pytest.mark.asyncio
+    async def test_name_pushed_down_where_supported(self, mock_config, serve):
+        """Test name is sent as query_text and dropped once the server rejects it"""
+        agents = self.fleet(300)
+        seen = []
+        server = LettaMCPServer(mock_config)
+        serve(self.api(server, agents, seen), server)
+        list_agents = await get_tool_fn(server, "letta_list_agents")
+        
+        result = await list_agents(name="bot-29", all_pages=True)
+        
+        assert seen[0]["query_text"] == "bot-29"
+        assert result["pages_fetched"] == 1
+        assert result["count"] == 11
+        assert server.capabilities.supported("agent_name_search") is True
+        
+        seen.clear()
+        server = LettaMCPServer(mock_config)
+        serve(self.api(server, agents, seen, supports_query_text=False), server)
+        result = await (await get_tool_fn(server, "letta_list_agents"))(name="bot-29", all_pages=True)
+        
+        assert result["count"] == 11
+        assert "query_text" not in seen[1]
+        assert server.capabilities.supported("agent_name_search") is False
+    
+    @pytest.mark.asyncio
+    async def test_rejected_name_search_retried_once_without_cache(self, mock_config, serve):
+        """Test a rejected query_text is dropped after one retry even with the entity cache off"""
+        mock_config.entity_cache = False
+        agents = self.fleet(300)
+        seen = []
+        server = LettaMCPServer(mock_config)
+        serve(self.api(server, agents, seen, supports_query_text=False, rejection=httpx.Response(
+            400, json={"detail": "Unknown query parameter: query_text"}
+        )), server)
+        list_agents = await get_tool_fn(server, "letta_list_agents")
+        
+        first = await list_agents(name="bot-29", all_pages=True)
+        second = await list_agents(name="bot-29", all_pages=True)
+        
+        assert first["count"] == second["count"] == 11
+        assert sum("query_text" in params for params in seen) == 1
+        assert server.capabilities.supported("agent_name_search") is False
+    
+    @pytest.mark.asyncio
+    async def test_unrelated_bad_request_is_not_a_rejection(self, mock_config, serve):
+        """Test a 400 that does not name query_text fails the call instead of disabling it"""
+        seen = []
+        server = LettaMCPServer(mock_config)
+        serve(self.api(server, self.fleet(10), seen, supports_query_text=False, rejection=httpx.Response(
+            400, json={"detail": "limit too large"}
+        )), server)
+        
+        result = await (await get_tool_fn(server, "letta_list_agents"))(name="bot", all_pages=True)
+        
+        assert result["success"] is False
+        assert len(seen) == 1
+        assert server.capabilities.supported("agent_name_search") is None
+    
+    @pytest.mark.asyncio
+    async def test_cursor_from_another_listing_is_rejected(self, mock_config, serve):
+        """Test a cursor is only accepted with the name filter it was made for"""
+        server = LettaMCPServer(mock_config)
+        serve(self.api(server, self.fleet(10), []), server)
+        list_agents = await get_tool_fn(server, "letta_list_agents")
+        
+        first = await list_agents(name="bot", limit=1, all_pages=True)
+        result = await list_agents(name="other", all_pages=True, cursor=first["next_cursor"])
+        
+        assert result["success"] is False
+        assert "Cursor" in result["error"]
+
+
+class TestAgentIndexLookups:
+    """Test letta_list_agents resolving filters from the local agent index"""
+    
+    AGENT_ID = "agent-12345678-1234-1234-1234-123456789012"
+    
+    @pytest.fixture
+    def served(self, mock_config, serve):
+        agents = [
+            {"id": f"agent-{i}", "name": f"bot-{i}", "description": "", "tools": [],
+             "last_modified": "2026-01-01T00:00:00Z"}
+            for i in range(150)
+        ]
+        agents[120]["name"] = "Billing Assistant"
+        calls = []
+        
+        def handler(request):
+            calls.append((request.method, request.url.path))
+            if request.method == "POST":
+                return httpx.Response(200, json={"id": self.AGENT_ID, "name": "Refunds Desk", "tools": []})
+            if request.method != "GET":
+                return httpx.Response(200, json={})
+            offset = int(request.url.params["offset"])
+            limit = int(request.url.params["limit"])
+            return httpx.Response(200, json=agents[offset:offset + limit])
+        
+        server = serve(handler)
+        return server, agents, calls
+    
+    @pytest.mark.asyncio
+    async def test_filter_answered_from_index_after_refresh(self, served):
+        """Test filters go upstream until the index is built, then are answered locally"""
+        server, agents, calls = served
+        list_agents = await get_tool_fn(server, "letta_list_agents")
+        
+        before = await list_agents(filter="billing")
+        assert before["count"] == 0
+        assert "source" not in before
+        
+        await server.refresh_agent_index()
+        calls.clear()
+        result = await list_agents(filter="billing")
+        
+        assert calls == []
+        assert result["source"] == "index"
+        assert [agent["id"] for agent in result["agents"]] == ["agent-120"]
+        assert set(result["agents"][0]) == {"id", "name", "description", "tool_count", "created_at", "model"}
+        assert result["total"] == 150
+    
+    @pytest.mark.asyncio
+    async def test_write_tools_update_the_index(self, served):
+        """Test created, renamed and deleted agents are reflected without a resync"""
+        server, agents, calls = served
+        await server.refresh_agent_index()
+        list_agents = await get_tool_fn(server, "letta_list_agents")
+        
+        await (await get_tool_fn(server, "letta_create_agent"))(name="Refunds Desk")
+        assert (await list_agents(filter="refunds"))["agents"][0]["id"] == self.AGENT_ID
+        
+        await (await get_tool_fn(server, "letta_update_agent"))(agent_id=self.AGENT_ID, name="Chargebacks")
+        assert (await list_agents(filter="refunds"))["count"] == 0
+        assert (await list_agents(filter="charge"))["count"] == 1
+        
+        await (await get_tool_fn(server, "letta_delete_agent"))(agent_id=self.AGENT_ID, confirm=True)
+        assert (await list_agents(filter="charge"))["count"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_stale_index_falls_back_upstream(self, served, mock_config):
+        """Test an index past twice its refresh interval is not used"""
+        server, agents, calls = served
+        await server.refresh_agent_index()
+        server.agent_index.synced_at -= 3 * mock_config.agent_index_refresh
+        calls.clear()
+        
+        result = await (await get_tool_fn(server, "letta_list_agents"))(filter="billing", all_pages=True)
+        
+        assert "source" not in result
+        assert calls
+    
+    @pytest.mark.asyncio
+    async def test_due_lookup_resyncs_once_in_background(self, served, mock_config):
+        """Test an idle server never lists the fleet, and concurrent due lookups share one resync"""
+        server, agents, calls = served
+        with patch.object(server.mcp, "run_async", AsyncMock()):
+            await server.run_async("stdio")
+        assert calls == []
+        
+        list_agents = await get_tool_fn(server, "letta_list_agents")
+        await asyncio.gather(*(list_agents(filter="billing") for _ in range(3)))
+        await server.refresh_agent_index()
+        lookups_and_resync = len(calls)
+        
+        calls.clear()
+        await server.refresh_agent_index()
+        
+        assert server.agent_index.ready
+        assert lookups_and_resync == 3 + len(calls)
+    
+    @pytest.mark.asyncio
+    async def test_resync_reindexes_changed_agents(self, served):
+        """Test a resync picks up agents changed upstream by last_modified"""
+        server, agents, calls = served
+        await server.refresh_agent_index()
+        
+        agents[3] = {**agents[3], "name": "Payroll", "last_modified": "2026-03-01T00:00:00Z"}
+        del agents[7]
+        
+        assert await server.refresh_agent_index() == {"added": 0, "updated": 1, "removed": 1}
+
+
+class TestBulkAgentCreation:
+    """Test letta_create_agents_bulk"""
+    
+    @pytest.fixture
+    def served(self, mock_config, serve):
+        mock_config.bulk_concurrency = 2
+        state = {"in_flight": 0, "peak": 0}
+        
+        async def handler(request):
+            spec = json.loads(request.content)
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+            await asyncio.sleep(0.01)
+            state["in_flight"] -= 1
+            if spec["name"] == "broken":
+                return httpx.Response(400, json={"detail": "invalid model"})
+            return httpx.Response(200, json={"id": f"agent-{spec['name']}", "name": spec["name"], "tools": []})
+        
+        server = serve(handler)
+        return server, state
+    
+    @pytest.mark.asyncio
+    async def test_partial_failure_reported_per_item(self, served):
+        """Test failures are reported by index without stopping the other agents"""
+        server, state = served
+        create = await get_tool_fn(server, "letta_create_agents_bulk")
+        
+        result = await create(agents=[
+            {"name": "alpha"},
+            {"name": "broken"},
+            {"description": "no name"},
+            {"name": "gamma", "colour": "blue"},
+            {"name": "delta", "model": "openai/gpt-4o-mini"}
+        ])
+        
+        assert result["success"] is False
+        assert result["created"] == 2
+        assert result["failed"] == 3
+        assert [item["index"] for item in result["results"]] == [0, 1, 2, 3, 4]
+        assert result["results"][0]["agent_id"] == "agent-alpha"
+        assert "400" in result["results"][1]["error"]
+        assert "name" in result["results"][2]["error"]
+        assert "colour" in result["results"][3]["error"]
+        assert all("duration_ms" in item for item in result["results"])
+        assert result["duration_ms"] >= max(item["duration_ms"] for item in result["results"])
+    
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self, served):
+        """Test no more than the configured number of agents are created at once"""
+        server, state = served
+        create = await get_tool_fn(server, "letta_create_agents_bulk")
+        
+        result = await create(agents=[{"name": f"bot-{i}"} for i in range(6)], concurrency=50)
+        
+        assert result["success"] is True
+        assert result["created"] == 6
+        assert state["peak"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_limits(self, served, mock_config):
+        """Test empty and oversized requests are rejected before any call"""
+        server, state = served
+        mock_config.bulk_max_items = 3
+        create = await get_tool_fn(server, "letta_create_agents_bulk")
+        
+        assert (await create(agents=[]))["success"] is False
+        oversized = await create(agents=[{"name": f"bot-{i}"} for i in range(4)])
+        
+        assert "At most 3" in oversized["error"]
+        assert state["peak"] == 0
+
+
+class TestBulkAgentMaintenance:
+    """Test letta_update_agents_bulk and letta_delete_agents_bulk"""
+    
+    @staticmethod
+    def agent_id(i):
+        return f"agent-{i:08x}-1234-1234-1234-123456789012"
+    
+    @pytest.fixture
+    def served(self, mock_config, serve):
+        agents = [
+            {"id": self.agent_id(i), "name": f"bot-{i}", "description": "", "tools": [],
+             "model": "openai/gpt-4o-mini" if i % 2 else "openai/gpt-4o",
+             "created_at": f"2026-01-{i + 1:02d}T00:00:00Z",
+             "last_modified": "2026-01-31T00:00:00Z"}
+            for i in range(10)
+        ]
+        calls = []
+        
+        def handler(request):
+            calls.append((request.method, request.url.path))
+            if request.method == "GET":
+                offset = int(request.url.params["offset"])
+                limit = int(request.url.params["limit"])
+                return httpx.Response(200, json=agents[offset:offset + limit])
+            if request.url.path.endswith(self.agent_id(3)):
+                return httpx.Response(404, json={"detail": "not found"})
+            return httpx.Response(200, json={})
+        
+        server = serve(handler)
+        server.listed_agents = agents
+        return server, calls
+    
+    @pytest.mark.asyncio
+    async def test_selector_resolved_and_progress_reported(self, served):
+        """Test a model and created_at selector picks the agents and reports progress"""
+        server, calls = served
+        ctx = Mock(report_progress=AsyncMock())
+        update = await get_tool_fn(server, "letta_update_agents_bulk")
+        
+        result = await update(
+            updates={"model": "openai/gpt-4.1-mini"},
+            model="openai/gpt-4o-mini",
+            created_after="2026-01-03",
+            created_before="2026-01-09T00:00:00Z",
+            ctx=ctx
+        )
+        
+        patched = [path for method, path in calls if method == "PATCH"]
+        assert sorted(patched) == [f"/v1/agents/{self.agent_id(i)}" for i in (3, 5, 7)]
+        assert result["updated"] == 2
+        assert result["failed"] == 1
+        assert [item["agent_id"] for item in result["results"] if not item["success"]] == [self.agent_id(3)]
+        assert ctx.report_progress.await_count == 3
+        assert ctx.report_progress.await_args.args == (3, 3)
+    
+    @pytest.mark.asyncio
+    async def test_selector_resolved_from_live_listing(self, served):
+        """Test selectors see agents created since the local index was built"""
+        server, calls = served
+        await server.refresh_agent_index()
+        server.listed_agents.append({"id": self.agent_id(11), "name": "bot-11", "model": "openai/gpt-4o"})
+        calls.clear()
+        
+        result = await (await get_tool_fn(server, "letta_delete_agents_bulk"))(
+            name="bot-1", confirm=True
+        )
+        
+        assert ("GET", "/v1/agents") in calls
+        assert sorted(path for method, path in calls if method == "DELETE") == [
+            f"/v1/agents/{self.agent_id(1)}", f"/v1/agents/{self.agent_id(11)}"
+        ]
+        assert result["success"] is True
+        assert result["deleted"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_explicit_ids_and_safeguards(self, served, mock_config):
+        """Test confirmation, dry runs, selector validation and the item limit"""
+        server, calls = served
+        delete = await get_tool_fn(server, "letta_delete_agents_bulk")
+        update = await get_tool_fn(server, "letta_update_agents_bulk")
+        ids = [self.agent_id(1), self.agent_id(2), self.agent_id(1)]
+        
+        assert "confirm=True" in (await delete(agent_ids=ids))["error"]
+        preview = await delete(agent_ids=ids, dry_run=True)
+        assert preview["matched"] == 2
+        assert (await delete())["success"] is False
+        assert "not both" in (await delete(agent_ids=ids, name="bot", confirm=True))["error"]
+        assert (await update(updates={"tools": []}, agent_ids=ids))["success"] is False
+        assert (await update(updates={"name": "x"}, created_after="last week"))["success"] is False
+        
+        assert calls == []
+    
+    @pytest.mark.asyncio
+    async def test_large_selections_run_in_batches(self, served, mock_config):
+        """Test dry runs list every match and real runs go batch by batch"""
+        server, calls = served
+        mock_config.bulk_max_items = 2
+        ctx = Mock(report_progress=AsyncMock())
+        update = await get_tool_fn(server, "letta_update_agents_bulk")
+        
+        preview = await update(updates={"description": "retired"}, name="bot", dry_run=True)
+        assert preview["matched"] == 10
+        assert len(preview["agents"]) == 10
+        
+        ids = [self.agent_id(i) for i in (0, 1, 2, 4, 5)]
+        result = await update(updates={"description": "retired"}, agent_ids=ids, ctx=ctx)
+        
+        assert result["updated"] == 5
+        assert [item["index"] for item in result["results"]] == [0, 1, 2, 3, 4]
+        assert [item["agent_id"] for item in result["results"]] == ids
+        assert ctx.report_progress.await_args.args == (5, 5)
+
+
+class TestFieldProjection:
+    """Test the fields argument of the read tools"""
+    
+    AGENT_ID = "agent-12345678-1234-1234-1234-123456789012"
+    
+    @pytest.fixture
+    def server(self, serve, sample_agent_data):
+        agent = {**sample_agent_data, "id": self.AGENT_ID}
+        blocks = [
+            {"id": "block-1", "label": "human", "value": "Zack", "limit": 2000},
+            {"id": "block-2", "label": "persona", "value": "Helpful", "limit": 2000}
+        ]
+        
+        def handler(request):
+            if request.url.path.endswith("/memory-blocks"):
+                return httpx.Response(200, json=blocks)
+            return httpx.Response(200, json=agent)
+        
+        return serve(handler)
+    
+    @pytest.mark.asyncio
+    async def test_read_tools_advertise_fields(self, server):
+        """Test read tools take fields and write tools do not"""
+        assert "fields" in (await server.mcp.get_tool("letta_get_agent")).parameters["properties"]
+        assert "fields" in (await server.mcp.get_tool("letta_list_agents")).parameters["properties"]
+        assert "fields" not in (await server.mcp.get_tool("letta_update_agent")).parameters["properties"]
+    
+    @pytest.mark.asyncio
+    async def test_fields_prune_result(self, server):
+        """Test only the requested paths are returned and the cache keeps the full entity"""
+        get_agent = await get_tool_fn(server, "letta_get_agent")
+        get_memory = await get_tool_fn(server, "letta_get_memory")
+        
+        agent = await get_agent(agent_id=self.AGENT_ID, fields=["agent.name"])
+        memory = await get_memory(agent_id=self.AGENT_ID, fields=["memory_blocks.*.value"])
+        full = await get_agent(agent_id=self.AGENT_ID)
+        
+        assert agent == {"success": True, "agent": {"name": full["agent"]["name"]}}
+        assert memory["memory_blocks"] == {"human": {"value": "Zack"}, "persona": {"value": "Helpful"}}
+        assert "raw_blocks" not in memory
+        assert "tools" in full["agent"]
+    
+    @pytest.mark.asyncio
+    async def test_invalid_fields(self, server):
+        """Test a malformed path is reported as a failed call"""
+        result = await (await get_tool_fn(server, "letta_get_agent"))(agent_id=self.AGENT_ID, fields=["agent."])
+        
+        assert result["success"] is False
+        assert "Invalid field path" in result["error"]
+
+
+class TestFleetSnapshots:
+    """Test NDJSON fleet export and import"""
+    
+    @pytest.fixture
+    def served(self, mock_config, serve):
+        agents = {
+            f"agent-{i}": {"id": f"agent-{i}", "name": f"bot-{i}", "description": "", "model": "openai/gpt-4o",
+                           "tools": [{"id": "tool-1", "name": "web_search"}]}
+            for i in range(150)
+        }
+        created = []
+        
+        def handler(request):
+            path = request.url.path
+            if request.method == "POST":
+                payload = json.loads(request.content)
+                created.append(payload)
+                return httpx.Response(200, json={"id": f"new-{len(created)}", "name": payload["name"], "tools": []})
+            if path == "/v1/agents":
+                offset = int(request.url.params["offset"])
+                limit = int(request.url.params["limit"])
+                return httpx.Response(200, json=list(agents.values())[offset:offset + limit])
+            agent_id = path.split("/")[3]
+            if agent_id == "agent-7":
+                return httpx.Response(404, json={"detail": "gone"})
+            if path.endswith("/memory-blocks"):
+                return httpx.Response(200, json=[{"id": "b", "label": "human", "value": agent_id}])
+            return httpx.Response(200, json=agents[agent_id])
+        
+        server = serve(handler)
+        return server, created
+    
+    @pytest.mark.asyncio
+    async def test_export_then_import(self, served, tmp_path):
+        """Test every agent is written in listing order and recreated from the file"""
+        server, created = served
+        path = tmp_path / "fleet.ndjson"
+        
+        exported = await (await get_tool_fn(server, "letta_export_fleet"))(path=str(path))
+        lines = path.read_text().splitlines()
+        
+        assert exported["exported"] == 149
+        assert exported["failures"][0]["agent_id"] == "agent-7"
+        assert json.loads(lines[0])["memory_blocks"] == [{"label": "human", "value": "agent-0"}]
+        assert [json.loads(line)["id"] for line in lines[:8]] == [f"agent-{i}" for i in (0, 1, 2, 3, 4, 5, 6, 8)]
+        assert not (tmp_path / "fleet.ndjson.partial").exists()
+        
+        imported = await (await get_tool_fn(server, "letta_import_fleet"))(path=str(path))
+        
+        assert imported["success"] is True
+        assert imported["created"] == 149
+        assert [payload["name"] for payload in created[:2]] == ["bot-0", "bot-1"]
+        assert created[0]["tools"] == ["web_search"]
+    
+    @pytest.mark.asyncio
+    async def test_export_refuses_existing_file(self, served, tmp_path):
+        """Test an existing file is kept unless overwrite is passed"""
+        server, _ = served
+        export = await get_tool_fn(server, "letta_export_fleet")
+        path = tmp_path / "notes.txt"
+        path.write_text("keep me")
+        
+        refused = await export(path=str(path))
+        
+        assert refused["success"] is False
+        assert "already exists" in refused["error"]
+        assert path.read_text() == "keep me"
+        
+        replaced = await export(path=str(path), overwrite=True)
+        
+        assert replaced["exported"] == 149
+        assert path.read_text() != "keep me"
+        assert not (tmp_path / "notes.txt.partial").exists()
+    
+    @pytest.mark.asyncio
+    async def test_export_without_hard_links(self, served, tmp_path):
+        """Test the export is renamed into place where hard links are unsupported"""
+        server, _ = served
+        path = tmp_path / "fleet.ndjson"
+        
+        with patch("os.link", side_effect=OSError(1, "Operation not permitted")):
+            result = await server.export_fleet_to(path)
+            
+            assert result["exported"] == 149
+            assert len(path.read_text().splitlines()) == 149
+            assert not (tmp_path / "fleet.ndjson.partial").exists()
+            
+            # The target appearing during the export is still refused
+            async def racing_export(write, concurrency=None):
+                path.write_text("keep me")
+                return {"success": True}
+            
+            with patch.object(server, "export_fleet", racing_export):
+                path.unlink()
+                with pytest.raises(ValidationError):
+                    await server.export_fleet_to(path)
+        
+        assert path.read_text() == "keep me"
+    
+    @pytest.mark.asyncio
+    async def test_import_reports_bad_lines(self, served):
+        """Test unparseable and incomplete lines fail alone and blank lines are skipped"""
+        server, created = served
+        lines = ['{"name": "alpha"}\n', "\n", "not json\n", '{"description": "no name"}\n', '{"name": "beta"}\n']
+        
+        result = await server.import_fleet(iter(lines), concurrency=2)
+        
+        assert result["created"] == 2
+        assert [failure["line"] for failure in result["failures"]] == [3, 4]
+        assert [payload["name"] for payload in created] == ["alpha", "beta"]
+
+
+class TestAgentSync:
+    """Test letta_sync_agents reconciliation"""
+    
+    @pytest.fixture
+    def served(self, mock_config, serve):
+        agents = {
+            f"agent-{i}": {"id": f"agent-{i}", "name": f"bot-{i}", "description": "Bot",
+                           "model": "openai/gpt-4o-mini", "tools": [{"name": "web_search"}]}
+            for i in range(30)
+        }
+        blocks = [{"id": "block-1", "label": "human", "value": "Zack", "limit": 2000}]
+        calls = []
+        
+        def handler(request):
+            path = request.url.path
+            calls.append((request.method, path, json.loads(request.content) if request.content else None))
+            if request.method != "GET":
+                return httpx.Response(200, json={"id": "agent-new", "name": "fresh", "tools": []})
+            if path == "/v1/agents":
+                offset = int(request.url.params["offset"])
+                limit = int(request.url.params["limit"])
+                return httpx.Response(200, json=list(agents.values())[offset:offset + limit])
+            if path.endswith("/memory-blocks"):
+                return httpx.Response(200, json=blocks)
+            return httpx.Response(200, json=agents[path.split("/")[3]])
+        
+        server = serve(handler)
+        server.listed_agents = agents
+        return server, calls
+    
+    @pytest.mark.asyncio
+    async def test_unchanged_fleet_costs_reads_only(self, served):
+        """Test a sync matching live state issues no writes"""
+        server, calls = served
+        desired = [
+            {"name": f"bot-{i}", "description": "Bot", "tools": ["web_search"],
+             "memory_blocks": [{"label": "human", "value": "Zack"}]}
+            for i in range(30)
+        ]
+        
+        result = await (await get_tool_fn(server, "letta_sync_agents"))(agents=desired)
+        
+        assert result["unchanged"] == 30
+        assert {method for method, _, _ in calls} == {"GET"}
+    
+    @pytest.mark.asyncio
+    async def test_minimal_writes(self, served):
+        """Test only changed fields and blocks are written and missing agents are created"""
+        server, calls = served
+        desired = [
+            {"name": "bot-1", "description": "Bot", "model": "openai/gpt-4.1-mini",
+             "memory_blocks": [{"label": "human", "value": "Zack"}, {"label": "policies", "value": "Be nice"}]},
+            {"name": "bot-2", "memory_blocks": [{"label": "human", "value": "Ada"}]},
+            {"name": "fresh", "tools": ["run_code"]}
+        ]
+        
+        result = await (await get_tool_fn(server, "letta_sync_agents"))(agents=desired)
+        writes = [(method, path, body) for method, path, body in calls if method != "GET"]
+        
+        assert (result["created"], result["updated"], result["unchanged"]) == (1, 2, 0)
+        assert ("PATCH", "/v1/agents/agent-1", {"model": "openai/gpt-4.1-mini"}) in writes
+        assert ("POST", "/v1/agents/agent-1/memory-blocks", {"label": "policies", "value": "Be nice"}) in writes
+        assert ("PATCH", "/v1/agents/agent-2/memory-blocks/block-1", {"value": "Ada"}) in writes
+        assert [body["name"] for method, path, body in writes if path == "/v1/agents"] == ["fresh"]
+        assert len(writes) == 4
+    
+    @pytest.mark.asyncio
+    async def test_agents_matched_against_live_listing(self, served):
+        """Test an agent created since the index was built is updated, not duplicated"""
+        server, calls = served
+        await server.refresh_agent_index()
+        server.listed_agents["agent-30"] = {
+            "id": "agent-30", "name": "bot-30", "description": "Bot",
+            "model": "openai/gpt-4o-mini", "tools": [{"name": "web_search"}]
+        }
+        calls.clear()
+        
+        result = await (await get_tool_fn(server, "letta_sync_agents"))(
+            agents=[{"name": "bot-30", "description": "Retired"}]
+        )
+        writes = [(method, path, body) for method, path, body in calls if method != "GET"]
+        
+        assert (result["created"], result["updated"]) == (0, 1)
+        assert writes == [("PATCH", "/v1/agents/agent-30", {"description": "Retired"})]
+    
+    @pytest.mark.asyncio
+    async def test_dry_run_and_invalid_input(self, served, tmp_path):
+        """Test dry runs write nothing and bad declarations fail before any request"""
+        server, calls = served
+        sync = await get_tool_fn(server, "letta_sync_agents")
+        path = tmp_path / "agents.yaml"
+        path.write_text("agents:\n  - name: bot-3\n    model: openai/gpt-4o\n  - name: fresh\n")
+        
+        preview = await sync(path=str(path), dry_run=True)
+        
+        assert preview["results"][0]["changes"]["fields"] == ["model"]
+        assert (preview["created"], preview["updated"]) == (1, 1)
+        assert {method for method, _, _ in calls} == {"GET"}
+        
+        calls.clear()
+        assert (await sync(agents=[{"name": "a"}, {"name": "a"}]))["success"] is False
+        assert (await sync())["success"] is False
+        assert calls == []
+
+
+class TestJsonOutput:
+    """Test the configured JSON codec is used for resources and exports"""
+    
+    @pytest.mark.asyncio
+    async def test_resources_are_compact_json(self, mock_config, sample_agent_data, serve):
+        """Test resources resolve their tools and emit compact JSON"""
+        mock_config.json_backend = "stdlib"
+        server = serve(lambda request: httpx.Response(200, json=[sample_agent_data]))
+        
+        result = await server.mcp.read_resource("letta://agents")
+        content = result.contents[0]
+        
+        assert content.mime_type == "application/json"
+        assert content.content.startswith('{"success":true,"count":1')
+        assert json.loads(content.content)["agents"][0]["id"] == sample_agent_data["id"]
+    
+    @pytest.mark.asyncio
+    async def test_indented_output_when_not_compact(self, mock_config, serve):
+        """Test compact_json=False restores indented output"""
+        mock_config.compact_json = False
+        messages = [{"message_type": "assistant_message", "content": "Hi", "role": "assistant"}]
+        server = serve(lambda request: httpx.Response(200, json=messages))
+        
+        export = await get_tool_fn(server, "letta_export_conversation")
+        result = await export(agent_id="agent-12345678-1234-1234-1234-123456789012", format="json")
+        
+        assert result["success"] is True
+        assert json.loads(result["content"])[0]["content"] == "Hi"
+        assert "\n  " in result["content"]
+    
+    def test_coalesced_responses_use_server_codec(self, mock_config):
+        """Test the single-flight layer decodes with the server's codec"""
+        server = LettaMCPServer(mock_config)
+        
+        assert find_layer(server.client, SingleFlightTransport).loads == server.codec.loads
+
+
+class TestWarmUp:
+    """Test connection warm-up at startup"""
+    
+    @pytest.mark.asyncio
+    async def test_warm_up_opens_connections_and_preloads(self, mock_config, serve):
+        """Test warm-up issues one request per connection plus the preloads"""
+        mock_config.warmup_connections = 3
+        mock_config.warmup_preload = True
+        paths = []
+        
+        async def handler(request):
+            paths.append(request.url.path)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json=[])
+        
+        server = serve(handler)
+        
+        report = await server.warm_up()
+        
+        assert report["resolved"] is True
+        assert report["connections"] == 3
+        assert report["preloaded"] == ["letta_list_agents", "letta_list_tools"]
+        assert paths.count("/v1/agents") == 4
+        assert paths.count("/v1/tools") == 1
+    
+    @pytest.mark.asyncio
+    async def test_warm_up_failures_are_not_raised(self, mock_config, serve):
+        """Test an unreachable upstream does not break warm-up"""
+        def handler(request):
+            raise httpx.ConnectError("Connection refused")
+        
+        server = serve(handler)
+        
+        report = await server.warm_up()
+        
+        assert report["connections"] == 0
+        assert "duration_ms" in report
+    
+    @pytest.mark.asyncio
+    async def test_run_async_warms_up_in_background(self, mock_config):
+        """Test serving starts without waiting for the warm-up"""
+        server = LettaMCPServer(mock_config)
+        warm_up_started = asyncio.Event()
+        
+        async def slow_warm_up():
+            warm_up_started.set()
+            await asyncio.sleep(10)
+        
+        async def serve(transport):
+            await warm_up_started.wait()
+        
+        with patch.object(server, "warm_up", slow_warm_up), \
+             patch.object(server.mcp, "run_async", side_effect=serve) as run_async:
+            await asyncio.wait_for(server.run_async("stdio"), timeout=1)
+        
+        run_async.assert_called_once_with(transport="stdio")
+    
+    @pytest.mark.asyncio
+    async def test_warm_up_disabled(self, mock_config):
+        """Test warmup=False skips the warm-up entirely"""
+        mock_config.warmup = False
+        server = LettaMCPServer(mock_config)
+        
+        with patch.object(server, "warm_up", AsyncMock()) as warm_up, \
+             patch.object(server.mcp, "run_async", AsyncMock()):
+            await server.run_async("stdio")
+        
+        warm_up.assert_not_called()
+
+
+class TestToolDeadlines:
+    """Test tool calls run under their deadline budgets"""
+    
+    @pytest.mark.asyncio
+    async def test_tool_requests_bounded_by_budget(self, mock_config):
+        """Test upstream timeouts are clamped to the calling tool's budget"""
+        mock_config.tool_deadlines = {"letta_list_agents": 3}
+        seen = []
+        
+        def handler(request):
+            seen.append(request.extensions["timeout"]["read"])
+            return httpx.Response(200, json=[])
+        
+        server = LettaMCPServer(mock_config)
+        server.client = httpx.AsyncClient(
+            base_url=mock_config.base_url,
+            timeout=60,
+            transport=DeadlineTransport(httpx.MockTransport(handler))
+        )
+        
+        list_agents = await get_tool_fn(server, "letta_list_agents")
+        health_check = await get_tool_fn(server, "letta_health_check")
+        await list_agents()
+        await health_check()
+        
+        assert 2.9 < seen[0] <= 3
+        assert 9.9 < seen[1] <= 10
+    
+    @pytest.mark.asyncio
+    async def test_expired_deadline_reported_as_tool_error(self, mock_config):
+        """Test a tool that runs out of time returns a timeout error"""
+        mock_config.tool_deadlines = {"letta_get_agent": 0.05}
+        
+        async def handler(request):
+            await asyncio.sleep(1)
+            return httpx.Response(200, json={})
+        
+        server = LettaMCPServer(mock_config)
+        server.client = httpx.AsyncClient(
+            base_url=mock_config.base_url,
+            transport=DeadlineTransport(httpx.MockTransport(handler))
+        )
+        
+        get_agent = await get_tool_fn(server, "letta_get_agent")
+        result = await get_agent(agent_id="agent-12345678-1234-1234-1234-123456789012")
+        
+        assert result["success"] is False
+        assert "letta_get_agent" in result["error"]
+        assert "timed out" in result["error"]
+    
+    @pytest.mark.asyncio
+    async def test_tools_run_under_declared_priority(self, mock_config, serve):
+        """Test tools schedule their requests under their priority class"""
+        seen = {}
+        
+        def handler(request):
+            seen[request.url.path] = current_priority()
+            return httpx.Response(200, json=[])
+        
+        server = serve(handler)
+        
+        await (await get_tool_fn(server, "letta_list_tools"))()
+        await (await get_tool_fn(server, "letta_list_agents"))()
+        await (await get_tool_fn(server, "letta_health_check"))()
+        
+        assert seen == {"/v1/tools": "bulk", "/v1/agents": "interactive"}
+        
+        await (await get_tool_fn(server, "letta_list_agents"))()
+        assert seen["/v1/agents"] == "standard"
+    
+    def test_deadline_layer_is_outermost(self, mock_config):
+        """Test the deadline layer wraps every other layer, under the response cache"""
+        server = LettaMCPServer(mock_config)
+        
+        assert isinstance(server.client._transport, HttpCacheTransport)
+        assert isinstance(server.client._transport.inner, DeadlineTransport)
+        
+        mock_config.http_cache = False
+        server = LettaMCPServer(mock_config)
+        
+        assert isinstance(server.client._transport, DeadlineTransport)
@@ -0,0 +1,1562 @@
+"""
+Unit tests for the transport layers
+"""
+
+import asyncio
+import gzip
+import json
+import zlib
+import pytest
+import httpx
+
+from letta_mcp.exceptions import CircuitOpenError, ConcurrencyLimitError, RateLimitError
+from letta_mcp.exceptions import TimeoutError as LettaTimeoutError
+from letta_mcp.transport import (
+    BACKEND_EXTENSION,
+    AdaptiveConcurrencyTransport,
+    CircuitBreakerTransport,
+    CoalescedResponse,
+    CompressionTransport,
+    DeadlineTransport,
+    HedgingTransport,
+    HttpCacheTransport,
+    RateLimitTransport,
+    RetryBudget,
+    RetryTransport,
+    RoutingTransport,
+    SingleFlightTransport,
+    StreamLimitTransport,
+    agent_id_from_path,
+    collect_metrics,
+    current_deadline,
+    current_priority,
+    deadline,
+    endpoint_family,
+    find_layer,
+    parse_retry_after,
+    priority
+)
+from letta_mcp.utils import create_retry_client
+
+
+def make_client(transport: httpx.AsyncBaseTransport) -> httpx.AsyncClient:
+    """Create a client over the given transport"""
+    return httpx.AsyncClient(base_url="http://letta.test", transport=transport)
+
+
+class TestStreamLimitTransport:
+    """Test the HTTP/2 stream limit layer"""
+    
+    @pytest.mark.asyncio
+    async def test_caps_requests_in_flight(self):
+        """Test that no more than max_in_flight requests run at once"""
+        active = 0
+        peak = 0
+        
+        async def handler(request):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return httpx.Response(200, json={"ok": True})
+        
+        transport = StreamLimitTransport(httpx.MockTransport(handler), max_in_flight=2)
+        
+        async with make_client(transport) as client:
+            responses = await asyncio.gather(*[client.get("/v1/agents") for _ in range(6)])
+        
+        assert all(r.status_code == 200 for r in responses)
+        assert peak == 2
+        assert transport.in_flight == 0
+    
+    @pytest.mark.asyncio
+    async def test_streamed_body_holds_slot(self):
+        """Test that a slot is held until a streamed body is closed"""
+        transport = StreamLimitTransport(
+            httpx.MockTransport(lambda request: httpx.Response(200, content=b"data")),
+            max_in_flight=1
+        )
+        
+        async with make_client(transport) as client:
+            async with client.stream("GET", "/v1/agents") as response:
+                assert transport.in_flight == 1
+                await response.aread()
+            
+            assert transport.in_flight == 0
+    
+    def test_metrics(self):
+        """Test metrics are collected from the transport chain"""
+        transport = StreamLimitTransport(
+            httpx.MockTransport(lambda request: httpx.Response(200)),
+            max_in_flight=8
+        )
+        client = make_client(transport)
+        
+        assert find_layer(client, StreamLimitTransport) is transport
+        assert collect_metrics(client) == {"streams": {"max_in_flight": 8, "in_flight": 0}}
+
+
+class TestAdaptiveConcurrencyTransport:
+    """Test the AIMD concurrency limiter"""
+    
+    @pytest.mark.asyncio
+    async def test_limit_grows_while_latency_is_stable(self):
+        """Test additive increase on fast, successful responses"""
+        async def handler(request):
+            await asyncio.sleep(0.001)
+            return httpx.Response(200, json=[])
+        
+        # A steady handler delay and generous tolerance keep scheduler jitter
+        # from registering as a latency spike
+        transport = AdaptiveConcurrencyTransport(
+            httpx.MockTransport(handler),
+            initial_limit=2,
+            max_limit=4,
+            latency_tolerance=10.0
+        )
+        
+        async with make_client(transport) as client:
+            for _ in range(30):
+                await client.get("/v1/agents")
+        
+        assert transport.limit == 4
+        assert transport.metrics()["increases"] > 0
+        assert transport.in_flight == 0
+    
+    @pytest.mark.asyncio
+    async def test_limit_shrinks_on_overload(self):
+        """Test multiplicative decrease on 503 responses"""
+        transport = AdaptiveConcurrencyTransport(
+            httpx.MockTransport(lambda request: httpx.Response(503)),
+            initial_limit=8,
+            min_limit=2,
+            backoff=0.5
+        )
+        
+        async with make_client(transport) as client:
+            for _ in range(5):
+                await client.get("/v1/agents")
+        
+        assert transport.limit == 2
+        assert transport.decreases >= 2
+    
+    @pytest.mark.asyncio
+    async def test_limit_shrinks_on_transport_error(self):
+        """Test that connection failures count as overload"""
+        def handler(request):
+            raise httpx.ConnectError("connection refused")
+        
+        transport = AdaptiveConcurrencyTransport(
+            httpx.MockTransport(handler),
+            initial_limit=4,
+            backoff=0.5
+        )
+        
+        async with make_client(transport) as client:
+            with pytest.raises(httpx.ConnectError):
+                await client.get("/v1/agents")
+        
+        assert transport.limit == 2
+        assert transport.in_flight == 0
+    
+    @pytest.mark.asyncio
+    async def test_queue_and_rejection(self):
+        """Test that requests queue up to max_queue and are then rejected"""
+        release = asyncio.Event()
+        
+        async def handler(request):
+            await release.wait()
+            return httpx.Response(200)
+        
+        transport = AdaptiveConcurrencyTransport(
+            httpx.MockTransport(handler),
+            initial_limit=1,
+            max_limit=1,
+            max_queue=1
+        )
+        
+        async with make_client(transport) as client:
+            first = asyncio.create_task(client.get("/v1/agents"))
+            second = asyncio.create_task(client.get("/v1/agents"))
+            await asyncio.sleep(0.01)
+            
+            assert transport.metrics()["in_flight"] == 1
+            assert transport.metrics()["queue_depth"] == 1
+            
+            with pytest.raises(ConcurrencyLimitError):
+                await client.get("/v1/agents")
+            
+            release.set()
+            await asyncio.gather(first, second)
+        
+        metrics = transport.metrics()
+        assert metrics["rejected"] == 1
+        assert metrics["queue_depth"] == 0
+        assert metrics["in_flight"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        """Test that a cancelled queued request gives up its place"""
+        release = asyncio.Event()
+        
+        async def handler(request):
+            await release.wait()
+            return httpx.Response(200)
+        
+        transport = AdaptiveConcurrencyTransport(
+            httpx.MockTransport(handler),
+            initial_limit=1,
+            max_limit=1
+        )
+        
+        async with make_client(transport) as client:
+            first = asyncio.create_task(client.get("/v1/agents"))
+            queued = asyncio.create_task(client.get("/v1/agents"))
+            await asyncio.sleep(0.01)
+            
+            queued.cancel()
+            await asyncio.sleep(0)
+            assert transport.metrics()["queue_depth"] == 0
+            
+            release.set()
+            await first
+        
+        assert transport.in_flight == 0
+    
+    async def run_queued(self, scheduling, classes):
+        """Queue one request per entry of ``classes`` behind a blocker and return the service order"""
+        release = asyncio.Event()
+        order = []
+        
+        async def handler(request):
+            if request.url.path == "/v1/block":
+                await release.wait()
+            else:
+                order.append(request.url.params["class"])
+            return httpx.Response(200)
+        
+        transport = AdaptiveConcurrencyTransport(
+            httpx.MockTransport(handler),
+            initial_limit=1,
+            max_limit=1,
+            scheduling=scheduling
+        )
+        
+        async def send(client, name):
+            with priority(name):
+                await client.get("/v1/agents", params={"class": name})
+        
+        async with make_client(transport) as client:
+            blocker = asyncio.create_task(client.get("/v1/block"))
+            await asyncio.sleep(0.01)
+            tasks = []
+            for name in classes:
+                tasks.append(asyncio.create_task(send(client, name)))
+                await asyncio.sleep(0)
+            await asyncio.sleep(0.01)
+            release.set()
+            await asyncio.gather(blocker, *tasks)
+        
+        return order, transport
+    
+    @pytest.mark.asyncio
+    async def test_strict_priority_serves_interactive_first(self):
+        """Test strict scheduling drains higher classes before lower ones"""
+        order, transport = await self.run_queued(
+            "strict", ["bulk", "bulk", "standard", "interactive", "bulk", "interactive"]
+        )
+        
+        assert order == ["interactive", "interactive", "standard", "bulk", "bulk", "bulk"]
+        priorities = transport.metrics()["priorities"]
+        assert priorities["bulk"]["queued"] == 3
+        assert priorities["interactive"]["requests"] == 2
+        assert priorities["interactive"]["latency_p95_ms"] is not None
+    
+    @pytest.mark.asyncio
+    async def test_weighted_scheduling_still_serves_bulk(self):
+        """Test weighted-fair scheduling interleaves bulk work by weight"""
+        order, _ = await self.run_queued("weighted", ["bulk"] * 4 + ["interactive"] * 8)
+        
+        # 8:1 weights give bulk one of the first nine slots
+        assert order[:9].count("bulk") == 1
+        assert order[:9].count("interactive") == 8
+    
+    def test_nested_priority_never_raises_class(self):
+        """Test an interactive call inside a bulk operation stays bulk"""
+        assert current_priority() == "standard"
+        
+        with priority("bulk"):
+            with priority("interactive") as effective:
+                assert effective == "bulk"
+                assert current_priority() == "bulk"
+        
+        with priority("standard"):
+            with priority("bulk"):
+                assert current_priority() == "bulk"
+        
+        with pytest.raises(ValueError):
+            with priority("urgent"):
+                pass
+
+
+class TestSingleFlightTransport:
+    """Test coalescing of identical in-flight GET requests"""
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_gets_share_one_call(self):
+        """Test that identical concurrent GETs hit upstream once"""
+        calls = 0
+        
+        async def handler(request):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"id": "agent-1", "tools": ["web_search"]})
+        
+        transport = SingleFlightTransport(httpx.MockTransport(handler))
+        
+        async with make_client(transport) as client:
+            responses = await asyncio.gather(
+                *[client.get("/v1/agents/agent-1") for _ in range(5)]
+            )
+        
+        assert calls == 1
+        assert all(isinstance(r, CoalescedResponse) for r in responses)
+        assert all(r.json() == {"id": "agent-1", "tools": ["web_search"]} for r in responses)
+        # The parsed result is shared, not re-decoded per caller
+        assert all(r.json() is responses[0].json() for r in responses)
+        assert transport.metrics() == {
+            "upstream_requests": 1,
+            "coalesced": 4,
+            "in_flight_keys": 0
+        }
+    
+    @pytest.mark.asyncio
+    async def test_different_urls_and_writes_are_not_coalesced(self):
+        """Test that distinct URLs and non-idempotent methods go upstream separately"""
+        calls = []
+        
+        async def handler(request):
+            calls.append((request.method, request.url.path, request.url.query))
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={})
+        
+        transport = SingleFlightTransport(httpx.MockTransport(handler))
+        
+        async with make_client(transport) as client:
+            await asyncio.gather(
+                client.get("/v1/agents", params={"limit": 1}),
+                client.get("/v1/agents", params={"limit": 2}),
+                client.post("/v1/agents", json={"name": "a"}),
+                client.post("/v1/agents", json={"name": "a"})
+            )
+        
+        assert len(calls) == 4
+    
+    @pytest.mark.asyncio
+    async def test_sequential_gets_are_not_cached(self):
+        """Test that coalescing only applies while a request is in flight"""
+        calls = 0
+        
+        def handler(request):
+            nonlocal calls
+            calls += 1
+            return httpx.Response(200, json={"n": calls})
+        
+        transport = SingleFlightTransport(httpx.MockTransport(handler))
+        
+        async with make_client(transport) as client:
+            first = await client.get("/v1/agents/agent-1")
+            second = await client.get("/v1/agents/agent-1")
+        
+        assert first.json() == {"n": 1}
+        assert second.json() == {"n": 2}
+    
+    @pytest.mark.asyncio
+    async def test_errors_are_shared(self):
+        """Test that an upstream failure is raised to every waiting caller"""
+        async def handler(request):
+            await asyncio.sleep(0.01)
+            raise httpx.ConnectError("connection refused")
+        
+        transport = SingleFlightTransport(httpx.MockTransport(handler))
+        
+        async with make_client(transport) as client:
+            results = await asyncio.gather(
+                client.get("/v1/agents"),
+                client.get("/v1/agents"),
+                return_exceptions=True
+            )
+        
+        assert all(isinstance(r, httpx.ConnectError) for r in results)
+        assert transport.leaders == 1
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """Test that cancelling one caller leaves the shared request running"""
+        async def handler(request):
+            await asyncio.sleep(0.02)
+            return httpx.Response(200, json={"ok": True})
+        
+        transport = SingleFlightTransport(httpx.MockTransport(handler))
+        
+        async with make_client(transport) as client:
+            leader = asyncio.create_task(client.get("/v1/agents"))
+            follower = asyncio.create_task(client.get("/v1/agents"))
+            await asyncio.sleep(0.005)
+            leader.cancel()
+            
+            response = await follower
+        
+        assert response.json() == {"ok": True}
+    
+    @pytest.mark.asyncio
+    async def test_fresh_read_does_not_join_a_revalidation(self):
+        """Test a no-cache read is not answered with another caller's 304"""
+        async def handler(request):
+            if request.headers.get("if-none-match") == '"v1"':
+                await asyncio.sleep(0.05)
+                return httpx.Response(304, headers={"ETag": '"v1"'})
+            if request.headers.get("cache-control") == "no-cache":
+                await asyncio.sleep(0.05)
+                return httpx.Response(200, headers={"ETag": '"v2"'}, json={"version": 2})
+            return httpx.Response(200, headers={"ETag": '"v1"'}, json={"version": 1})
+        
+        client = create_retry_client(
+            "http://letta.test",
+            {},
+            layers=[SingleFlightTransport],
+            cache=HttpCacheTransport,
+            pool=httpx.MockTransport(handler)
+        )
+        
+        async with client:
+            await client.get("/v1/agents/agent-1")
+            revalidation = asyncio.create_task(client.get("/v1/agents/agent-1"))
+            await asyncio.sleep(0.01)
+            fresh = await client.get("/v1/agents/agent-1", headers={"Cache-Control": "no-cache"})
+            revalidated = await revalidation
+        
+        assert revalidated.status_code == 200
+        assert revalidated.json() == {"version": 1}
+        assert fresh.status_code == 200
+        assert fresh.json() == {"version": 2}
+        assert find_layer(client, SingleFlightTransport).coalesced == 0
+
+
+class TestRateLimitTransport:
+    """Test the rate-limit-aware scheduler"""
+    
+    def test_parse_retry_after(self):
+        """Test Retry-After parsing for delta seconds and HTTP dates"""
+        assert parse_retry_after("5") == 5.0
+        assert parse_retry_after("0.5") == 0.5
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    
+    @pytest.mark.asyncio
+    async def test_429_is_queued_and_replayed(self):
+        """Test a throttled request waits for Retry-After and then succeeds"""
+        responses = iter([
+            httpx.Response(429, headers={"Retry-After": "0.05"}),
+            httpx.Response(200, json={"ok": True})
+        ])
+        transport = RateLimitTransport(httpx.MockTransport(lambda request: next(responses)))
+        
+        async with make_client(transport) as client:
+            response = await client.post("/v1/agents/agent-1/messages", json={})
+        
+        assert response.status_code == 200
+        assert transport.throttled == 1
+        assert transport.queued == 1
+        assert transport.wait_seconds >= 0.04
+    
+    @pytest.mark.asyncio
+    async def test_long_retry_after_raises(self):
+        """Test that a Retry-After beyond max_wait raises RateLimitError"""
+        transport = RateLimitTransport(
+            httpx.MockTransport(
+                lambda request: httpx.Response(429, headers={"Retry-After": "120"})
+            ),
+            max_wait=10
+        )
+        
+        async with make_client(transport) as client:
+            with pytest.raises(RateLimitError) as exc_info:
+                await client.get("/v1/agents")
+        
+        assert exc_info.value.details["response"]["retry_after_seconds"] == 120
+        assert transport.metrics()["blocked_for"] > 100
+    
+    @pytest.mark.asyncio
+    async def test_exhausted_budget_pauses_all_requests(self):
+        """Test that remaining=0 holds requests until the window resets"""
+        calls = []
+        
+        def handler(request):
+            calls.append(request.url.path)
+            return httpx.Response(
+                200,
+                json=[],
+                headers={
+                    "X-RateLimit-Limit": "100",
+                    "X-RateLimit-Remaining": "0" if len(calls) == 1 else "99",
+                    "X-RateLimit-Reset": "0.05"
+                }
+            )
+        
+        transport = RateLimitTransport(httpx.MockTransport(handler))
+        
+        async with make_client(transport) as client:
+            await client.get("/v1/agents")
+            await client.get("/v1/tools")
+        
+        assert len(calls) == 2
+        assert transport.queued == 1
+        metrics = transport.metrics()
+        assert metrics["upstream_limit"] == 100
+        assert metrics["upstream_remaining"] == 99
+    
+    @pytest.mark.asyncio
+    async def test_configured_rate_paces_requests(self):
+        """Test the token bucket spaces requests once the burst is spent"""
+        transport = RateLimitTransport(
+            httpx.MockTransport(lambda request: httpx.Response(200)),
+            rate=100.0,
+            burst=1
+        )
+        
+        async with make_client(transport) as client:
+            for _ in range(3):
+                await client.get("/v1/agents")
+        
+        assert transport.queued == 2
+        assert transport.metrics()["rate_per_second"] == 100.0
+
+
+class TestCircuitBreakerTransport:
+    """Test the per-endpoint circuit breaker"""
+    
+    def test_endpoint_family(self):
+        """Test paths are grouped into endpoint families"""
+        assert endpoint_family("/v1/agents") == "agents"
+        assert endpoint_family("/v1/agents/agent-1") == "agents"
+        assert endpoint_family("/v1/agents/agent-1/messages") == "messages"
+        assert endpoint_family("/v1/agents/agent-1/messages/search") == "messages"
+        assert endpoint_family("/v1/agents/agent-1/memory-blocks/block-1") == "memory-blocks"
+        assert endpoint_family("/v1/tools") == "tools"
+        assert endpoint_family("/v1/stats/usage") == "stats"
+    
+    @pytest.mark.asyncio
+    async def test_opens_after_threshold_and_fails_fast(self):
+        """Test the circuit opens per family and short-circuits further calls"""
+        calls = []
+        
+        def handler(request):
+            calls.append(request.url.path)
+            if request.url.path.endswith("/messages"):
+                return httpx.Response(503)
+            return httpx.Response(200, json={})
+        
+        transport = CircuitBreakerTransport(
+            httpx.MockTransport(handler),
+            failure_threshold=2,
+            reset_timeout=60
+        )
+        
+        async with make_client(transport) as client:
+            for _ in range(2):
+                await client.post("/v1/agents/agent-1/messages", json={})
+            
+            with pytest.raises(CircuitOpenError) as exc_info:
+                await client.post("/v1/agents/agent-1/messages", json={})
+            
+            # Other endpoint families are unaffected
+            response = await client.get("/v1/agents/agent-1")
+        
+        assert exc_info.value.details["endpoint"] == "messages"
+        assert response.status_code == 200
+        assert len(calls) == 3
+        assert transport.states() == {"messages": "open", "agents": "closed"}
+        assert transport.metrics()["messages"]["short_circuited"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_half_open_single_probe(self):
+        """Test that one probe is let through after the reset timeout"""
+        healthy = False
+        release = asyncio.Event()
+        
+        async def handler(request):
+            if not healthy:
+                raise httpx.ConnectTimeout("timed out")
+            await release.wait()
+            return httpx.Response(200, json=[])
+        
+        transport = CircuitBreakerTransport(
+            httpx.MockTransport(handler),
+            failure_threshold=1,
+            reset_timeout=0.01
+        )
+        
+        async with make_client(transport) as client:
+            with pytest.raises(httpx.ConnectTimeout):
+                await client.get("/v1/tools")
+            assert transport.states()["tools"] == "open"
+            
+            await asyncio.sleep(0.02)
+            healthy = True
+            probe = asyncio.create_task(client.get("/v1/tools"))
+            await asyncio.sleep(0.005)
+            
+            assert transport.states()["tools"] == "half_open"
+            with pytest.raises(CircuitOpenError):
+                await client.get("/v1/tools")
+            
+            release.set()
+            response = await probe
+        
+        assert response.status_code == 200
+        assert transport.states()["tools"] == "closed"
+    
+    @pytest.mark.asyncio
+    async def test_failed_probe_reopens(self):
+        """Test that a failed probe re-opens the circuit"""
+        transport = CircuitBreakerTransport(
+            httpx.MockTransport(lambda request: httpx.Response(500)),
+            failure_threshold=1,
+            reset_timeout=0.01
+        )
+        
+        async with make_client(transport) as client:
+            await client.get("/v1/stats/usage")
+            await asyncio.sleep(0.02)
+            await client.get("/v1/stats/usage")
+            
+            with pytest.raises(CircuitOpenError):
+                await client.get("/v1/stats/usage")
+        
+        assert transport.metrics()["stats"]["trips"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_client_errors_do_not_trip(self):
+        """Test that 4xx responses are not counted as endpoint failures"""
+        transport = CircuitBreakerTransport(
+            httpx.MockTransport(lambda request: httpx.Response(404)),
+            failure_threshold=1
+        )
+        
+        async with make_client(transport) as client:
+            for _ in range(3):
+                await client.get("/v1/agents/agent-1/messages/search")
+        
+        assert transport.states() == {"messages": "closed"}
+
+
+class TestRetryTransport:
+    """Test the status-aware retry engine"""
+    
+    def make_retry(self, handler, **kwargs):
+        kwargs.setdefault("base_delay", 0.001)
+        kwargs.setdefault("max_delay", 0.005)
+        return RetryTransport(httpx.MockTransport(handler), **kwargs)
+    
+    @pytest.mark.asyncio
+    async def test_idempotent_request_retried_on_5xx(self):
+        """Test GETs are retried on 503 and attempts are recorded"""
+        responses = iter([httpx.Response(503), httpx.Response(502), httpx.Response(200, json=[])])
+        transport = self.make_retry(lambda request: next(responses))
+        
+        async with make_client(transport) as client:
+            response = await client.get("/v1/agents")
+        
+        assert response.status_code == 200
+        assert response.extensions["retry_attempts"] == 3
+        assert transport.metrics()["retries"] == 2
+        assert transport.metrics()["attempts"] == {"3": 1}
+    
+    @pytest.mark.asyncio
+    async def test_patch_retried_on_read_timeout(self):
+        """Test PATCH is treated as idempotent"""
+        calls = 0
+        
+        def handler(request):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise httpx.ReadTimeout("read timed out")
+            return httpx.Response(200, json={})
+        
+        transport = self.make_retry(handler)
+        
+        async with make_client(transport) as client:
+            response = await client.patch("/v1/agents/agent-1", json={"name": "x"})
+        
+        assert response.status_code == 200
+        assert calls == 2
+    
+    @pytest.mark.asyncio
+    async def test_message_send_not_retried_after_it_may_have_been_delivered(self):
+        """Test POSTs are not retried on 5xx or read timeouts"""
+        calls = 0
+        
+        def handler(request):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                return httpx.Response(503)
+            raise httpx.ReadTimeout("read timed out")
+        
+        transport = self.make_retry(handler)
+        
+        async with make_client(transport) as client:
+            response = await client.post("/v1/agents/agent-1/messages", json={})
+            assert response.status_code == 503
+            
+            with pytest.raises(httpx.ReadTimeout):
+                await client.post("/v1/agents/agent-1/messages", json={})
+        
+        assert calls == 2
+    
+    @pytest.mark.asyncio
+    async def test_post_retried_on_connect_error(self):
+        """Test POSTs are retried when the request never reached the server"""
+        calls = 0
+        
+        def handler(request):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise httpx.ConnectError("connection refused")
+            return httpx.Response(200, json={"messages": []})
+        
+        transport = self.make_retry(handler)
+        
+        async with make_client(transport) as client:
+            response = await client.post("/v1/agents/agent-1/messages", json={})
+        
+        assert response.status_code == 200
+        assert calls == 2
+    
+    @pytest.mark.asyncio
+    async def test_429_left_to_rate_limiter(self):
+        """Test 429 responses are passed through untouched"""
+        transport = self.make_retry(lambda request: httpx.Response(429))
+        
+        async with make_client(transport) as client:
+            response = await client.get("/v1/agents")
+        
+        assert response.status_code == 429
+        assert transport.retries == 0
+    
+    @pytest.mark.asyncio
+    async def test_max_retries(self):
+        """Test retries stop after max_retries"""
+        calls = 0
+        
+        def handler(request):
+            nonlocal calls
+            calls += 1
+            return httpx.Response(500)
+        
+        transport = self.make_retry(handler, max_retries=2)
+        
+        async with make_client(transport) as client:
+            response = await client.get("/v1/tools")
+        
+        assert response.status_code == 500
+        assert calls == 3
+    
+    @pytest.mark.asyncio
+    async def test_budget_limits_retry_amplification(self):
+        """Test the shared budget stops retries during an outage"""
+        calls = 0
+        
+        def handler(request):
+            nonlocal calls
+            calls += 1
+            return httpx.Response(503)
+        
+        budget = RetryBudget(ratio=0.0, min_per_second=0.0, capacity=2)
+        transport = self.make_retry(handler, max_retries=3, budget=budget)
+        
+        async with make_client(transport) as client:
+            for _ in range(5):
+                await client.get("/v1/agents")
+        
+        # 5 first attempts plus the 2 retries the budget allowed
+        assert calls == 7
+        assert transport.budget_exhausted >= 1
+    
+    def test_decorrelated_jitter_bounds(self):
+        """Test backoff delays stay within [base, max]"""
+        transport = self.make_retry(lambda request: httpx.Response(200), base_delay=0.1, max_delay=1.0)
+        
+        delay = transport.base_delay
+        for _ in range(50):
+            delay = transport._next_delay(delay)
+            assert 0.1 <= delay <= 1.0
+
+    
+    @pytest.mark.asyncio
+    async def test_no_retry_past_deadline(self):
+        """Test a retry whose backoff outlasts the deadline is skipped"""
+        calls = 0
+        
+        def handler(request):
+            nonlocal calls
+            calls += 1
+            return httpx.Response(503)
+        
+        transport = self.make_retry(handler, base_delay=0.5, max_delay=1.0)
+        
+        async with make_client(transport) as client:
+            with deadline(0.2, operation="letta_get_agent"):
+                response = await client.get("/v1/agents/agent-1")
+        
+        assert response.status_code == 503
+        assert calls == 1
+        assert transport.metrics()["deadline_skipped"] == 1
+
+
+class TestHedgingTransport:
+    """Test hedged GET requests"""
+    
+    def warm(self, transport, family="agents", latency=0.01, count=None):
+        for _ in range(count or transport.min_samples):
+            transport._record_latency(family, latency)
+    
+    def test_no_hedging_without_samples(self):
+        """Test the hedge delay is only derived once enough samples exist"""
+        transport = HedgingTransport(httpx.MockTransport(lambda request: httpx.Response(200)))
+        
+        assert transport.hedge_delay("agents") is None
+        self.warm(transport, latency=0.2)
+        assert transport.hedge_delay("agents") == 0.2
+    
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged(self):
+        """Test a second request wins when the first is slow, and the loser is cancelled"""
+        calls = 0
+        cancelled = asyncio.Event()
+        
+        async def handler(request):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                try:
+                    await asyncio.sleep(1)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+            return httpx.Response(200, json={"call": calls})
+        
+        transport = HedgingTransport(httpx.MockTransport(handler), max_ratio=1.0, min_delay=0.01)
+        self.warm(transport)
+        
+        async with make_client(transport) as client:
+            response = await client.get("/v1/agents/agent-1")
+            await asyncio.wait_for(cancelled.wait(), timeout=1)
+        
+        assert response.json() == {"call": 2}
+        assert transport.hedged == 1
+        assert transport.hedge_wins == 1
+    
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self):
+        """Test no hedge is sent when the first response is quick"""
+        calls = 0
+        
+        def handler(request):
+            nonlocal calls
+            calls += 1
+            return httpx.Response(200)
+        
+        transport = HedgingTransport(httpx.MockTransport(handler), max_ratio=1.0)
+        self.warm(transport, latency=0.5)
+        
+        async with make_client(transport) as client:
+            await client.get("/v1/agents")
+        
+        assert calls == 1
+        assert transport.hedged == 0
+    
+    @pytest.mark.asyncio
+    async def test_hedge_rate_is_capped(self):
+        """Test hedges stay under max_ratio of requests"""
+        async def handler(request):
+            await asyncio.sleep(0.02)
+            return httpx.Response(200)
+        
+        transport = HedgingTransport(httpx.MockTransport(handler), max_ratio=0.25, min_delay=0.001)
+        self.warm(transport, latency=0.001, count=transport.window)
+        
+        async with make_client(transport) as client:
+            for _ in range(8):
+                await client.get("/v1/agents")
+        
+        assert transport.hedged == 2
+        assert transport.metrics()["hedge_rate"] == 0.25
+    
+    @pytest.mark.asyncio
+    async def test_writes_are_never_hedged(self):
+        """Test non-idempotent requests are sent once"""
+        calls = 0
+        
+        async def handler(request):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.02)
+            return httpx.Response(200)
+        
+        transport = HedgingTransport(httpx.MockTransport(handler), max_ratio=1.0, min_delay=0.001)
+        self.warm(transport, family="messages", latency=0.001)
+        
+        async with make_client(transport) as client:
+            await client.post("/v1/agents/agent-1/messages", json={})
+        
+        assert calls == 1
+    
+    @pytest.mark.asyncio
+    async def test_failed_primary_falls_back_to_hedge(self):
+        """Test the hedge's response is used when the primary errors"""
+        calls = 0
+        
+        async def handler(request):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                await asyncio.sleep(0.02)
+                raise httpx.ReadError("connection reset")
+            await asyncio.sleep(0.04)
+            return httpx.Response(200)
+        
+        transport = HedgingTransport(httpx.MockTransport(handler), max_ratio=1.0, min_delay=0.001)
+        self.warm(transport, latency=0.001)
+        
+        async with make_client(transport) as client:
+            response = await client.get("/v1/agents")
+        
+        assert response.status_code == 200
+
+
+class ChunkedStream(httpx.AsyncByteStream):
+    """Serve a body in fixed-size chunks"""
+    
+    def __init__(self, body: bytes, size: int):
+        self.body = body
+        self.size = size
+    
+    async def __aiter__(self):
+        for i in range(0, len(self.body), self.size):
+            yield self.body[i:i + self.size]
+
+
+class TestCompressionTransport:
+    """Test response compression negotiation and streaming decode"""
+    
+    @pytest.mark.asyncio
+    async def test_decodes_gzip_stream_and_counts_bytes(self):
+        """Test a gzip body is decoded chunk by chunk and both sizes are recorded"""
+        payload = json.dumps([{"role": "assistant", "content": "hello " * 50}] * 40).encode()
+        compressed = gzip.compress(payload)
+        seen = []
+        
+        def handler(request):
+            seen.append(request.headers["accept-encoding"])
+            return httpx.Response(
+                200,
+                headers={"Content-Encoding": "gzip", "Content-Length": str(len(compressed))},
+                stream=ChunkedStream(compressed, 64)
+            )
+        
+        transport = CompressionTransport(httpx.MockTransport(handler))
+        async with make_client(transport) as client:
+            response = await client.get("/v1/agents/agent-1/messages")
+        
+        assert response.content == payload
+        assert "content-encoding" not in response.headers
+        assert "gzip" in seen[0]
+        
+        metrics = transport.metrics()
+        stats = metrics["endpoints"]["messages"]
+        assert stats == {
+            "responses": 1,
+            "compressed_responses": 1,
+            "wire_bytes": len(compressed),
+            "decoded_bytes": len(payload)
+        }
+        assert metrics["saved_ratio"] > 0.9
+    
+    @pytest.mark.asyncio
+    async def test_deflate_and_stacked_codings(self):
+        """Test zlib deflate and codings applied in sequence are decoded"""
+        payload = b'{"ok": true}' * 20
+        body = gzip.compress(zlib.compress(payload))
+        
+        transport = CompressionTransport(httpx.MockTransport(
+            lambda request: httpx.Response(200, headers={"Content-Encoding": "deflate, gzip"}, content=body)
+        ))
+        async with make_client(transport) as client:
+            response = await client.get("/v1/tools")
+        
+        assert response.content == payload
+    
+    @pytest.mark.asyncio
+    async def test_disabled_requests_identity_and_counts_plain_bytes(self):
+        """Test compression=False asks for identity but still counts bytes"""
+        seen = []
+        
+        def handler(request):
+            seen.append(request.headers["accept-encoding"])
+            return httpx.Response(200, content=b"[]")
+        
+        transport = CompressionTransport(httpx.MockTransport(handler), enabled=False)
+        async with make_client(transport) as client:
+            await client.get("/v1/agents")
+        
+        assert seen == ["identity"]
+        assert transport.metrics()["endpoints"]["agents"]["wire_bytes"] == 2
+        assert transport.metrics()["endpoints"]["agents"]["compressed_responses"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_corrupt_body_raises_decoding_error(self):
+        """Test a corrupt compressed body surfaces as httpx.DecodingError"""
+        transport = CompressionTransport(httpx.MockTransport(
+            lambda request: httpx.Response(200, headers={"Content-Encoding": "gzip"}, content=b"not gzip")
+        ))
+        async with make_client(transport) as client:
+            with pytest.raises(httpx.DecodingError):
+                await client.get("/v1/agents")
+
+
+class TestDeadlines:
+    """Test deadline propagation and enforcement"""
+    
+    def test_nested_deadline_only_shortens(self):
+        """Test an inner deadline cannot extend the enclosing one"""
+        assert current_deadline() is None
+        
+        with deadline(5, operation="outer") as outer:
+            with deadline(60, operation="inner") as inner:
+                assert inner is outer
+            with deadline(1, operation="inner") as inner:
+                assert inner.operation == "inner"
+                assert inner.remaining() <= 1
+            assert current_deadline() is outer
+        
+        assert current_deadline() is None
+    
+    @pytest.mark.asyncio
+    async def test_timeouts_clamped_to_remaining_budget(self):
+        """Test every timeout phase is clamped to the time left"""
+        seen = []
+        
+        def handler(request):
+            seen.append(request.extensions["timeout"])
+            return httpx.Response(200, json=[])
+        
+        transport = DeadlineTransport(httpx.MockTransport(handler))
+        async with make_client(transport) as client:
+            await client.get("/v1/agents", timeout=httpx.Timeout(60, connect=0.5))
+            with deadline(2):
+                await client.get("/v1/agents", timeout=httpx.Timeout(60, connect=0.5))
+        
+        assert seen[0]["read"] == 60
+        assert seen[1]["connect"] == 0.5
+        assert 1.9 < seen[1]["read"] <= 2
+        assert 1.9 < seen[1]["pool"] <= 2
+        assert transport.metrics()["clamped_timeouts"] == 3
+    
+    @pytest.mark.asyncio
+    async def test_slow_inner_layers_cancelled_at_deadline(self):
+        """Test time spent queueing or retrying below counts against the deadline"""
+        async def handler(request):
+            await asyncio.sleep(1)
+            return httpx.Response(200)
+        
+        transport = DeadlineTransport(httpx.MockTransport(handler))
+        async with make_client(transport) as client:
+            with deadline(0.05, operation="letta_send_message"):
+                with pytest.raises(LettaTimeoutError, match="letta_send_message"):
+                    await client.get("/v1/agents")
+        
+        assert transport.metrics()["expired"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_expired_deadline_fails_before_sending(self):
+        """Test no request is sent once the deadline has passed"""
+        calls = 0
+        
+        def handler(request):
+            nonlocal calls
+            calls += 1
+            return httpx.Response(200)
+        
+        transport = DeadlineTransport(httpx.MockTransport(handler))
+        async with make_client(transport) as client:
+            with deadline(0.01):
+                await asyncio.sleep(0.02)
+                with pytest.raises(LettaTimeoutError):
+                    await client.get("/v1/agents")
+        
+        assert calls == 0
+
+
+class TestRoutingTransport:
+    """Test multi-backend routing"""
+    
+    BACKENDS = ["http://letta-1:8283", "http://letta-2:8283", "http://letta-3:8283"]
+    
+    def make_client(self, transport):
+        return httpx.AsyncClient(base_url=self.BACKENDS[0], transport=transport)
+    
+    def test_agent_id_from_path(self):
+        """Test agent IDs are extracted from agent paths only"""
+        assert agent_id_from_path("/v1/agents/agent-1/messages") == "agent-1"
+        assert agent_id_from_path("/v1/agents/agent-1") == "agent-1"
+        assert agent_id_from_path("/v1/agents") is None
+        assert agent_id_from_path("/v1/tools/tool-1") is None
+    
+    @pytest.mark.asyncio
+    async def test_requests_rewritten_to_chosen_backend(self):
+        """Test URL and Host header follow the chosen backend"""
+        seen = []
+        
+        def handler(request):
+            seen.append((str(request.url), request.headers["host"]))
+            return httpx.Response(200, json=[])
+        
+        transport = RoutingTransport(
+            httpx.MockTransport(handler),
+            backends=self.BACKENDS[:2],
+            policy="least_outstanding",
+            sticky=False
+        )
+        async with self.make_client(transport) as client:
+            await client.get("/v1/agents", params={"limit": 1})
+            await client.get("/v1/agents", params={"limit": 1})
+        
+        assert seen == [
+            ("http://letta-1:8283/v1/agents?limit=1", "letta-1:8283"),
+            ("http://letta-2:8283/v1/agents?limit=1", "letta-2:8283")
+        ]
+    
+    @pytest.mark.asyncio
+    async def test_pinned_requests_go_to_named_backend(self):
+        """Test the backend extension overrides the policy, and pinned requests are not coalesced"""
+        seen = []
+        
+        async def handler(request):
+            seen.append(request.url.host)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json=[])
+        
+        transport = SingleFlightTransport(
+            RoutingTransport(httpx.MockTransport(handler), backends=self.BACKENDS[:3], sticky=False)
+        )
+        async with self.make_client(transport) as client:
+            await asyncio.gather(*(
+                client.get("/v1/agents", extensions={BACKEND_EXTENSION: url})
+                for url in (self.BACKENDS[2], self.BACKENDS[2], self.BACKENDS[1])
+            ))
+        
+        assert sorted(seen) == ["letta-2", "letta-3"]
+    
+    @pytest.mark.asyncio
+    async def test_least_outstanding_spreads_concurrent_requests(self):
+        """Test concurrent requests go to the least busy backends"""
+        hosts = []
+        
+        async def handler(request):
+            hosts.append(request.url.host)
+            await asyncio.sleep(0.02)
+            return httpx.Response(200, json=[])
+        
+        transport = RoutingTransport(
+            httpx.MockTransport(handler),
+            backends=self.BACKENDS,
+            policy="least_outstanding"
+        )
+        async with self.make_client(transport) as client:
+            await asyncio.gather(*(client.get("/v1/tools") for _ in range(6)))
+        
+        assert sorted(hosts) == ["letta-1", "letta-1", "letta-2", "letta-2", "letta-3", "letta-3"]
+        assert all(
+            stats["outstanding"] == 0 for stats in transport.metrics()["backends"].values()
+        )
+    
+    @pytest.mark.asyncio
+    async def test_ewma_prefers_faster_backend(self):
+        """Test latency EWMA routing favours the quicker backend"""
+        hosts = []
+        
+        async def handler(request):
+            hosts.append(request.url.host)
+            await asyncio.sleep(0.03 if request.url.host == "letta-1" else 0.001)
+            return httpx.Response(200, json=[])
+        
+        transport = RoutingTransport(httpx.MockTransport(handler), backends=self.BACKENDS[:2])
+        async with self.make_client(transport) as client:
+            for _ in range(10):
+                await client.get("/v1/tools")
+        
+        assert hosts[:2] == ["letta-1", "letta-2"]
+        assert hosts[2:].count("letta-2") == 8
+    
+    @pytest.mark.asyncio
+    async def test_sticky_routing_per_agent(self):
+        """Test an agent's requests stay on one backend and move only on ejection"""
+        hosts = []
+        
+        def handler(request):
+            hosts.append(request.url.host)
+            return httpx.Response(200, json={})
+        
+        transport = RoutingTransport(
+            httpx.MockTransport(handler),
+            backends=self.BACKENDS,
+            ejection_threshold=1
+        )
+        async with self.make_client(transport) as client:
+            for _ in range(5):
+                await client.get("/v1/agents/agent-42/memory/blocks")
+            assert len(set(hosts)) == 1
+            
+            home = next(b for b in transport.backends if b.url.endswith(hosts[0] + ":8283"))
+            transport._record(home, success=False)
+            await client.get("/v1/agents/agent-42")
+        
+        assert hosts[-1] != hosts[0]
+    
+    @pytest.mark.asyncio
+    async def test_failed_backend_ejected_and_retry_fails_over(self):
+        """Test connect failures eject a backend and the retry lands elsewhere"""
+        def handler(request):
+            if request.url.host == "letta-1":
+                raise httpx.ConnectError("Connection refused")
+            return httpx.Response(200, json={"ok": True})
+        
+        router = RoutingTransport(
+            httpx.MockTransport(handler),
+            backends=self.BACKENDS[:2],
+            policy="least_outstanding",
+            sticky=False,
+            ejection_threshold=1,
+            ejection_time=60
+        )
+        transport = RetryTransport(router, base_delay=0.001, max_delay=0.002)
+        async with self.make_client(transport) as client:
+            response = await client.post("/v1/agents", json={"name": "new"})
+            await client.get("/v1/tools")
+        
+        assert response.status_code == 200
+        backends = router.metrics()["backends"]
+        assert backends["http://letta-1:8283"]["ejected"] is True
+        assert backends["http://letta-1:8283"]["requests"] == 1
+        assert backends["http://letta-2:8283"]["requests"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_sticky_retry_takes_next_rendezvous_rank(self):
+        """Test a retry skips the backend that failed the first attempt, before any ejection"""
+        hosts = []
+        
+        def handler(request):
+            hosts.append(request.url.host)
+            return httpx.Response(503 if len(hosts) == 1 else 200, json={})
+        
+        router = RoutingTransport(
+            httpx.MockTransport(handler),
+            backends=self.BACKENDS
+        )
+        home = router.choose("/v1/agents/agent-42")
+        runner_up = router.choose("/v1/agents/agent-42", attempted={home.url})
+        transport = RetryTransport(router, base_delay=0.001, max_delay=0.002)
+        
+        async with self.make_client(transport) as client:
+            response = await client.get("/v1/agents/agent-42")
+        
+        assert response.status_code == 200
+        assert [f"http://{host}:8283" for host in hosts] == [home.url, runner_up.url]
+        assert runner_up is not home
+    
+    @pytest.mark.asyncio
+    async def test_hedge_goes_to_another_backend(self):
+        """Test a hedge is not sent to the backend still serving the primary"""
+        hosts = []
+        
+        async def handler(request):
+            hosts.append(request.url.host)
+            await asyncio.sleep(0.2 if len(hosts) == 1 else 0)
+            return httpx.Response(200, json={"host": request.url.host})
+        
+        router = RoutingTransport(httpx.MockTransport(handler), backends=self.BACKENDS[:2])
+        transport = HedgingTransport(router, max_ratio=1.0, min_delay=0.01, min_samples=1)
+        transport._record_latency("agents", 0.01)
+        
+        async with self.make_client(transport) as client:
+            response = await client.get("/v1/agents/agent-42")
+        
+        assert len(set(hosts)) == 2
+        assert response.json() == {"host": hosts[1]}
+        assert transport.hedge_wins == 1
+    
+    @pytest.mark.asyncio
+    async def test_retry_reuses_the_only_backend(self):
+        """Test attempts fall back to tried backends when no other is left"""
+        hosts = []
+        
+        def handler(request):
+            hosts.append(request.url.host)
+            return httpx.Response(503 if len(hosts) == 1 else 200, json={})
+        
+        router = RoutingTransport(
+            httpx.MockTransport(handler),
+            backends=self.BACKENDS[:1]
+        )
+        transport = RetryTransport(router, base_delay=0.001, max_delay=0.002)
+        
+        async with self.make_client(transport) as client:
+            response = await client.get("/v1/agents/agent-42")
+        
+        assert response.status_code == 200
+        assert hosts == ["letta-1", "letta-1"]
+    
+    @pytest.mark.asyncio
+    async def test_all_ejected_fails_open(self):
+        """Test requests still flow when every backend is ejected"""
+        transport = RoutingTransport(
+            httpx.MockTransport(lambda request: httpx.Response(200)),
+            backends=self.BACKENDS[:2],
+            ejection_threshold=1
+        )
+        for backend in transport.backends:
+            transport._record(backend, success=False)
+        
+        async with self.make_client(transport) as client:
+            response = await client.get("/v1/tools")
+        
+        assert response.status_code == 200
+
+
+class TestHttpCacheTransport:
+    """Test conditional-GET revalidation and TTL caching"""
+    
+    @pytest.mark.asyncio
+    async def test_revalidates_with_etag_and_serves_304_from_cache(self):
+        """Test a stored ETag is sent back and a 304 is answered with the cached body"""
+        seen = []
+        
+        def handler(request):
+            seen.append(request.headers.get("if-none-match"))
+            if request.headers.get("if-none-match") == '"v1"':
+                return httpx.Response(304, headers={"ETag": '"v1"'})
+            return httpx.Response(200, headers={"ETag": '"v1"'}, json=[{"id": "agent-1"}])
+        
+        transport = HttpCacheTransport(httpx.MockTransport(handler))
+        async with make_client(transport) as client:
+            first = await client.get("/v1/agents")
+            second = await client.get("/v1/agents")
+        
+        assert seen == [None, '"v1"']
+        assert first.extensions["cache"] == "miss"
+        assert second.status_code == 200
+        assert second.extensions["cache"] == "revalidated"
+        assert second.json() == [{"id": "agent-1"}]
+        assert transport.metrics()["revalidated"] == 1
+        assert transport.metrics()["misses"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_last_modified_is_sent_as_if_modified_since(self):
+        """Test Last-Modified validators revalidate with If-Modified-Since"""
+        stamp = "Wed, 21 Oct 2026 07:28:00 GMT"
+        seen = []
+        
+        def handler(request):
+            seen.append(request.headers.get("if-modified-since"))
+            return httpx.Response(200, headers={"Last-Modified": stamp}, json={"id": "agent-1"})
+        
+        transport = HttpCacheTransport(httpx.MockTransport(handler))
+        async with make_client(transport) as client:
+            await client.get("/v1/agents/agent-1")
+            response = await client.get("/v1/agents/agent-1")
+        
+        assert seen == [None, stamp]
+        assert response.extensions["cache"] == "miss"
+    
+    @pytest.mark.asyncio
+    async def test_ttl_freshness_without_validators(self):
+        """Test responses without validators are reused until the TTL expires"""
+        calls = []
+        
+        def handler(request):
+            calls.append(request.url.path)
+            return httpx.Response(200, json=[{"name": "web_search"}])
+        
+        transport = HttpCacheTransport(httpx.MockTransport(handler), ttl=60)
+        async with make_client(transport) as client:
+            await client.get("/v1/tools")
+            cached = await client.get("/v1/tools")
+            
+            transport.ttl = 0
+            await client.get("/v1/tools")
+        
+        assert len(calls) == 2
+        assert cached.extensions["cache"] == "hit"
+        assert cached.json() == [{"name": "web_search"}]
+        assert transport.metrics()["hits"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_volatile_families_and_no_store_are_not_reused(self):
+        """Test conversation history is never served on TTL and no-store is not kept"""
+        calls = []
+        
+        def handler(request):
+            calls.append(request.url.path)
+            if request.url.path == "/v1/tools":
+                return httpx.Response(200, headers={"Cache-Control": "no-store"}, json=[])
+            return httpx.Response(200, json=[])
+        
+        transport = HttpCacheTransport(httpx.MockTransport(handler), ttl=60)
+        async with make_client(transport) as client:
+            for _ in range(2):
+                await client.get("/v1/agents/agent-1/messages")
+                await client.get("/v1/tools")
+        
+        assert len(calls) == 4
+        assert transport.metrics()["entries"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_max_age_overrides_validators(self):
+        """Test Cache-Control max-age makes a validated response fresh"""
+        calls = []
+        
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(200, headers={"ETag": '"v1"', "Cache-Control": "max-age=60"}, json={})
+        
+        transport = HttpCacheTransport(httpx.MockTransport(handler))
+        async with make_client(transport) as client:
+            await client.get("/v1/agents/agent-1")
+            response = await client.get("/v1/agents/agent-1")
+        
+        assert len(calls) == 1
+        assert response.extensions["cache"] == "hit"
+    
+    @pytest.mark.asyncio
+    async def test_writes_invalidate_resource_and_collection(self):
+        """Test a successful PATCH drops the agent, its sub-resources and the agent list"""
+        calls = []
+        
+        def handler(request):
+            calls.append((request.method, request.url.path))
+            return httpx.Response(200, json={})
+        
+        transport = HttpCacheTransport(httpx.MockTransport(handler), ttl=60)
+        paths = ["/v1/agents", "/v1/agents/agent-1", "/v1/agents/agent-1/memory/blocks", "/v1/agents/agent-2", "/v1/tools"]
+        async with make_client(transport) as client:
+            for path in paths:
+                await client.get(path)
+            await client.patch("/v1/agents/agent-1", json={"name": "renamed"})
+            for path in paths:
+                await client.get(path)
+        
+        refetched = [path for method, path in calls[len(paths) + 1:]]
+        assert refetched == ["/v1/agents", "/v1/agents/agent-1", "/v1/agents/agent-1/memory/blocks"]
+        assert transport.metrics()["invalidations"] == 3
+    
+    @pytest.mark.asyncio
+    async def test_streamed_body_is_stored_once_fully_read(self):
+        """Test a body read incrementally is captured, and an oversized one is not"""
+        body = json.dumps([{"id": f"agent-{i}"} for i in range(50)]).encode()
+        
+        transport = HttpCacheTransport(
+            httpx.MockTransport(lambda request: httpx.Response(200, stream=ChunkedStream(body, 64))),
+            ttl=60,
+            max_entry_bytes=len(body)
+        )
+        async with make_client(transport) as client:
+            async with client.stream("GET", "/v1/agents") as response:
+                chunks = [chunk async for chunk in response.aiter_bytes()]
+            cached = await client.get("/v1/agents")
+            
+            transport.max_entry_bytes = len(body) - 1
+            async with client.stream("GET", "/v1/tools") as response:
+                await response.aread()
+        
+        assert b"".join(chunks) == body
+        assert cached.extensions["cache"] == "hit"
+        assert cached.content == body
+        assert transport.metrics()["entries"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self):
+        """Test the least recently used entry is evicted at capacity"""
+        transport = HttpCacheTransport(
+            httpx.MockTransport(lambda request: httpx.Response(200, json={})),
+            ttl=60,
+            max_entries=2
+        )
+        async with make_client(transport) as client:
+            await client.get("/v1/agents/agent-1")
+            await client.get("/v1/agents/agent-2")
+            await client.get("/v1/agents/agent-1")
+            await client.get("/v1/agents/agent-3")
+            missed = await client.get("/v1/agents/agent-2")
+            kept = await client.get("/v1/agents/agent-3")
+        
+        assert missed.extensions["cache"] == "miss"
+        assert kept.extensions["cache"] == "hit"
+        assert transport.metrics()["evictions"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_caller_conditional_requests_bypass_cache(self):
+        """Test requests that already carry validators are passed through untouched"""
+        transport = HttpCacheTransport(
+            httpx.MockTransport(lambda request: httpx.Response(304)),
+            ttl=60
+        )
+        async with make_client(transport) as client:
+            response = await client.get("/v1/tools", headers={"If-None-Match": '"v9"'})
+        
+        assert response.status_code == 304
+        assert transport.metrics()["misses"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_validatorless_responses_not_reused_by_default(self):
+        """Test the heuristic TTL is opt-in, so plain responses always go upstream"""
+        calls = []
+        
+        def handler(request):
+            calls.append(request.url.path)
+            return httpx.Response(200, json={"id": "agent-1"})
+        
+        transport = HttpCacheTransport(httpx.MockTransport(handler))
+        async with make_client(transport) as client:
+            await client.get("/v1/agents/agent-1")
+            response = await client.get("/v1/agents/agent-1")
+        
+        assert len(calls) == 2
+        assert response.extensions["cache"] == "miss"
+        assert transport.metrics()["hits"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_no_cache_request_reads_through_and_refreshes(self):
+        """Test Cache-Control: no-cache skips a fresh entry and replaces it with the upstream body"""
+        versions = iter(["v1", "v2"])
+        
+        transport = HttpCacheTransport(
+            httpx.MockTransport(lambda request: httpx.Response(200, json={"version": next(versions)})),
+            ttl=60
+        )
+        async with make_client(transport) as client:
+            await client.get("/v1/agents/agent-1")
+            fresh = await client.get("/v1/agents/agent-1", headers={"Cache-Control": "no-cache"})
+            cached = await client.get("/v1/agents/agent-1")
+        
+        assert fresh.extensions["cache"] == "miss"
+        assert fresh.json() == {"version": "v2"}
+        assert cached.extensions["cache"] == "hit"
+        assert cached.json() == {"version": "v2"}
+        assert transport.metrics()["bypassed"] == 1
@@ -6,15 +6,29 @@ import pytest
 from unittest.mock import Mock, AsyncMock
 import httpx
 import asyncio
+import json
+from functools import partial
 
 from letta_mcp.utils import (
     parse_message_response,
     format_memory_blocks,
     validate_agent_id,
     extract_assistant_message,
-    create_retry_client
+    create_retry_client,
+    decode_cursor,
+    encode_cursor,
+    iter_json_array,
+    parse_timestamp
+)
+from letta_mcp.exceptions import LettaMCPError, ValidationError
+from letta_mcp.transport import (
+    CompressionTransport,
+    HttpCacheTransport,
+    RetryTransport,
+    SingleFlightTransport,
+    StreamLimitTransport,
+    find_layer
 )
-from letta_mcp.exceptions import LettaMCPError
 
 
 class TestParseMessageResponse:
@@ -403,6 +417,149 @@ class TestCreateRetryClient:
         )
         assert isinstance(client, httpx.AsyncClient)
 
+    
+    def test_pool_size_is_honored(self):
+        """Test that pool_size sets the connection limits"""
+        client = create_retry_client(
+            base_url="https://api.test.com",
+            headers={},
+            pool_size=4
+        )
+        
+        pool = find_layer(client, CompressionTransport).inner._pool
+        assert pool._max_keepalive_connections == 4
+        assert pool._max_connections == 8
+    
+    def test_http2_client(self):
+        """Test HTTP/2 mode multiplexes streams over pool_size connections"""
+        client = create_retry_client(
+            base_url="https://api.test.com",
+            headers={},
+            pool_size=2,
+            http2=True,
+            keepalive_expiry=30.0,
+            max_streams=50
+        )
+        
+        streams = find_layer(client, StreamLimitTransport)
+        assert streams.max_in_flight == 100
+        
+        pool = streams.inner.inner._pool
+        assert pool._http2 is True
+        assert pool._max_connections == 2
+        assert pool._keepalive_expiry == 30.0
+    
+    def test_retries_use_retry_transport(self):
+        """Test retries are handled by the retry engine, not the pool"""
+        client = create_retry_client(
+            base_url="https://api.test.com",
+            headers={},
+            max_retries=4,
+            retry_budget_ratio=0.5
+        )
+        
+        retry = find_layer(client, RetryTransport)
+        assert retry.max_retries == 4
+        assert retry.budget.ratio == 0.5
+        assert find_layer(client, CompressionTransport).inner._pool._retries == 0
+        
+        client = create_retry_client(base_url="https://api.test.com", headers={}, max_retries=0)
+        assert find_layer(client, RetryTransport) is None
+    
+    def test_compression_layer_sits_on_pool(self):
+        """Test compression is negotiated unless disabled"""
+        client = create_retry_client(base_url="https://api.test.com", headers={})
+        assert "gzip" in find_layer(client, CompressionTransport).accept_encoding
+        
+        client = create_retry_client(base_url="https://api.test.com", headers={}, compression=False)
+        assert find_layer(client, CompressionTransport).accept_encoding == "identity"
+    
+    def test_cache_wraps_every_layer(self):
+        """Test the cache factory is applied outside the server layers"""
+        client = create_retry_client(
+            base_url="https://api.test.com",
+            headers={},
+            layers=[SingleFlightTransport],
+            cache=partial(HttpCacheTransport, ttl=5)
+        )
+        
+        assert isinstance(client._transport, HttpCacheTransport)
+        assert isinstance(client._transport.inner, SingleFlightTransport)
+        assert client._transport.ttl == 5
+    
+    def test_phase_timeouts(self):
+        """Test connect/read/write/pool timeouts override the overall timeout"""
+        client = create_retry_client(
+            base_url="https://api.test.com",
+            headers={},
+            timeout=60,
+            connect_timeout=5,
+            pool_timeout=2
+        )
+        
+        assert client.timeout == httpx.Timeout(60, connect=5, pool=2)
+
+
+class TestIterJsonArray:
+    """Test incremental decoding of JSON array bodies"""
+    
+    @staticmethod
+    async def decode(payload, chunk_size):
+        async def chunks():
+            for i in range(0, len(payload), chunk_size):
+                yield payload[i:i + chunk_size]
+        
+        return [item async for item in iter_json_array(chunks())]
+    
+    @pytest.mark.asyncio
+    async def test_items_match_whole_document_decode(self):
+        """Test every chunking of the body yields the same items"""
+        items = [
+            {"id": "agent-1", "name": "Caf\u00e9 \u2603", "tags": ["a", "b"]},
+            {"text": "quoted \\\"], {\" inside", "nested": [[1, 2], {"k": None}]},
+            12.5e3,
+            "plain",
+            True,
+            []
+        ]
+        payload = json.dumps(items, ensure_ascii=False).encode()
+        
+        for chunk_size in (1, 2, 3, 7, 64, len(payload)):
+            assert await self.decode(payload, chunk_size) == items
+    
+    @pytest.mark.asyncio
+    async def test_number_split_across_chunks(self):
+        """Test a number is not yielded until its last digit has arrived"""
+        async def chunks():
+            yield b"[1"
+            yield b"23.5"
+            yield b"e2, 4]"
+        
+        assert [item async for item in iter_json_array(chunks())] == [12350.0, 4]
+    
+    @pytest.mark.asyncio
+    async def test_empty_array(self):
+        """Test empty arrays yield nothing"""
+        assert await self.decode(b" [ ] ", 1) == []
+    
+    @pytest.mark.asyncio
+    async def test_non_array_body_raises(self):
+        """Test non-array bodies are reported by type"""
+        with pytest.raises(ValueError, match="Expected a JSON array"):
+            await self.decode(b'{"unexpected": "structure"}', 4)
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("payload,message", [
+        (b"", "Empty response body"),
+        (b'[{"id": 1}, {"id"', "Truncated JSON array"),
+        (b"[1 2]", "Malformed JSON array"),
+        (b"[1,,2]", ""),
+    ])
+    async def test_malformed_bodies_raise(self, payload, message):
+        """Test malformed bodies raise ValueError"""
+        with pytest.raises(ValueError, match=message):
+            await self.decode(payload, 3)
+
 
 class TestUtilityIntegration:
     """Integration tests for utility functions working together"""
@@ -493,4 +650,39 @@ class TestUtilityIntegration:
         assert len(result) == 3
         assert result["human"]["value"] == ""
         assert "Inventory analysis" in result["persona"]["value"]
-        assert "🚗" in result["special_chars"]["value"]
\ No newline at end of file
+        assert "🚗" in result["special_chars"]["value"]
+
+
+class TestCursors:
+    """Test opaque pagination cursors"""
+    
+    def test_round_trip(self):
+        """Test a cursor decodes to its offset for the same listing"""
+        cursor = encode_cursor(300, name="support")
+        
+        assert decode_cursor(cursor, name="support") == 300
+        assert "300" not in cursor
+    
+    def test_rejects_other_listing_and_garbage(self):
+        """Test mismatched context and malformed cursors raise ValidationError"""
+        with pytest.raises(ValidationError, match="does not belong"):
+            decode_cursor(encode_cursor(300, name="support"), name=None)
+        
+        with pytest.raises(ValidationError, match="Invalid cursor"):
+            decode_cursor("not-a-cursor", name=None)
+
+
+class TestParseTimestamp:
+    """Test ISO 8601 parsing for created_at selectors"""
+    
+    def test_offsets_and_naive_times_compare(self):
+        """Test Z suffixes, explicit offsets and naive dates are all timezone-aware"""
+        assert parse_timestamp("2026-01-02") == parse_timestamp("2026-01-02T00:00:00Z")
+        assert parse_timestamp("2026-01-02T01:00:00+01:00") == parse_timestamp("2026-01-02T00:00:00Z")
+    
+    def test_invalid(self):
+        """Test unparseable input raises ValidationError naming the field"""
+        with pytest.raises(ValidationError) as info:
+            parse_timestamp("last week", "created_after")
+        
+        assert info.value.details["field"] == "created_after"